@@ -8,7 +8,10 @@ import sys
 from dotenv import load_dotenv
 from .communicator import ProjectManager
 from .communicator.ee_manager import CityAsset
-from .processes import process_lst, process_era5, process_thermal
+from .communicator.ee_cache import get_cache
+from .communicator.ee_metrics import get_metrics
+from .processes import process_lst, process_era5, process_thermal, process_cities
+from .processes import build_lst, build_era5, build_thermal, plan_cities
 
 os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
@@ -20,8 +23,44 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logging.getLogger('ee').setLevel(logging.WARNING)
 
+def split_city_option(args):
+    """
+    Split the --cities <name,name,...> or --all-cities option from the positional arguments
+    """
+    positional = []
+    city_option = None
+    index = 0
+    while index < len(args):
+        if args[index] == '--all-cities':
+            city_option = []
+        elif args[index] == '--cities' and index + 1 < len(args):
+            city_option = [name for name in args[index+1].split(',') if name]
+            index += 1
+        else:
+            positional.append(args[index])
+        index += 1
+    return positional, city_option
+
+def print_plan(calculator_type: str, rows: list):
+    """
+    Print the planned sessions and the estimated cost of every city
+    """
+    print(f"plan of {calculator_type}:")
+    print(f"{'city':<12}{'total':>7}{'done':>7}{'tracked':>9}{'missing':>9}{'pending':>9}{'pixels':>14}{'GB':>10}{'ee calls':>10}")
+    for row in rows:
+        print(f"{row['city']:<12}{row['total']:>7}{row['completed']:>7}{row['tracked']:>9}{row['missing']:>9}{row['pending']:>9}"
+              f"{row['pixels_per_image']:>14}{row['download_gb']:>10.2f}{row['ee_calls']:>10}")
+        if row['pending_months']:
+            print(f"  pending: {', '.join(row['pending_months'])}")
+    print(f"total: {sum(row['pending'] for row in rows)} pending months, "
+          f"{sum(row['download_gb'] for row in rows):.2f} GB, {sum(row['ee_calls'] for row in rows)} ee calls")
+
 def main(args):
     load_dotenv()
+    args, city_option = split_city_option(args)
+    plan_mode = len(args) > 1 and args[0] == 'plan'
+    if plan_mode:
+        args = args[1:]
     credentials_file_path = os.getenv('CREDENTIALS_FILE_PATH')
     collection_path = os.getenv('IMAGE_COLLECTION_PATH')
     project_name = os.getenv('PROJECT_NAME')
@@ -29,6 +68,18 @@ def main(args):
     tracker_folder_path = os.getenv('TRACKER_FOLDER_PATH')
     drive_folder_id = os.getenv('DRIVE_FOLDER_ID')
     cloud_folder_name = os.getenv('DRIVE_FOLDER_NAME')
+    calculate_workers = int(os.getenv('CALCULATE_WORKERS') or 1)
+    download_workers = int(os.getenv('DOWNLOAD_WORKERS') or 2)
+    # bandwidth cap of all the downloads in MB/s, unlimited if empty
+    download_bandwidth_limit = float(os.getenv('DOWNLOAD_BANDWIDTH_LIMIT') or 0) * 1024 * 1024 or None
+    export_window = (int(os.getenv('EXPORT_WINDOW_MIN') or 2), int(os.getenv('EXPORT_WINDOW_MAX') or 20))
+    # months exported before the others, e.g. 2020-07,2021-08
+    pinned_months = [f"{int(year)}-{int(month):02}" for year, month in
+                     (item.strip().split('-') for item in (os.getenv('PINNED_MONTHS') or '').split(',') if item.strip())]
+    # spectral index bands of the LST images, e.g. NDVI,FVC, all of them if empty
+    spectral_indices = tuple(item.strip() for item in (os.getenv('SPECTRAL_INDICES') or '').split(',') if item.strip()) or None
+    # bands and data type of the LST images: full, lst-min or indices
+    output_profile = os.getenv('OUTPUT_PROFILE') or None
     calculator_type = args[0]
     project_manager = ProjectManager(
         project_name=project_name,
@@ -38,36 +89,59 @@ def main(args):
         cloud_folder_name=cloud_folder_name,
         quality_file_path=quality_file_path,
         tracker_folder_path=tracker_folder_path,
+        download_workers=download_workers,
+        download_bandwidth_limit=download_bandwidth_limit,
+        export_window=export_window,
+        pinned_months=pinned_months,
+        metrics_file_path=os.getenv('EE_METRICS_FILE') or None,
     )
-    if not project_manager.initialize():
+    if not project_manager.initialize(read_only=plan_mode):
         logger.error("Failed to initialize project manager")
         return
-    city_asset: CityAsset = project_manager.get_city_asset(city_name = "武汉市")
     if calculator_type == "lst":
         if len(args) < 3 or len(args) > 4:
-            logger.error("Usage: python -m src lst <start_year> <end_year> [<check_days_file_path>]")
+            logger.error("Usage: python -m src [plan] lst <start_year> <end_year> [<check_days_file_path>] [--cities <name,...> | --all-cities]")
             sys.exit(1)
         year_range = (int(args[1]), int(args[2]))
         check_days_file_path = args[3] if len(args) > 3 else None
-        process_lst(project_manager, city_asset, year_range, check_days_file_path)
+        process_func, process_args, process_kwargs = process_lst, (year_range, check_days_file_path), {'max_workers': calculate_workers, 'spectral_indices': spectral_indices, 'output_profile': output_profile}
+        build_func = build_lst
     elif calculator_type == "era5":
         if len(args) != 2:
-            logger.error("Usage: python -m src era5 <check_days_file_path>")
+            logger.error("Usage: python -m src [plan] era5 <check_days_file_path> [--cities <name,...> | --all-cities]")
             sys.exit(1)
         check_days_file_path = args[1]
-        process_era5(project_manager, city_asset, check_days_file_path)
+        process_func, process_args, process_kwargs = process_era5, (check_days_file_path,), {}
+        build_func = build_era5
     elif calculator_type == "thermal":
         if len(args) != 2:
-            logger.error("Usage: python -m src thermal <check_days_file_path>")
+            logger.error("Usage: python -m src [plan] thermal <check_days_file_path> [--cities <name,...> | --all-cities]")
             sys.exit(1)
         check_days_file_path = args[1]
-        process_thermal(project_manager, city_asset, check_days_file_path)
+        process_func, process_args, process_kwargs = process_thermal, (check_days_file_path,), {}
+        build_func = build_thermal
     else:
         logger.error("Invalid calculator type: %s", calculator_type)
         sys.exit(1)
+    if plan_mode:
+        city_names = ["武汉市"] if city_option is None else (city_option or project_manager.get_city_names())
+        rows = plan_cities(build_func, project_manager, city_names, city_option is not None, *process_args, **process_kwargs)
+        print_plan(calculator_type, rows)
+    elif city_option is None:
+        city_asset: CityAsset = project_manager.get_city_asset(city_name = "武汉市")
+        process_func(project_manager, city_asset, *process_args, **process_kwargs)
+    else:
+        city_names = city_option or project_manager.get_city_names()
+        logger.info("Batch processing %d cities", len(city_names))
+        process_cities(process_func, project_manager, city_names, *process_args, **process_kwargs)
+    if get_cache() is not None:
+        logger.info("ee cache stats: %s", get_cache().stats())
+    if get_metrics() is not None:
+        get_metrics().write()
+        logger.info("ee calls by call site: %s", get_metrics().summary())
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        logger.error("Usage: python -m src <calculator_type> <args>")
+        logger.error("Usage: python -m src [plan] <calculator_type> <args>")
         sys.exit(1)
     main(sys.argv[1:])
@@ -0,0 +1,7 @@
+"""
+Offline backends standing in for Google Earth Engine and Google Drive.
+Install one before importing the pipeline modules, they import ee and pydrive at load time.
+"""
+from .fake_backend import FakeBackend, DriveFile
+
+__all__ = ['FakeBackend', 'DriveFile']
@@ -0,0 +1,142 @@
+"""
+Offline benchmark of the LST session loop: export and download every month of a year range
+for one city on the fake backend, then report the wall time, the round trips and the peak memory.
+
+    python -m src.backend.benchmark 2018 2020 [--get-info-latency 0.2] [--work-folder <path>]
+
+Run it twice with the same --work-folder to measure a resumed run with a warm ee cache.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from .fake_backend import FakeBackend
+
+logger = logging.getLogger(__name__)
+
+def run_benchmark(start_year: int, end_year: int, work_folder: str, city_name: str = "武汉市",
+                  calculate_workers: int = 1, download_workers: int = 2, refresh_interval: float = 2,
+                  output_profile: str = None, **backend_options) -> dict:
+    """
+    Run the LST loop of the year range on a fake backend, the outputs go to work_folder
+    """
+    backend = FakeBackend(**backend_options)
+    backend.install()
+    # the pipeline modules import ee and pydrive, they must see the fakes
+    from ..communicator import ProjectManager
+    from ..communicator.ee_cache import get_cache
+    from ..communicator.ee_metrics import get_metrics
+    from ..monitor import Monitor
+    from ..processes import process_lst
+
+    collection_path = os.path.join(work_folder, 'collection')
+    tracker_folder_path = os.path.join(work_folder, 'trackers')
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    project_manager = ProjectManager(
+        project_name='fake-project',
+        credentials_file_path=os.path.join(work_folder, 'credentials.json'),
+        collection_path=collection_path,
+        drive_folder_id='fake-folder',
+        cloud_folder_name='fake-folder',
+        quality_file_path=os.path.join(work_folder, 'quality', 'quality.csv'),
+        tracker_folder_path=tracker_folder_path,
+        download_workers=download_workers,
+    )
+    if not project_manager.initialize():
+        raise RuntimeError("Failed to initialize the project on the fake backend")
+    city_asset = project_manager.get_city_asset(city_name)
+    monitor = Monitor(tracker_folder_path, project_manager.drive_manager, collection_path,
+                      refresh_interval=refresh_interval, **project_manager.monitor_options())
+    monitor.start()
+    process_lst(project_manager, city_asset, (start_year, end_year), max_workers=calculate_workers, monitor=monitor,
+                output_profile=output_profile)
+    monitor.stop()
+    monitor.join()
+    wall_time = time.perf_counter() - started_at
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cache = get_cache()
+    metrics = get_metrics()
+    metrics.write()
+    with open(os.path.join(collection_path, 'missing.txt'), 'r', encoding='utf-8') as f:
+        missing_num = sum(1 for line in f if line.strip())
+    report = {
+        'months': (end_year - start_year + 1) * 12,
+        'downloaded': sum(1 for name in os.listdir(collection_path) if name.endswith('.tif')),
+        'missing': missing_num,
+        'wall_time': wall_time,
+        'peak_memory_mb': peak_memory / 1024 ** 2,
+        'round_trips': backend.stats(),
+        'drive_listing_calls': project_manager.drive_manager.api_calls,
+        'ee_cache': cache.stats() if cache is not None else None,
+        'ee_calls': metrics.summary(),
+    }
+    if cache is not None:
+        cache.close()
+    return report
+
+def print_report(report: dict):
+    """
+    Print the benchmark report
+    """
+    print(f"months: {report['months']}, downloaded: {report['downloaded']}, missing: {report['missing']}")
+    print(f"wall time: {report['wall_time']:.2f} s")
+    print(f"peak traced memory: {report['peak_memory_mb']:.2f} MB")
+    print(f"drive listing calls: {report['drive_listing_calls']}, ee cache: {report['ee_cache']}")
+    round_trips = dict(report['round_trips'])
+    print(f"downloaded bytes: {round_trips.pop('drive_bytes', 0)}")
+    print("round trips:")
+    for kind, count in sorted(round_trips.items()):
+        print(f"  {kind:<16}{count:>8}")
+    print("ee calls by call site (calls, round trips, seconds):")
+    for call_site, entry in sorted(report['ee_calls'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"  {call_site:<64}{entry['calls']:>6}{entry['round_trips']:>6}{entry['seconds']:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LST session loop on the offline fake backend")
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    parser.add_argument('--city', default="武汉市")
+    parser.add_argument('--work-folder', help="keep the outputs there instead of a temporary folder")
+    parser.add_argument('--calculate-workers', type=int, default=1)
+    parser.add_argument('--download-workers', type=int, default=2)
+    parser.add_argument('--refresh-interval', type=float, default=2, help="seconds between the monitor checks")
+    parser.add_argument('--output-profile', help="bands and data type of the exported images, default full")
+    parser.add_argument('--get-info-latency', type=float, default=0.2, help="seconds per getInfo call")
+    parser.add_argument('--request-latency', type=float, default=0.05, help="seconds per task or drive request")
+    parser.add_argument('--export-queue-time', type=float, default=2, help="seconds an export task stays READY")
+    parser.add_argument('--export-run-time', type=float, default=4, help="seconds an export task stays RUNNING")
+    parser.add_argument('--failure-rate', type=float, default=0, help="fraction of the export tasks that fail")
+    parser.add_argument('--size-scale', type=float, default=1e-3, help="exported file size relative to the real one")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+    options = {
+        'city_name': args.city,
+        'calculate_workers': args.calculate_workers,
+        'download_workers': args.download_workers,
+        'refresh_interval': args.refresh_interval,
+        'output_profile': args.output_profile,
+        'get_info_latency': args.get_info_latency,
+        'request_latency': args.request_latency,
+        'export_queue_time': args.export_queue_time,
+        'export_run_time': args.export_run_time,
+        'failure_rate': args.failure_rate,
+        'size_scale': args.size_scale,
+        'seed': args.seed,
+    }
+    if args.work_folder is not None:
+        os.makedirs(args.work_folder, exist_ok=True)
+        report = run_benchmark(args.start_year, args.end_year, args.work_folder, **options)
+    else:
+        with tempfile.TemporaryDirectory() as work_folder:
+            report = run_benchmark(args.start_year, args.end_year, work_folder, **options)
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
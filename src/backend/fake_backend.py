@@ -0,0 +1,221 @@
+"""
+Shared state of the offline Earth Engine and Drive stand-ins
+"""
+import collections
+import hashlib
+import itertools
+import logging
+import sys
+import threading
+import time
+import types
+from . import fake_ee, fake_drive
+
+logger = logging.getLogger(__name__)
+
+class DriveFile:
+    """
+    A file of the fake drive folder, its body is a repeated block derived from its title
+    """
+    block_size = 64 * 1024
+
+    def __init__(self, file_id: str, title: str, size: int):
+        self.id = file_id
+        self.title = title
+        self.size = size
+        self.modified_at = time.time()
+        seed = hashlib.sha256(title.encode('utf-8')).digest()
+        self.block = seed * (self.block_size // len(seed))
+        md5 = hashlib.md5()
+        for start in range(0, size, 1024 * 1024):
+            md5.update(self.read(start, min(start + 1024 * 1024, size) - 1))
+        self.md5 = md5.hexdigest()
+
+    def read(self, start: int, end: int) -> bytes:
+        """
+        The bytes from start to end, both included
+        """
+        length = end - start + 1
+        offset = start % self.block_size
+        repeats = (offset + length) // self.block_size + 1
+        return (self.block * repeats)[offset:offset + length]
+
+    def metadata(self) -> dict:
+        return {
+            'id': self.id,
+            'title': self.title,
+            'mimeType': 'image/tiff',
+            'fileSize': str(self.size),
+            'md5Checksum': self.md5,
+            'downloadUrl': f"https://fake.drive/download/{self.id}",
+            'modifiedDate': fake_drive.modified_date(self.modified_at),
+        }
+
+class FakeBackend:
+    """
+    Simulated Earth Engine and Drive services for offline runs.
+
+    Every request sleeps its latency and is counted by kind. Export tasks stay READY for
+    export_queue_time seconds and RUNNING for export_run_time seconds (both jittered by
+    the seed), then write their file to the drive folder. The file size is the exported
+    pixels times the bands and their bytes per pixel, scaled by size_scale to keep the
+    downloads small.
+    """
+    def __init__(self, get_info_latency: float = 0.2, request_latency: float = 0.05, export_queue_time: float = 2,
+                 export_run_time: float = 4, failure_rate: float = 0, size_scale: float = 1e-3,
+                 drive_bandwidth: float = None, seed: int = 0):
+        self.get_info_latency = get_info_latency
+        self.request_latency = request_latency
+        self.export_queue_time = export_queue_time
+        self.export_run_time = export_run_time
+        self.failure_rate = failure_rate
+        self.size_scale = size_scale
+        self.drive_bandwidth = drive_bandwidth
+        self.seed = seed
+        self.counters = collections.Counter()
+        self.tasks = {}
+        self.files = {}
+        self._task_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def install(self):
+        """
+        Register the fakes as the ee and pydrive modules, before the pipeline modules import them
+        """
+        installed = sys.modules.get('ee')
+        if installed is not None and installed is not fake_ee:
+            raise RuntimeError("the ee module is already imported, install the fake backend first")
+        fake_ee.backend = self
+        fake_drive.backend = self
+        pydrive = types.ModuleType('pydrive')
+        pydrive.auth = fake_drive
+        pydrive.drive = fake_drive
+        sys.modules['ee'] = fake_ee
+        sys.modules['pydrive'] = pydrive
+        sys.modules['pydrive.auth'] = fake_drive
+        sys.modules['pydrive.drive'] = fake_drive
+        logger.info("fake backend installed (seed %s)", self.seed)
+
+    def round_trip(self, kind: str, latency: float):
+        """
+        Count a request and wait out its latency
+        """
+        with self._lock:
+            self.counters[kind] += 1
+        if latency > 0:
+            time.sleep(latency)
+
+    def transfer(self, nbytes: int):
+        """
+        Count the downloaded bytes, waiting for the simulated bandwidth
+        """
+        with self._lock:
+            self.counters['drive_bytes'] += nbytes
+        if self.drive_bandwidth:
+            time.sleep(nbytes / self.drive_bandwidth)
+
+    def get_info(self, node):
+        self.round_trip('get_info', self.get_info_latency)
+        return fake_ee.evaluate(node)
+
+    def start_task(self, task):
+        """
+        Submit an export task and size its output file
+        """
+        self.round_trip('export', self.request_latency)
+        config = task.config
+        try:
+            image = fake_ee.evaluate_image(config['image'])
+            band_count, pixel_bytes = len(image.bands), image.pixel_bytes
+        except fake_ee.EEException as e:
+            logger.debug("cannot evaluate the bands of %s: %s", config['description'], e)
+            band_count, pixel_bytes = 1, 4
+        region = fake_ee.evaluate_image(config['region'])
+        pixel_count = region.area() / (config['scale'] or 30) ** 2
+        rng = fake_ee._seeded_random('task', config['description'])
+        with self._lock:
+            task.id = f"FAKE{next(self._task_ids):08}"
+            self.tasks[task.id] = {
+                'description': config['description'],
+                'started_at': time.time(),
+                'queue_time': self.export_queue_time * rng.uniform(0.5, 1.5),
+                'run_time': self.export_run_time * rng.uniform(0.5, 1.5),
+                'fails': rng.random() < self.failure_rate,
+                'cancelled': False,
+                'size': max(1, int(pixel_count * band_count * pixel_bytes * self.size_scale)),
+                'written': False,
+            }
+        task.state = 'READY'
+
+    def _status(self, task_id: str) -> dict:
+        record = self.tasks.get(task_id)
+        if record is None:
+            return {'id': task_id, 'state': 'FAILED', 'error_message': 'Task not found.'}
+        elapsed = time.time() - record['started_at']
+        if record['cancelled']:
+            state = 'CANCELLED'
+        elif elapsed < record['queue_time']:
+            state = 'READY'
+        elif elapsed < record['queue_time'] + record['run_time']:
+            state = 'RUNNING'
+        elif record['fails']:
+            state = 'FAILED'
+        else:
+            state = 'COMPLETED'
+            if not record['written']:
+                record['written'] = True
+                self.add_file(f"{record['description']}.tif", record['size'])
+        status = {
+            'id': task_id,
+            'task_type': 'EXPORT_IMAGE',
+            'description': record['description'],
+            'state': state,
+            'creation_timestamp_ms': int(record['started_at'] * 1000),
+        }
+        if state == 'FAILED':
+            status['error_message'] = 'Simulated export failure.'
+        return status
+
+    def task_status(self, task_id: str) -> dict:
+        self.round_trip('task_status', self.request_latency)
+        with self._lock:
+            return self._status(task_id)
+
+    def task_list(self, page_size: int = 500) -> list:
+        """
+        Status of every task of the history, a request per page as the client pages through it
+        """
+        for _ in range(len(self.tasks) // page_size + 1):
+            self.round_trip('task_list', self.request_latency)
+        with self._lock:
+            return [self._status(task_id) for task_id in self.tasks]
+
+    def cancel_task(self, task_id: str):
+        self.round_trip('task_cancel', self.request_latency)
+        with self._lock:
+            if task_id in self.tasks:
+                self.tasks[task_id]['cancelled'] = True
+
+    def add_file(self, title: str, size: int) -> DriveFile:
+        drive_file = DriveFile(f"fake-file-{next(self._file_ids)}", title, size)
+        self.files[drive_file.id] = drive_file
+        logger.debug("fake drive file %s written (%d bytes)", title, size)
+        return drive_file
+
+    def list_files(self) -> list:
+        with self._lock:
+            return list(self.files.values())
+
+    def delete_file(self, file_id: str):
+        with self._lock:
+            self.files.pop(file_id, None)
+
+    def stats(self) -> dict:
+        """
+        The request counters by kind
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        stats['round_trips'] = sum(count for kind, count in stats.items() if kind != 'drive_bytes')
+        return stats
@@ -0,0 +1,128 @@
+"""
+Offline stand-in of pydrive, installed as the pydrive.auth and pydrive.drive modules by the fake backend.
+The drive folder holds the files written by the fake export tasks.
+"""
+import datetime
+import logging
+import re
+import time
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# the FakeBackend that installed this module
+backend = None
+
+MODIFIED_AFTER = re.compile(r"modifiedDate > '([^']+)'")
+TITLE_EQUALS = re.compile(r"title='([^']+)'")
+
+class GoogleAuth:
+    """
+    Authentication with a fake credentials object that never expires
+    """
+    def __init__(self, *args, **kwargs):
+        self.credentials = None
+
+    def LoadCredentialsFile(self, credentials_file=None):
+        self.credentials = SimpleNamespace(refresh_token='fake-refresh-token', token_expiry=None)
+
+    def LocalWebserverAuth(self, *args, **kwargs):
+        self.LoadCredentialsFile()
+
+    def Refresh(self):
+        backend.round_trip('token_refresh', backend.request_latency)
+        self.credentials.token_expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+
+    def SaveCredentialsFile(self, credentials_file=None):
+        return
+
+    def Get_Http_Object(self):
+        return Http()
+
+class Response(dict):
+    def __init__(self, status: int):
+        super().__init__(status=str(status))
+        self.status = status
+
+class Http:
+    """
+    Serve the bodies of the drive files, honoring the Range header
+    """
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        backend.round_trip('drive_download', backend.request_latency)
+        drive_file = backend.files.get(uri.rsplit('/', 1)[-1])
+        if drive_file is None:
+            return Response(404), b''
+        range_header = (headers or {}).get('Range')
+        if range_header is None:
+            start, end, status = 0, drive_file.size - 1, 200
+        else:
+            start, end = (int(value) for value in range_header.split('=', 1)[1].split('-'))
+            end, status = min(end, drive_file.size - 1), 206
+        content = drive_file.read(start, end)
+        backend.transfer(len(content))
+        return Response(status), content
+
+class GoogleDriveFile(dict):
+    """
+    Metadata of a drive file, with the calls used by the drive manager
+    """
+    def __init__(self, auth, metadata: dict):
+        super().__init__(metadata)
+        self.auth = auth
+
+    def FetchMetadata(self, *args, **kwargs):
+        backend.round_trip('drive_metadata', backend.request_latency)
+        drive_file = backend.files.get(self['id'])
+        if drive_file is not None:
+            self.update(drive_file.metadata())
+
+    def Delete(self):
+        backend.round_trip('drive_delete', backend.request_latency)
+        backend.delete_file(self['id'])
+
+class GoogleDriveFileList:
+    """
+    Pages of a folder listing, every page is one request
+    """
+    def __init__(self, auth, param: dict):
+        self.auth = auth
+        self.param = param or {}
+
+    def __iter__(self):
+        query = self.param.get('q', '')
+        page_size = self.param.get('maxResults', 100)
+        modified_after = MODIFIED_AFTER.search(query)
+        title = TITLE_EQUALS.search(query)
+        if 'application/vnd.google-apps.folder' in query and "mimeType !=" not in query:
+            # folder lookups by name, every name resolves to the fake folder
+            files = [{'id': 'fake-folder', 'title': title.group(1) if title else 'fake-folder'}]
+        else:
+            since = 0
+            if modified_after is not None:
+                since = datetime.datetime.strptime(modified_after.group(1), '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc).timestamp()
+            files = [drive_file.metadata() for drive_file in backend.list_files() if drive_file.modified_at > since]
+            if title is not None:
+                files = [metadata for metadata in files if metadata['title'] == title.group(1)]
+        for start in range(0, max(len(files), 1), page_size):
+            backend.round_trip('drive_list', backend.request_latency)
+            yield [GoogleDriveFile(self.auth, metadata) for metadata in files[start:start + page_size]]
+
+    def GetList(self) -> list:
+        return [file_obj for page in self for file_obj in page]
+
+class GoogleDrive:
+    def __init__(self, auth=None):
+        self.auth = auth
+
+    def ListFile(self, param=None):
+        return GoogleDriveFileList(self.auth, param)
+
+    def CreateFile(self, metadata=None):
+        return GoogleDriveFile(self.auth, metadata or {})
+
+def modified_date(timestamp: float) -> str:
+    """
+    Drive RFC 3339 time of a unix timestamp
+    """
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(timestamp))
@@ -0,0 +1,1059 @@
+"""
+Offline stand-in of the earthengine-api client, installed as the ee module by the fake backend.
+Objects build a lazy expression graph like the real client, getInfo evaluates the graph locally
+over synthetic city boundaries and Landsat scenes after a simulated round trip.
+Only the pixel counts and the metadata are simulated, not the pixel values.
+"""
+import calendar
+import datetime
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# the FakeBackend that installed this module
+backend = None
+
+DAY_MILLIS = 86400000
+UNIT_MILLIS = {
+    'second': 1000,
+    'minute': 60000,
+    'hour': 3600000,
+    'day': DAY_MILLIS,
+    'week': 7 * DAY_MILLIS,
+}
+WORLD = (-180.0, -90.0, 180.0, 90.0)
+# largest error of the clear fraction seen by a reduction coarser than 30 m
+COARSE_ERROR = 0.02
+
+class EEException(Exception):
+    """
+    Error of an expression the fake server cannot evaluate
+    """
+
+def Initialize(project=None, **kwargs):
+    """
+    Count the initialization as one round trip
+    """
+    backend.round_trip('initialize', backend.request_latency)
+    logger.info("fake ee initialized for project %s", project)
+
+class ComputedObject:
+    """
+    A node of the lazy expression graph: a function name applied to arguments.
+    Method calls on the node build new nodes with the node as the first argument.
+    """
+    def __init__(self, func, args=(), kwargs=None):
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        def method(*args, **kwargs):
+            return ComputedObject(name, (self,) + args, kwargs)
+        return method
+
+    def serialize(self, for_cloud_api=True) -> str:
+        """
+        Deterministic JSON of the graph, shared nodes are written once and referenced.
+        The fake has a single format, read back by deserializer.fromJSON.
+        """
+        values = {}
+        result = _encode(self, values, {}, 0)
+        return json.dumps({'result': result, 'values': values}, sort_keys=True, ensure_ascii=False)
+
+    def getInfo(self):
+        """
+        Evaluate the graph on the fake server
+        """
+        return backend.get_info(self)
+
+    def __repr__(self):
+        return f"ee.{self.func}(...)"
+
+class _Constructor(ComputedObject):
+    """
+    Constructor call such as ee.Image(...), evaluated by the function named after the class
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(type(self).__name__, args, kwargs)
+
+class Image(_Constructor):
+    @staticmethod
+    def cat(*images):
+        return ComputedObject('Image.cat', images)
+
+    @staticmethod
+    def constant(value):
+        return ComputedObject('Image.constant', (value,))
+
+class ImageCollection(_Constructor):
+    pass
+
+class Feature(_Constructor):
+    pass
+
+class FeatureCollection(_Constructor):
+    pass
+
+class Geometry(_Constructor):
+    pass
+
+class Number(_Constructor):
+    pass
+
+class String(_Constructor):
+    pass
+
+class List(_Constructor):
+    pass
+
+class Dictionary(_Constructor):
+    pass
+
+class Array(_Constructor):
+    pass
+
+class Date(_Constructor):
+    @staticmethod
+    def fromYMD(year, month, day):
+        return ComputedObject('Date.fromYMD', (year, month, day))
+
+class Reducer:
+    @staticmethod
+    def count():
+        return ComputedObject('Reducer', ('count',))
+
+    @staticmethod
+    def sum():
+        return ComputedObject('Reducer', ('sum',))
+
+    @staticmethod
+    def mean():
+        return ComputedObject('Reducer', ('mean',))
+
+class Filter:
+    @staticmethod
+    def eq(name, value):
+        return ComputedObject('Filter', ('eq', name, value))
+
+    @staticmethod
+    def neq(name, value):
+        return ComputedObject('Filter', ('neq', name, value))
+
+    @staticmethod
+    def lessThan(name, value):
+        return ComputedObject('Filter', ('lt', name, value))
+
+    @staticmethod
+    def greaterThan(name, value):
+        return ComputedObject('Filter', ('gt', name, value))
+
+class Algorithms:
+    @staticmethod
+    def If(condition, true_case, false_case=None):
+        return ComputedObject('Algorithms.If', (condition, true_case, false_case))
+
+def _encode(value, values: dict, seen: dict, depth: int):
+    """
+    Encode a graph value into the values table, returning its reference
+    """
+    if isinstance(value, ComputedObject):
+        entry = seen.get(id(value))
+        if entry is not None:
+            return entry[1]
+        encoded = {
+            'func': value.func,
+            'args': [_encode(arg, values, seen, depth) for arg in value.args],
+        }
+        if value.kwargs:
+            encoded['kwargs'] = {key: _encode(arg, values, seen, depth) for key, arg in sorted(value.kwargs.items())}
+        reference = {'ref': str(len(values))}
+        values[reference['ref']] = encoded
+        # keep the node alive so its id is not reused while encoding
+        seen[id(value)] = (value, reference)
+        return reference
+    if callable(value):
+        name = f"_MAPPING_VAR_{depth}"
+        body = value(ComputedObject('variable', (name,)))
+        return {'lambda': name, 'body': _encode(body, values, seen, depth + 1)}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, values, seen, depth) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _encode(item, values, seen, depth) for key, item in value.items()}
+    return value
+
+def _decode(value, values: dict, bindings: dict, decoded: dict):
+    """
+    Rebuild a graph value encoded by _encode, the variables of a lambda are bound when it is called
+    """
+    if isinstance(value, list):
+        return [_decode(item, values, bindings, decoded) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if set(value) == {'ref'}:
+        reference = value['ref']
+        if reference not in decoded:
+            encoded = values[reference]
+            args = _decode(encoded['args'], values, bindings, decoded)
+            if encoded['func'] == 'variable' and args[0] in bindings:
+                decoded[reference] = bindings[args[0]]
+            else:
+                kwargs = {key: _decode(arg, values, bindings, decoded) for key, arg in encoded.get('kwargs', {}).items()}
+                decoded[reference] = ComputedObject(encoded['func'], args, kwargs)
+        return decoded[reference]
+    if set(value) == {'lambda', 'body'}:
+        name, body = value['lambda'], value['body']
+        return lambda argument: _decode(body, values, {**bindings, name: argument}, {})
+    return {key: _decode(item, values, bindings, decoded) for key, item in value.items()}
+
+def _from_json(json_obj):
+    """
+    Rebuild the graph of ComputedObject.serialize
+    """
+    if isinstance(json_obj, str):
+        json_obj = json.loads(json_obj)
+    return _decode(json_obj['result'], json_obj['values'], {}, {})
+
+deserializer = SimpleNamespace(fromJSON=_from_json)
+
+# ---------------------------------------------------------------------------
+# server side values
+# ---------------------------------------------------------------------------
+
+def _box_intersection(a, b):
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    return box
+
+class _Geometry:
+    """
+    A geometry made of lon/lat boxes, the area is the area of their union
+    """
+    def __init__(self, boxes):
+        self.boxes = [tuple(box) for box in boxes]
+
+    @classmethod
+    def from_geojson(cls, geojson: dict):
+        if geojson['type'] == 'Polygon':
+            rings = [geojson['coordinates']]
+        elif geojson['type'] == 'MultiPolygon':
+            rings = geojson['coordinates']
+        else:
+            raise EEException(f"Unsupported geometry type {geojson['type']}")
+        boxes = []
+        for polygon in rings:
+            longitudes = [point[0] for point in polygon[0]]
+            latitudes = [point[1] for point in polygon[0]]
+            boxes.append((min(longitudes), min(latitudes), max(longitudes), max(latitudes)))
+        return cls(boxes)
+
+    def bounding_box(self):
+        return (min(box[0] for box in self.boxes), min(box[1] for box in self.boxes),
+                max(box[2] for box in self.boxes), max(box[3] for box in self.boxes))
+
+    def area(self, *args, **kwargs) -> float:
+        """
+        Area of the union of the boxes in square meters
+        """
+        if not self.boxes:
+            return 0.0
+        longitudes = sorted({x for box in self.boxes for x in (box[0], box[2])})
+        latitudes = sorted({y for box in self.boxes for y in (box[1], box[3])})
+        area = 0.0
+        for west, east in zip(longitudes, longitudes[1:]):
+            for south, north in zip(latitudes, latitudes[1:]):
+                if any(box[0] <= west and east <= box[2] and box[1] <= south and north <= box[3] for box in self.boxes):
+                    width = (east - west) * 111320 * math.cos(math.radians((north + south) / 2))
+                    area += width * (north - south) * 110574
+        return area
+
+    def intersection(self, other, *args, **kwargs):
+        boxes = []
+        for a in self.boxes:
+            for b in other.boxes:
+                box = _box_intersection(a, b)
+                if box is not None:
+                    boxes.append(box)
+        return _Geometry(boxes)
+
+    def intersects(self, other, *args, **kwargs) -> bool:
+        return bool(self.intersection(other).boxes)
+
+    def union(self, other=None, *args, **kwargs):
+        return _Geometry(self.boxes + (other.boxes if isinstance(other, _Geometry) else []))
+
+    def bounds(self, *args, **kwargs):
+        return _Geometry([self.bounding_box()]) if self.boxes else _Geometry([])
+
+    def centroid(self, *args, **kwargs):
+        west, south, east, north = self.bounding_box()
+        return _Point((west + east) / 2, (south + north) / 2)
+
+    def geometries(self):
+        return [_Geometry([box]) for box in self.boxes]
+
+    def info(self) -> dict:
+        polygons = [[[[w, s], [e, s], [e, n], [w, n], [w, s]]] for w, s, e, n in self.boxes]
+        if len(polygons) == 1:
+            return {'type': 'Polygon', 'coordinates': polygons[0]}
+        return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+class _Point:
+    def __init__(self, longitude: float, latitude: float):
+        self.longitude = longitude
+        self.latitude = latitude
+
+    def coordinates(self):
+        return [self.longitude, self.latitude]
+
+    def info(self) -> dict:
+        return {'type': 'Point', 'coordinates': self.coordinates()}
+
+class _Date:
+    def __init__(self, millis: float):
+        self.value = millis
+
+    @classmethod
+    def parse(cls, value):
+        if isinstance(value, _Date):
+            return value
+        if isinstance(value, (int, float)):
+            return cls(value)
+        if isinstance(value, str):
+            moment = datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc)
+            return cls(moment.timestamp() * 1000)
+        raise EEException(f"Cannot convert {value!r} to a date")
+
+    def moment(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.value / 1000, datetime.timezone.utc)
+
+    def millis(self):
+        return self.value
+
+    def advance(self, delta, unit, *args):
+        unit = unit.rstrip('s')
+        if unit in UNIT_MILLIS:
+            return _Date(self.value + delta * UNIT_MILLIS[unit])
+        moment = self.moment()
+        months = delta * 12 if unit == 'year' else delta
+        if unit not in ('month', 'year') or months != int(months):
+            raise EEException(f"Cannot advance a date by {delta} {unit}")
+        month_index = moment.month - 1 + int(months)
+        year = moment.year + month_index // 12
+        month = month_index % 12 + 1
+        day = min(moment.day, calendar.monthrange(year, month)[1])
+        return _Date(moment.replace(year=year, month=month, day=day).timestamp() * 1000)
+
+    def difference(self, start, unit):
+        unit = unit.rstrip('s')
+        millis = self.value - _Date.parse(start).value
+        if unit in UNIT_MILLIS:
+            return millis / UNIT_MILLIS[unit]
+        if unit == 'month':
+            return millis / (30.4375 * DAY_MILLIS)
+        if unit == 'year':
+            return millis / (365.25 * DAY_MILLIS)
+        raise EEException(f"Unknown date unit {unit}")
+
+    def update(self, *args, **kwargs):
+        fields = {'year', 'month', 'day', 'hour', 'minute', 'second'}
+        return _Date(self.moment().replace(**{key: value for key, value in kwargs.items() if key in fields}).timestamp() * 1000)
+
+    def get(self, unit):
+        return getattr(self.moment(), unit)
+
+    def format(self, pattern=None, *args):
+        return self.moment().strftime('%Y-%m-%dT%H:%M:%S')
+
+    def info(self) -> dict:
+        return {'type': 'Date', 'value': self.value}
+
+class _Filter:
+    def __init__(self, op: str, name: str, value):
+        self.op = op
+        self.name = name
+        self.value = value
+
+    def match(self, properties: dict) -> bool:
+        value = properties.get(self.name)
+        if value is None:
+            return False
+        if self.op == 'eq':
+            return value == self.value
+        if self.op == 'neq':
+            return value != self.value
+        if self.op == 'lt':
+            return value < self.value
+        return value > self.value
+
+class _Reducer:
+    def __init__(self, name: str):
+        self.name = name
+
+class _Feature:
+    def __init__(self, geometry, properties: dict):
+        self.geometry_value = geometry
+        self.properties = properties
+
+    def geometry(self, *args, **kwargs):
+        return self.geometry_value
+
+    def get(self, name):
+        return self.properties.get(name)
+
+    def set(self, *args):
+        return _Feature(self.geometry_value, _merge_properties(self.properties, args))
+
+    def info(self) -> dict:
+        return {
+            'type': 'Feature',
+            'geometry': self.geometry_value.info() if self.geometry_value is not None else None,
+            'properties': _to_info(self.properties),
+        }
+
+class _Image:
+    """
+    An image is its band names, its footprint and its clear (unmasked) fraction,
+    the clear fraction only applies to the pixel counts of the masked bands.
+    The bytes per pixel of a band follow the last cast, 4 by default.
+    """
+    def __init__(self, bands: list, footprint=None, clear: float = 1.0, masked=(), properties: dict = None, pixel_bytes: int = 4):
+        self.bands = list(bands)
+        self.footprint = footprint
+        self.clear = clear
+        self.masked = set(masked)
+        self.properties = properties or {}
+        self.pixel_bytes = pixel_bytes
+
+    def derive(self, bands=None, footprint=None, masked=None, properties=None, pixel_bytes=None):
+        return _Image(
+            self.bands if bands is None else bands,
+            self.footprint if footprint is None else footprint,
+            self.clear,
+            self.masked if masked is None else masked,
+            self.properties if properties is None else properties,
+            self.pixel_bytes if pixel_bytes is None else pixel_bytes,
+        )
+
+    def toByte(self):
+        return self.derive(pixel_bytes=1)
+
+    def toInt16(self):
+        return self.derive(pixel_bytes=2)
+
+    def toFloat(self):
+        return self.derive(pixel_bytes=4)
+
+    def toDouble(self):
+        return self.derive(pixel_bytes=8)
+
+    toUint8 = toInt8 = toByte
+    toUint16 = toInt16
+    toInt32 = toUint32 = toInt = toFloat
+
+    def region(self):
+        return self.footprint if self.footprint is not None else _Geometry([WORLD])
+
+    def _renamed(self, selected: list, names: list):
+        return self.derive(bands=names, masked={name for band, name in zip(selected, names) if band in self.masked})
+
+    def select(self, *selectors, **kwargs):
+        names = kwargs.get('newNames')
+        if selectors and isinstance(selectors[0], list):
+            if len(selectors) > 1:
+                names = selectors[1]
+            selectors = selectors[0]
+        selected = [self.bands[selector] if isinstance(selector, int) else selector for selector in selectors]
+        return self._renamed(selected, list(names or selected))
+
+    def rename(self, *names):
+        names = names[0] if len(names) == 1 and isinstance(names[0], list) else list(names)
+        return self._renamed(self.bands, list(names))
+
+    def addBands(self, other, names=None, overwrite=False):
+        other = other.select(names) if names is not None else other
+        if overwrite:
+            bands = [band for band in self.bands if band not in other.bands] + other.bands
+            masked = (self.masked - set(other.bands)) | other.masked
+        else:
+            bands = self.bands + [band for band in other.bands if band not in self.bands]
+            masked = self.masked | (other.masked - set(self.bands))
+        return self.derive(bands=bands, masked=masked, pixel_bytes=max(self.pixel_bytes, other.pixel_bytes))
+
+    def bandNames(self):
+        return list(self.bands)
+
+    def clip(self, geometry):
+        return self.derive(footprint=self.region().intersection(geometry))
+
+    def updateMask(self, mask):
+        return self.derive(masked=set(self.bands))
+
+    def geometry(self, *args, **kwargs):
+        return self.region()
+
+    def date(self):
+        return _Date(self.properties['system:time_start'])
+
+    def get(self, name):
+        return self.properties.get(name)
+
+    def getNumber(self, name):
+        return self.properties.get(name)
+
+    def set(self, *args):
+        return self.derive(properties=_merge_properties(self.properties, args))
+
+    def expression(self, expression, variables=None):
+        return _Image(['constant'], self.footprint, self.clear, ['constant'] if self.masked else [])
+
+    def reduce(self, reducer):
+        return _Image([reducer.name], self.footprint, self.clear, [reducer.name] if self.masked else [])
+
+    def reduceRegion(self, reducer=None, geometry=None, scale=30, maxPixels=None, **kwargs):
+        """
+        Pixel counts of the region, other reducers do not simulate the pixel values.
+        Coarser scales see the clear fraction with a seeded error of at most COARSE_ERROR.
+        """
+        scale = scale or 30
+        region = self.region() if geometry is None else self.region().intersection(geometry)
+        pixels = region.area() / scale ** 2
+        clear = self.clear
+        if scale > 30:
+            clear = max(0.0, min(1.0, clear + _seeded_random('scale', round(clear, 6), scale).uniform(-COARSE_ERROR, COARSE_ERROR)))
+        values = {}
+        for band in self.bands:
+            count = pixels * clear if band in self.masked else pixels
+            values[band] = int(count) if reducer.name in ('count', 'sum') else 0.0
+        return values
+
+    def info(self) -> dict:
+        return {
+            'type': 'Image',
+            'bands': [{'id': band} for band in self.bands],
+            'properties': _to_info(self.properties),
+        }
+
+class _Collection:
+    """
+    A feature or image collection held in memory
+    """
+    def __init__(self, elements: list, kind: str = 'FeatureCollection'):
+        self.elements = list(elements)
+        self.kind = kind
+
+    def derive(self, elements):
+        return _Collection(elements, self.kind)
+
+    def filter(self, condition):
+        return self.derive([element for element in self.elements if condition.match(element.properties)])
+
+    def filterDate(self, start, end=None):
+        start = _Date.parse(start).value
+        end = _Date.parse(end).value if end is not None else start + DAY_MILLIS
+        return self.derive([element for element in self.elements if start <= element.properties.get('system:time_start', start) < end])
+
+    def filterBounds(self, geometry):
+        return self.derive([element for element in self.elements if element.geometry().intersects(geometry)])
+
+    def map(self, function, evaluator):
+        elements = [evaluator.call(function, element) for element in self.elements]
+        kind = 'ImageCollection' if elements and all(isinstance(element, _Image) for element in elements) else 'FeatureCollection'
+        return _Collection([element for element in elements if element is not None], kind)
+
+    def select(self, *selectors, **kwargs):
+        return self.derive([element.select(*selectors) for element in self.elements])
+
+    def sort(self, name, ascending=True):
+        return self.derive(sorted(self.elements, key=lambda element: element.properties.get(name), reverse=not ascending))
+
+    def limit(self, count, *args):
+        return self.derive(self.elements[:count])
+
+    def toList(self, count, offset=0):
+        return self.elements[offset:offset + count]
+
+    def size(self):
+        return len(self.elements)
+
+    def first(self):
+        return self.elements[0] if self.elements else None
+
+    def aggregate_array(self, name):
+        return [element.properties[name] for element in self.elements if name in element.properties]
+
+    def aggregate_mean(self, name):
+        values = self.aggregate_array(name)
+        return sum(values) / len(values) if values else None
+
+    def geometry(self, *args, **kwargs):
+        return _Geometry([box for element in self.elements if element.geometry() is not None for box in element.geometry().boxes])
+
+    def union(self, *args, **kwargs):
+        return _Collection([_Feature(self.geometry(), {})])
+
+    def mosaic(self):
+        if not self.elements:
+            return _Image([])
+        clear = sum(element.clear for element in self.elements) / len(self.elements)
+        return _Image(self.elements[0].bands, self.geometry(), clear)
+
+    median = mean = min = max = mosaic
+
+    def info(self) -> dict:
+        return {'type': self.kind, 'features': [element.info() for element in self.elements]}
+
+class _Catalog:
+    """
+    A public dataset, only materialized once it is filtered by date
+    """
+    def __init__(self, path: str, generate):
+        self.path = path
+        self.generate = generate
+
+    def filterDate(self, start, end=None):
+        start = _Date.parse(start).value
+        end = _Date.parse(end).value if end is not None else start + DAY_MILLIS
+        return _Collection(self.generate(start, end), 'ImageCollection')
+
+    def info(self):
+        raise EEException(f"Collection {self.path} is too large to fetch, filter it by date first")
+
+def _merge_properties(properties: dict, args: tuple) -> dict:
+    merged = dict(properties)
+    if len(args) == 1 and isinstance(args[0], dict):
+        merged.update(args[0])
+    else:
+        for key, value in zip(args[0::2], args[1::2]):
+            merged[key] = value
+    return merged
+
+def _to_info(value):
+    """
+    Convert a server side value to the JSON returned by getInfo
+    """
+    if hasattr(value, 'info'):
+        return value.info()
+    if isinstance(value, dict):
+        return {key: _to_info(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_info(item) for item in value]
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+# ---------------------------------------------------------------------------
+# synthetic datasets
+# ---------------------------------------------------------------------------
+
+# name, code and lon/lat box of the boundary features
+CITIES = [
+    ('武汉市', 420100, (113.68, 29.97, 115.08, 31.36)),
+    ('黄石市', 420200, (114.53, 29.50, 115.51, 30.25)),
+    ('鄂州市', 420700, (114.51, 30.00, 115.09, 30.63)),
+    ('孝感市', 420900, (113.41, 30.48, 114.58, 31.84)),
+]
+# sensor -> first and last acquisition day, revisit offset in days
+LANDSAT_SENSORS = {
+    'LT04': ('1982-08-22', '1993-12-14', 3),
+    'LT05': ('1984-03-16', '2012-05-05', 11),
+    'LE07': ('1999-05-28', '2024-01-19', 7),
+    'LC08': ('2013-03-18', '2100-01-01', 15),
+    'LC09': ('2021-10-31', '2100-01-01', 7),
+}
+LANDSAT_PATTERN = re.compile(r'LANDSAT/(L[TEC]0\d)/C02/T1_(TOA|L2)$')
+LANDSAT_TOA_BANDS = {
+    'LT04': ['B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'QA_PIXEL'],
+    'LT05': ['B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'QA_PIXEL'],
+    'LE07': ['B1', 'B2', 'B3', 'B4', 'B5', 'B6_VCID_1', 'B6_VCID_2', 'B7', 'B8', 'QA_PIXEL'],
+    'LC08': ['B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B9', 'B10', 'B11', 'QA_PIXEL'],
+}
+LANDSAT_SR_BANDS = {
+    'LT04': ['SR_B1', 'SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B7', 'ST_B6', 'QA_PIXEL'],
+    'LC08': ['SR_B1', 'SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7', 'ST_B10', 'QA_PIXEL'],
+}
+# the full path covers the region with two rows, the neighbour path only its west part
+FULL_PATH_TILES = [(112.9, 30.4, 115.6, 32.2), (112.6, 28.9, 115.3, 30.7)]
+SIDE_PATH_TILES = [(111.6, 29.2, 114.3, 31.9)]
+ASSET_IMAGE_BANDS = {
+    'NASA/ASTER_GED/AG100_003': ['emissivity_band10', 'emissivity_band11', 'emissivity_band12',
+                                 'emissivity_band13', 'emissivity_band14', 'ndvi'],
+    'USGS/SRTMGL1_003': ['elevation'],
+}
+
+def _seeded_random(*keys) -> random.Random:
+    seed = hashlib.sha256('/'.join(str(key) for key in (backend.seed,) + keys).encode('utf-8')).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+def _day_of(date_text: str) -> int:
+    return (datetime.date.fromisoformat(date_text) - datetime.date(1970, 1, 1)).days
+
+def _landsat_scenes(sensor: str, level: str):
+    """
+    Scene generator of a Landsat collection: a 16 day revisit of the full path and
+    the neighbour path 7 days later, with a scene cloud cover seeded by the acquisition
+    """
+    first_day, last_day, offset = LANDSAT_SENSORS[sensor]
+    first_day, last_day = _day_of(first_day), _day_of(last_day)
+    if level == 'TOA':
+        bands = LANDSAT_TOA_BANDS.get(sensor, LANDSAT_TOA_BANDS['LC08'])
+    else:
+        bands = LANDSAT_SR_BANDS['LC08'] if sensor in ('LC08', 'LC09') else LANDSAT_SR_BANDS['LT04']
+
+    def generate(start: float, end: float) -> list:
+        scenes = []
+        for day in range(max(int(start // DAY_MILLIS), first_day), min(int(math.ceil(end / DAY_MILLIS)), last_day + 1)):
+            phase = (day - offset) % 16
+            if phase == 0:
+                tiles = FULL_PATH_TILES
+            elif phase == 7:
+                tiles = SIDE_PATH_TILES
+            else:
+                continue
+            time_start = day * DAY_MILLIS + 2.6 * UNIT_MILLIS['hour']
+            if not start <= time_start < end:
+                continue
+            for row, tile in enumerate(tiles):
+                # TOA and SR scenes of one acquisition share the weather
+                rng = _seeded_random(sensor, day, phase, row)
+                cloud_cover = min(100.0, rng.expovariate(1 / 30))
+                clear = max(0.0, min(1.0, 1 - cloud_cover / 100 * rng.uniform(0.6, 1.4)))
+                acquired = datetime.date(1970, 1, 1) + datetime.timedelta(days=day)
+                scenes.append(_Image(bands, _Geometry([tile]), clear, properties={
+                    'system:time_start': time_start,
+                    'system:index': f"{sensor}_{123 + phase // 7:03}{38 + row:03}_{acquired:%Y%m%d}",
+                    'CLOUD_COVER': round(cloud_cover, 2),
+                }))
+        return scenes
+    return generate
+
+def _hourly_images(bands: list, step_hours: int):
+    """
+    Generator of a global dataset with an image every step_hours
+    """
+    step = step_hours * UNIT_MILLIS['hour']
+
+    def generate(start: float, end: float) -> list:
+        first = int(math.ceil(start / step))
+        return [_Image(bands, properties={'system:time_start': index * step}) for index in range(first, int(math.ceil(end / step)))]
+    return generate
+
+def _load_collection(path: str):
+    match = LANDSAT_PATTERN.search(path)
+    if match is not None:
+        return _Catalog(path, _landsat_scenes(match.group(1), match.group(2)))
+    if path.endswith('/YZBboundary'):
+        return _Collection([_Feature(_Geometry([box]), {'市名': name, '市代码': code}) for name, code, box in CITIES])
+    match = re.search(r'/urban_(\d+)$', path)
+    if match is not None:
+        return _Collection([_Feature(geometry, {}) for geometry in _urban_geometries(int(match.group(1)))])
+    if path == 'NCEP_RE/surface_wv':
+        return _Catalog(path, _hourly_images(['pr_wtr'], 6))
+    if path.startswith('ECMWF/ERA5'):
+        return _Catalog(path, _hourly_images(['u_component_of_wind_10m', 'v_component_of_wind_10m', 'temperature_2m'], 1))
+    return _Catalog(path, _hourly_images(['b1'], 24))
+
+def _urban_geometries(code: int) -> list:
+    """
+    The urban area of a city: a main polygon around the center and two scattered ones
+    """
+    for _, city_code, (west, south, east, north) in CITIES:
+        if city_code == code:
+            break
+    else:
+        raise EEException(f"Asset urban_{code} not found")
+    width, height = east - west, north - south
+    center_x, center_y = (west + east) / 2, (south + north) / 2
+    return [
+        _Geometry([(center_x - width * 0.15, center_y - height * 0.12, center_x + width * 0.15, center_y + height * 0.12)]),
+        _Geometry([(west + width * 0.05, south + height * 0.05, west + width * 0.1, south + height * 0.09)]),
+        _Geometry([(east - width * 0.1, north - height * 0.08, east - width * 0.05, north - height * 0.04)]),
+    ]
+
+# ---------------------------------------------------------------------------
+# evaluation
+# ---------------------------------------------------------------------------
+
+NUMBER_OPERATIONS = {
+    'add': lambda a, b: a + b,
+    'subtract': lambda a, b: a - b,
+    'multiply': lambda a, b: a * b,
+    'divide': lambda a, b: a / b if b else 0,
+    'pow': lambda a, b: a ** b,
+    'min': min,
+    'max': max,
+    'gt': lambda a, b: int(a > b),
+    'gte': lambda a, b: int(a >= b),
+    'lt': lambda a, b: int(a < b),
+    'lte': lambda a, b: int(a <= b),
+    'eq': lambda a, b: int(a == b),
+    'neq': lambda a, b: int(a != b),
+    'And': lambda a, b: int(bool(a) and bool(b)),
+    'Or': lambda a, b: int(bool(a) or bool(b)),
+    'abs': abs,
+    'Not': lambda a: int(not a),
+    'toInt': int,
+    'int': int,
+    'toFloat': float,
+    'float': float,
+    'round': round,
+    'floor': math.floor,
+    'ceil': math.ceil,
+    'sqrt': math.sqrt,
+    'log': math.log,
+}
+
+class _Evaluator:
+    """
+    Evaluate one getInfo graph, every node is evaluated once
+    """
+    def __init__(self):
+        self.memo = {}
+
+    def evaluate(self, value):
+        if isinstance(value, ComputedObject):
+            entry = self.memo.get(id(value))
+            if entry is not None:
+                return entry[1]
+            result = self._apply(value)
+            self.memo[id(value)] = (value, result)
+            return result
+        if isinstance(value, (list, tuple)):
+            return [self.evaluate(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.evaluate(item) for key, item in value.items()}
+        return value
+
+    def call(self, function, argument):
+        """
+        Apply a mapped function to a server side value
+        """
+        return self.evaluate(function(ComputedObject('constant', (argument,))))
+
+    def _apply(self, node: ComputedObject):
+        if node.func == 'Algorithms.If':
+            condition, true_case, false_case = node.args
+            return self.evaluate(true_case if self.evaluate(condition) else false_case)
+        args = [self.evaluate(arg) for arg in node.args]
+        kwargs = {key: self.evaluate(arg) for key, arg in node.kwargs.items()}
+        constructor = CONSTRUCTORS.get(node.func)
+        if constructor is not None:
+            return constructor(*args, **kwargs)
+        receiver, args = args[0], args[1:]
+        return self._call_method(receiver, node.func, args, kwargs)
+
+    def _call_method(self, receiver, name, args, kwargs):
+        if isinstance(receiver, (_Collection, _Catalog)) and name == 'map':
+            return receiver.map(args[0], self)
+        if isinstance(receiver, list):
+            return self._list_method(receiver, name, args)
+        if isinstance(receiver, dict):
+            return self._dictionary_method(receiver, name, args)
+        if isinstance(receiver, (int, float)) and name in NUMBER_OPERATIONS:
+            return NUMBER_OPERATIONS[name](receiver, *args)
+        method = getattr(receiver, name, None)
+        if method is not None:
+            return method(*args, **kwargs)
+        if isinstance(receiver, _Image):
+            # band math keeps the bands and the footprint of the image
+            return receiver.derive()
+        raise EEException(f"{type(receiver).__name__.strip('_')}.{name} is not implemented by the fake server")
+
+    def _list_method(self, receiver: list, name: str, args: list):
+        if name == 'get':
+            return receiver[int(args[0])]
+        if name in ('size', 'length'):
+            return len(receiver)
+        if name == 'map':
+            return [self.call(args[0], item) for item in receiver]
+        if name == 'distinct':
+            return list(dict.fromkeys(receiver))
+        if name == 'sort':
+            return sorted(receiver)
+        if name == 'slice':
+            return receiver[int(args[0]):int(args[1]) if len(args) > 1 else None]
+        if name == 'contains':
+            return int(args[0] in receiver)
+        if name == 'argmax':
+            return [max(range(len(receiver)), key=receiver.__getitem__)]
+        raise EEException(f"List.{name} is not implemented by the fake server")
+
+    def _dictionary_method(self, receiver: dict, name: str, args: list):
+        if name == 'get':
+            if args[0] not in receiver and len(args) < 2:
+                raise EEException(f"Dictionary does not contain key: {args[0]}")
+            return receiver.get(args[0], args[1] if len(args) > 1 else None)
+        if name == 'set':
+            return {**receiver, args[0]: args[1]}
+        if name == 'combine':
+            return {**receiver, **args[0]}
+        if name == 'keys':
+            return sorted(receiver)
+        if name == 'values':
+            return [receiver[key] for key in sorted(receiver)]
+        if name == 'contains':
+            return int(args[0] in receiver)
+        if name == 'size':
+            return len(receiver)
+        raise EEException(f"Dictionary.{name} is not implemented by the fake server")
+
+def _image(source=None, *args):
+    if isinstance(source, _Image):
+        return source
+    if isinstance(source, (int, float)):
+        return _constant_image(source)
+    if isinstance(source, str):
+        return _Image(ASSET_IMAGE_BANDS.get(source, ['b1']))
+    if source is None:
+        return _Image([])
+    raise EEException(f"Cannot convert {type(source).__name__} to an image")
+
+def _constant_image(value):
+    if isinstance(value, list):
+        return _Image([f"constant_{index}" for index in range(len(value))])
+    return _Image(['constant'])
+
+def _concatenate_images(*images):
+    images = images[0] if len(images) == 1 and isinstance(images[0], list) else images
+    bands = []
+    masked = set()
+    for image in images:
+        for band in image.bands:
+            name, index = band, 1
+            while name in bands:
+                name, index = f"{band}_{index}", index + 1
+            bands.append(name)
+            if band in image.masked:
+                masked.add(name)
+    if not images:
+        return _Image([])
+    return _Image(bands, images[0].footprint, images[0].clear, masked)
+
+def _image_collection(source=None, *args):
+    if isinstance(source, str):
+        return _load_collection(source)
+    if isinstance(source, list):
+        return _Collection(source, 'ImageCollection')
+    return source
+
+def _feature(source=None, properties=None):
+    if isinstance(source, _Feature):
+        return source.set(properties) if properties else source
+    return _Feature(source, dict(properties or {}))
+
+def _feature_collection(source=None, *args):
+    if isinstance(source, str):
+        return _load_collection(source)
+    if isinstance(source, _Collection):
+        return _Collection(source.elements)
+    if isinstance(source, _Feature):
+        return _Collection([source])
+    if isinstance(source, list):
+        return _Collection([item if isinstance(item, _Feature) else _Feature(item, {}) for item in source])
+    raise EEException(f"Cannot convert {type(source).__name__} to a feature collection")
+
+def _geometry(source=None, *args, **kwargs):
+    if isinstance(source, _Geometry):
+        return source
+    if isinstance(source, dict):
+        return _Geometry.from_geojson(source)
+    raise EEException(f"Cannot convert {type(source).__name__} to a geometry")
+
+def _date_from_ymd(year, month, day):
+    return _Date(datetime.datetime(int(year), int(month), int(day), tzinfo=datetime.timezone.utc).timestamp() * 1000)
+
+def _variable(name):
+    raise EEException(f"Unbound variable {name}")
+
+CONSTRUCTORS = {
+    'Image': _image,
+    'Image.cat': _concatenate_images,
+    'Image.constant': _constant_image,
+    'ImageCollection': _image_collection,
+    'Feature': _feature,
+    'FeatureCollection': _feature_collection,
+    'Geometry': _geometry,
+    'Number': lambda value, *args: value,
+    'String': lambda value, *args: value,
+    'List': lambda value, *args: list(value),
+    'Dictionary': lambda value=None, *args: dict(value or {}),
+    'Array': lambda value, *args: list(value),
+    'Date': lambda value, *args: _Date.parse(value),
+    'Date.fromYMD': _date_from_ymd,
+    'Reducer': _Reducer,
+    'Filter': _Filter,
+    'constant': lambda value: value,
+    'variable': _variable,
+}
+
+def evaluate(node):
+    """
+    Evaluate a graph to the JSON value returned by getInfo
+    """
+    return _to_info(_Evaluator().evaluate(node))
+
+def evaluate_image(node) -> _Image:
+    """
+    Evaluate an exported image graph, for the size of the exported file
+    """
+    return _Evaluator().evaluate(node)
+
+# ---------------------------------------------------------------------------
+# tasks
+# ---------------------------------------------------------------------------
+
+class Task:
+    """
+    An export task, its state is derived from the time since it was started
+    """
+    def __init__(self, task_id, task_type='EXPORT_IMAGE', state='UNSUBMITTED', config=None):
+        self.id = task_id
+        self.task_type = task_type
+        self.state = state
+        self.config = config or {}
+
+    def start(self):
+        backend.start_task(self)
+
+    def status(self) -> dict:
+        return backend.task_status(self.id)
+
+    def active(self) -> bool:
+        return self.status()['state'] in ('READY', 'RUNNING')
+
+    def cancel(self):
+        backend.cancel_task(self.id)
+
+    def __repr__(self):
+        return f"<Task {self.id} {self.task_type}: {self.config.get('description')}>"
+
+def _export_image_to_drive(image, description='myExportImageTask', folder=None, scale=None, region=None, **kwargs):
+    return Task(None, 'EXPORT_IMAGE', 'UNSUBMITTED', {
+        'image': image,
+        'description': description,
+        'folder': folder,
+        'scale': scale,
+        'region': region,
+    })
+
+batch = SimpleNamespace(
+    Task=Task,
+    Export=SimpleNamespace(image=SimpleNamespace(toDrive=_export_image_to_drive)),
+)
+def _get_task_status(task_ids):
+    """
+    Status of the tasks by id, the client gets them one operation at a time
+    """
+    task_ids = [task_ids] if isinstance(task_ids, str) else task_ids
+    return [backend.task_status(task_id) for task_id in task_ids]
+
+data = SimpleNamespace(getTaskList=lambda: backend.task_list(), getTaskStatus=_get_task_status)
@@ -1,9 +1,18 @@
 import csv
+import threading
 from abc import ABC, abstractmethod
 import ee
 from ..communicator import CityAsset
 
 class Calculator(ABC):
+    quality_file_lock = threading.Lock()
+    # rough size of the exported image and getInfo calls per month, used by the planner
+    band_count = 1
+    bytes_per_pixel = 4
+    ee_calls_per_session = 0
+    # GeoTIFF format options of the export, e.g. its noData value
+    format_options = None
+
     def __init__(self, city_asset: CityAsset, quality_file_path: str, missing_file_path: str, pixel_resolution: int, check_days_file_path = None):
         self.city_asset = city_asset
         self.quality_file_path = quality_file_path
@@ -27,10 +36,25 @@ class Calculator(ABC):
                 map_days[f"{int(year)}-{int(month):02}"] = int(day)
         return map_days
 
+    def write_quality_record(self, row: list):
+        """
+        Append a row to the quality file, safe to call from several calculating threads
+        """
+        with self.quality_file_lock:
+            with open(self.quality_file_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(row)
+
     @abstractmethod
     def calculate(self, year: int, month: int) -> ee.ImageCollection:
         pass
 
+    def session_band_count(self, year: int, month: int) -> int:
+        """
+        Bands of the image of a month, used by the planner
+        """
+        return self.band_count
+
     def get_month_length(self, year: int, month: int) -> int:
         """
         Get the month length
@@ -8,6 +8,8 @@ from ..era_algorithm import fetch_era5_image
 logger = logging.getLogger(__name__)
 
 class Era5Calculator(Calculator):
+    # 12 variables at 8 hours
+    band_count = 96
     def __init__(self, city_asset: CityAsset, quality_file_path: str, missing_file_path: str, check_days_file_path: str):
         super().__init__(city_asset, quality_file_path, missing_file_path, 11132, check_days_file_path)
 
@@ -1,16 +1,20 @@
-import csv
 from typing import Optional
 import traceback
 import logging
 import ee
 from .calculator import Calculator
 from ..communicator.ee_manager import CityAsset
-from ..lst_algorithm import fetch_best_landsat_image
+from ..communicator.ee_metrics import ee_call_tags
+from ..lst_algorithm import fetch_best_landsat_image, probe_landsat_availability, expected_landsat, check_indices, DEFAULT_INDICES
+from ..lst_algorithm import DATA_TYPES, get_profile, profile_band_count
 
 logger = logging.getLogger(__name__)
 
 class LstCalculator(Calculator):
-    def __init__(self, city_asset: CityAsset, quality_file_path: str, missing_file_path: str, check_days_file_path: Optional[str] = None):
+    ee_calls_per_session = 4
+    # satellites tried for a month, by priority
+    satellite_list = ('L8', 'L5', 'L7', 'L4')
+    def __init__(self, city_asset: CityAsset, quality_file_path: str, missing_file_path: str, check_days_file_path: Optional[str] = None, probe_satellites: bool = True, spectral_indices: Optional[tuple] = None, output_profile: Optional[str] = None):
         super().__init__(
             city_asset=city_asset,
             quality_file_path=quality_file_path,
@@ -18,38 +22,81 @@ class LstCalculator(Calculator):
             pixel_resolution=30,
             check_days_file_path=check_days_file_path
         )
+        self.probe_satellites = probe_satellites
+        self.spectral_indices = check_indices(DEFAULT_INDICES if spectral_indices is None else spectral_indices)
+        self.output_profile = output_profile
+        profile = get_profile(output_profile)
+        self.band_count = profile_band_count(profile, self.satellite_list[0], self.spectral_indices)
+        self.bytes_per_pixel = DATA_TYPES[profile["data_type"]]["bytes"]
+        if profile["no_data"] is not None:
+            self.format_options = {'noData': profile["no_data"]}
+
+    def session_band_count(self, year: int, month: int) -> int:
+        """
+        Bands of the month's image, the full profile exports more bands from Landsat 8
+        """
+        satellite = expected_landsat(self.satellite_list, year, month) or self.satellite_list[0]
+        return profile_band_count(get_profile(self.output_profile), satellite, self.spectral_indices)
+
+    def _available_satellites(self, satellite_list: list, date_start: ee.Date, date_end: ee.Date, cloud_threshold: int) -> list:
+        """
+        Keep the satellites that have scenes in the month, in their priority order
+        """
+        try:
+            availability = probe_landsat_availability(
+                landsat_list=satellite_list,
+                date_start=date_start,
+                date_end=date_end,
+                geometry=self.city_asset.city_geometry,
+                cloud_theshold=cloud_threshold)
+        except Exception as e:
+            logger.warning("probe satellites error, try all of them: %s", e)
+            return satellite_list
+        return [satellite for satellite in satellite_list if availability[satellite]]
 
     def calculate(self, year: int, month: int) -> ee.ImageCollection:
         """ 
-        Calculate the LST image series
+        Calculate the LST image series, the ee calls are tagged with the year and month
+        """
+        with ee_call_tags(year=year, month=month):
+            return self._calculate_month(year, month)
+
+    def _calculate_month(self, year: int, month: int) -> ee.ImageCollection:
+        """
+        Find the best image of the month from the available satellites
         """
-        satellite_list = ['L8', 'L5', 'L7', 'L4']
+        satellite_list = list(self.satellite_list)
         date_start = ee.Date.fromYMD(year, month, 1)
         date_end = ee.Date.fromYMD(year, month, self.get_month_length(year, month)).advance(1, 'day')
         use_ndvi = True
         cloud_threshold = 25
-        quality_file_path = self.quality_file_path
         landsat_coll = None
         latitude = self.city_asset.latitude
+        if self.probe_satellites:
+            # satellites without scenes would fail in fetch_best_landsat_image anyway
+            satellite_list = self._available_satellites(satellite_list, date_start, date_end, cloud_threshold)
+            logger.info("available satellites for %s-%02d: %s", year, month, satellite_list)
         for satellite in satellite_list:
             try:
-                landsat_coll, toa_porpotion, sr_porpotion, toa_cloud, sr_cloud , day = fetch_best_landsat_image(
-                    landsat=satellite,
-                    date_start=date_start,
-                    date_end=date_end,
-                    geometry=self.city_asset.city_geometry,
-                    cloud_theshold=cloud_threshold,
-                    cloud_cover_geometry=self.city_asset.urban_geometry,
-                    use_ndvi=use_ndvi,
-                    month=month,
-                    latitude=latitude)
-                with open(quality_file_path, 'a', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([self.city_asset.name, year, month, toa_porpotion, sr_porpotion, toa_cloud, sr_cloud, day])
-                logger.info("success: %s", satellite)
+                with ee_call_tags(satellite=satellite):
+                    landsat_coll, toa_porpotion, sr_porpotion, toa_cloud, sr_cloud , day = fetch_best_landsat_image(
+                        landsat=satellite,
+                        date_start=date_start,
+                        date_end=date_end,
+                        geometry=self.city_asset.city_geometry,
+                        cloud_theshold=cloud_threshold,
+                        cloud_cover_geometry=self.city_asset.urban_geometry,
+                        use_ndvi=use_ndvi,
+                        month=month,
+                        latitude=latitude,
+                        year=year,
+                        spectral_indices=self.spectral_indices,
+                        output_profile=self.output_profile)
+                self.write_quality_record([self.city_asset.name, year, month, toa_porpotion, sr_porpotion, toa_cloud, sr_cloud, day])
+                logger.info("success: %s for %s-%02d", satellite, year, month)
                 break
             except ValueError as ve:
-                logger.info("no data for %s(%s)", satellite, ve)
+                logger.info("no data for %s in %s-%02d(%s)", satellite, year, month, ve)
                 continue
             except Exception as e:
                 logger.error("fetch error: %s\n traceback: %s", e, traceback.format_exc())
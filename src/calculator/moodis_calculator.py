@@ -8,6 +8,7 @@ from ..modis_algorithm import fetch_moodis_image
 logger = logging.getLogger(__name__)
 
 class MoodisCalculator(Calculator):
+    band_count = 4
     def __init__(self, city_asset: CityAsset, quality_file_path: str, missing_file_path: str, check_days_file_path: str):
         super().__init__(city_asset, quality_file_path, missing_file_path, 1200, check_days_file_path)
 
@@ -1,35 +1,185 @@
 """
 Google Drive Manager
 """
+import hashlib
 import logging
+import os
+import re
+import threading
+import time
 from pydrive.auth import GoogleAuth
 from pydrive.drive import GoogleDrive
 
 logger = logging.getLogger(__name__)
+# Earth Engine splits large exports into tiles named <description>-<row>-<column>.tif
+TILE_SUFFIX = re.compile(r'-\d{10}-\d{10}$')
+DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+
+def download_file(file_obj, local_file_path: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE, progress_callback=None, throttle=None) -> int:
+    """
+    Stream a drive file into <local_file_path>.part with HTTP range requests, resuming from the
+    bytes already on disk, then verify the MD5 checksum and rename it to local_file_path.
+
+    Args:
+        file_obj: pydrive file object
+        local_file_path: final path of the file
+        chunk_size: bytes requested per range request
+        progress_callback: called with (downloaded_bytes, total_bytes) after each chunk
+        throttle: called with the requested bytes before each chunk, blocks to cap the bandwidth
+
+    Returns:
+        The size of the downloaded file
+    """
+    if 'downloadUrl' not in file_obj or 'fileSize' not in file_obj:
+        file_obj.FetchMetadata()
+    download_url = file_obj['downloadUrl']
+    total_size = int(file_obj['fileSize'])
+    expected_md5 = file_obj.get('md5Checksum')
+    part_file_path = f"{local_file_path}.part"
+
+    md5 = hashlib.md5()
+    offset = 0
+    if os.path.exists(part_file_path):
+        offset = os.path.getsize(part_file_path)
+        if offset > total_size:
+            os.remove(part_file_path)
+            offset = 0
+        else:
+            with open(part_file_path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    md5.update(block)
+            logger.info("resume downloading %s from %d/%d bytes", file_obj['title'], offset, total_size)
+
+    # one authorized http object per download, httplib2 objects are not thread safe
+    http = file_obj.auth.Get_Http_Object()
+    with open(part_file_path, 'ab') as f:
+        while offset < total_size:
+            end = min(offset + chunk_size, total_size) - 1
+            if throttle is not None:
+                throttle(end - offset + 1)
+            response, content = http.request(download_url, headers={'Range': f'bytes={offset}-{end}'})
+            if response.status == 200 and offset > 0:
+                # the server ignored the range and sent the whole file
+                f.seek(0)
+                f.truncate()
+                md5 = hashlib.md5()
+                offset = 0
+            elif response.status not in (200, 206):
+                raise IOError(f"Cannot download {file_obj['title']}: HTTP {response.status}")
+            if not content:
+                # no progress, the tracker retries the download later
+                raise IOError(f"Cannot download {file_obj['title']}: HTTP {response.status} with an empty body at {offset}/{total_size} bytes")
+            f.write(content)
+            md5.update(content)
+            offset += len(content)
+            if progress_callback is not None:
+                progress_callback(offset, total_size)
+
+    if expected_md5 is not None and md5.hexdigest() != expected_md5:
+        os.remove(part_file_path)
+        raise IOError(f"MD5 checksum mismatch for {file_obj['title']}: {md5.hexdigest()} != {expected_md5}")
+    os.replace(part_file_path, local_file_path)
+    return offset
 
 class DriveManager:
     """
     Manage the drive
     """
-    def __init__(self, credentials_file_path: str, folder_id: str, cloud_folder_name: str):
+    def __init__(self, credentials_file_path: str, folder_id: str, cloud_folder_name: str, listing_ttl: float = 30, full_listing_interval: float = 600):
         self.credentials_file_path = credentials_file_path
         self.gauth = self._init_gauth(credentials_file_path)
         self.drive = GoogleDrive(self.gauth)
         self.cloud_folder_name = cloud_folder_name
         self.folder_id = folder_id
+        self.listing_ttl = listing_ttl
+        self.full_listing_interval = full_listing_interval
+        self.min_listing_interval = 2
+        self.api_calls = 0
+        self.api_calls_saved = 0
+        self._init_file_index()
+
+    def __getstate__(self):
+        # trackers pickle the bound get_fileobj, the lock and the listing cache stay local
+        state = self.__dict__.copy()
+        for key in ('_index_lock', '_file_index', '_listed_at', '_full_listed_at'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_file_index()
 
-    def get_fileobj(self, cloud_file_name):
+    def _init_file_index(self):
         """
-        Get the file object from the drive
+        Initialize the title index of the drive folder
         """
-        file_list = self.drive.ListFile({
-            'q': f"'{self.folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder'",
-            'maxResults': 1000
-        }).GetList()
-        for file_obj in file_list:
-            if (file_obj['title'].startswith(cloud_file_name)):
-                return file_obj
-        return None
+        self._index_lock = threading.Lock()
+        self._file_index = {}
+        self._listed_at = 0
+        self._full_listed_at = 0
+
+    def get_fileobj(self, cloud_file_name, full_listing: bool = False):
+        """
+        Get the file object from the drive, looked up in the cached folder listing.
+        With full_listing the whole folder is listed again first, the incremental
+        listing can miss a file until the next periodic full listing.
+        """
+        with self._index_lock:
+            listed = False
+            if full_listing or time.time() - self._listed_at >= self.listing_ttl:
+                self._refresh_file_index(full_listing)
+                listed = True
+            file_obj = self._file_index.get(cloud_file_name)
+            # a new export may have landed after the last listing
+            if file_obj is None and not listed and time.time() - self._listed_at >= self.min_listing_interval:
+                self._refresh_file_index()
+                listed = True
+                file_obj = self._file_index.get(cloud_file_name)
+            if not listed:
+                self.api_calls_saved += 1
+                logger.debug("drive listing cache hit for %s, %d api calls saved", cloud_file_name, self.api_calls_saved)
+        return file_obj
+
+    def forget_fileobj(self, cloud_file_name):
+        """
+        Remove a deleted file from the cached folder listing
+        """
+        with self._index_lock:
+            self._file_index.pop(cloud_file_name, None)
+
+    def _refresh_file_index(self, full_listing: bool = False):
+        """
+        Refresh the index of the folder listing. Only the files modified since the last listing
+        are fetched, a full listing is done periodically to drop the files deleted elsewhere.
+        """
+        query = f"'{self.folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder'"
+        now = time.time()
+        full_listing = full_listing or now - self._full_listed_at >= self.full_listing_interval
+        if full_listing:
+            file_index = {}
+        else:
+            file_index = self._file_index
+            # step back a little to tolerate clock skew with the drive server
+            modified_after = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self._listed_at - 60))
+            query = f"{query} and modifiedDate > '{modified_after}'"
+        page_num = 0
+        for file_list in self.drive.ListFile({'q': query, 'maxResults': 1000}):
+            page_num += 1
+            for file_obj in file_list:
+                title = file_obj['title'].rsplit('.', 1)[0]
+                index_key = TILE_SUFFIX.sub('', title)
+                if index_key == title:
+                    file_index[index_key] = file_obj
+                else:
+                    # tiles of one export share the key, keep the first one as before
+                    file_index.setdefault(index_key, file_obj)
+        # an empty result still costs one request
+        self.api_calls += max(page_num, 1)
+        self._file_index = file_index
+        self._listed_at = now
+        if full_listing:
+            self._full_listed_at = now
+        logger.debug("drive listing refreshed (full: %s), %d files indexed", full_listing, len(file_index))
 
     def _init_gauth(self, credentials_file_path: str):
         """
@@ -0,0 +1,139 @@
+"""
+Persistent cache of Google Earth Engine getInfo results
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .ee_metrics import measure_ee_call, record_cache_hit, timed_get_info
+
+logger = logging.getLogger(__name__)
+
+# scenes of the last days are still being ingested, results over them are not cached
+RECENT_DAYS = 30
+
+class EECache:
+    """
+    SQLite cache of getInfo results keyed by the serialized ee expression.
+    A read only cache serves the stored results but never writes the cache file.
+    """
+    def __init__(self, cache_file_path: str, ttl: float = 30 * 24 * 3600, max_entries: int = 100000, read_only: bool = False):
+        self.cache_file_path = cache_file_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if read_only:
+            self._connection = None
+            if os.path.exists(cache_file_path):
+                self._connection = sqlite3.connect(f"file:{cache_file_path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        self._connection = sqlite3.connect(cache_file_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ee_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS ee_cache_accessed ON ee_cache (accessed_at)")
+        self._evict()
+
+    def get_info(self, ee_object):
+        """
+        Return the cached getInfo result of the ee object, calling the server on a miss
+        """
+        key = hashlib.sha256(ee_object.serialize().encode('utf-8')).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = None
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT value, created_at FROM ee_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and now - row[1] < self.ttl:
+                self.hits += 1
+                if not self.read_only:
+                    with self._connection:
+                        self._connection.execute("UPDATE ee_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                record_cache_hit()
+                return json.loads(row[0])
+            self.misses += 1
+
+        with measure_ee_call(cache='miss'):
+            value = ee_object.getInfo()
+        if self.read_only:
+            return value
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO ee_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+            if (self.hits + self.misses) % 100 == 0:
+                self._evict()
+        return value
+
+    def _evict(self):
+        """
+        Drop the expired entries, then the least recently used ones above max_entries
+        """
+        with self._connection:
+            self._connection.execute("DELETE FROM ee_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM ee_cache WHERE key IN ("
+                "SELECT key FROM ee_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self) -> dict:
+        """
+        Get the hit and miss counters
+        """
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        """
+        Close the cache database
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+
+_ee_cache = None
+
+def init_cache(cache_file_path: str, ttl: float = 30 * 24 * 3600, max_entries: int = 100000, read_only: bool = False) -> EECache:
+    """
+    Open the process wide cache used by cached_get_info
+    """
+    global _ee_cache
+    _ee_cache = EECache(cache_file_path, ttl, max_entries, read_only)
+    logger.info("ee cache opened at %s (read only: %s)", cache_file_path, read_only)
+    return _ee_cache
+
+def get_cache() -> EECache:
+    """
+    Get the process wide cache, None if it is not initialized
+    """
+    return _ee_cache
+
+def is_recent(data_end: datetime.date) -> bool:
+    """
+    Check if data ending on data_end may still change, i.e. it ends within RECENT_DAYS days
+    """
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    return data_end > today - datetime.timedelta(days=RECENT_DAYS)
+
+def cached_get_info(ee_object, data_end: datetime.date = None):
+    """
+    getInfo through the persistent cache, or directly when no cache is initialized.
+    Only use it for results that do not change over time, e.g. historical scenes:
+    results over data ending on a recent data_end are fetched directly.
+    """
+    if _ee_cache is None or (data_end is not None and is_recent(data_end)):
+        return timed_get_info(ee_object)
+    return _ee_cache.get_info(ee_object)
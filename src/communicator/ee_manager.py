@@ -2,7 +2,9 @@
 Google Earth Engine Manager
 """
 import logging
+import math
 import ee
+from .ee_cache import cached_get_info
 
 logger = logging.getLogger(__name__)
 
@@ -12,40 +14,53 @@ class CityAsset:
     """
     def __init__(self, asset: ee.FeatureCollection, assets_path: str):
         self.asset = asset
-        self.name = asset.getInfo()['features'][0]['properties']['市名']
-        self.code = asset.getInfo()['features'][0]['properties']['市代码']
-        self.city_geometry = ee.Geometry(asset.getInfo()['features'][0]['geometry'])
+        city_feature = ee.Feature(asset.first())
+        city_info = cached_get_info(ee.Dictionary({
+            'feature': city_feature,
+            'latitude': city_feature.geometry().centroid().coordinates().get(1),
+        }))
+        self.name = city_info['feature']['properties']['市名']
+        self.code = city_info['feature']['properties']['市代码']
+        self.city_geometry = ee.Geometry(city_info['feature']['geometry'])
+        self._latitude = city_info['latitude']
+        logger.info("calculated latitude: %s", self._latitude)
         urban_boundary = ee.FeatureCollection(f'{assets_path}/urban_{self.code}')
         self.urban_geometry = self._filter_city_bound(urban_boundary.geometry())
-        self._latitude = None
 
     def _filter_city_bound(self, city_geometry: ee.Geometry):
         """
         city geometry buffer has many scatters. select the largest polygon as the main urban area
         """
-        if city_geometry.type().getInfo() == 'Polygon':
-            return city_geometry
-        geometry_num = city_geometry.geometries().length().getInfo()
-        logger.debug("geometry_num: %s", geometry_num)
-        largest = None
-        max_area = 0
-        for i in range(0,geometry_num):
-            polygon = ee.Geometry.Polygon(city_geometry.coordinates().get(i))
-            area = polygon.area().getInfo()
-            if area > max_area:
-                max_area = area
-                largest = ee.Geometry(polygon)
-        logger.debug("max area is %s", max_area)
-        return largest
+        # a Polygon has itself as the only geometry, so both cases go through the same argmax
+        polygon_list = city_geometry.geometries()
+        area_list = polygon_list.map(lambda polygon: ee.Geometry(polygon).area())
+        largest_index = ee.Array(area_list).argmax().get(0)
+        largest_info = cached_get_info(ee.Dictionary({
+            'geometry': ee.Geometry(polygon_list.get(largest_index)),
+            'geometry_num': polygon_list.length(),
+            'max_area': area_list.get(largest_index),
+        }))
+        logger.debug("geometry_num: %s", largest_info['geometry_num'])
+        logger.debug("max area is %s", largest_info['max_area'])
+        return ee.Geometry(largest_info['geometry'])
+
+    def estimate_pixel_count(self, pixel_resolution: float) -> int:
+        """
+        Estimate the pixels of an image exported over the city bounds at pixel_resolution meters
+        """
+        bounds = cached_get_info(self.city_geometry.bounds())
+        longitudes = [point[0] for point in bounds['coordinates'][0]]
+        latitudes = [point[1] for point in bounds['coordinates'][0]]
+        center_latitude = math.radians((max(latitudes) + min(latitudes)) / 2)
+        width = (max(longitudes) - min(longitudes)) * 111320 * math.cos(center_latitude)
+        height = (max(latitudes) - min(latitudes)) * 110574
+        return math.ceil(width / pixel_resolution) * math.ceil(height / pixel_resolution)
 
     @property
     def latitude(self) -> float:
         """
         Get the latitude of the city
         """
-        if self._latitude is None:
-            self._latitude = self.city_geometry.centroid().coordinates().get(1).getInfo()
-            logger.info("calculated latitude: %s", self._latitude)
         return self._latitude
 
 class EEManager:
@@ -57,6 +72,13 @@ class EEManager:
         self.assets_path = f'projects/{self.project_name}/assets'
         ee.Initialize(project=self.project_name)
 
+    def get_city_names(self) -> list:
+        """
+        Get the names of all the cities in the boundary collection
+        """
+        total_boundary = ee.FeatureCollection(f'{self.assets_path}/YZBboundary')
+        return cached_get_info(total_boundary.aggregate_array('市名'))
+
     def get_city_asset(self, city_name: str) -> CityAsset:
         """
         Get the city asset
@@ -0,0 +1,198 @@
+"""
+Round trip counters and latency histograms of the blocking Google Earth Engine calls
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TAG_NAMES = ('satellite', 'year', 'month')
+# frames of these modules wrap the call, the call site is their caller
+WRAPPER_MODULES = {__name__, f"{__package__}.ee_cache", 'contextlib'}
+ROOT_PACKAGE = __name__.split('.')[0]
+
+_call_tags = contextvars.ContextVar('ee_call_tags', default={})
+
+@contextlib.contextmanager
+def ee_call_tags(**tags):
+    """
+    Tag the ee calls made in the block, e.g. with the satellite, year and month being processed
+    """
+    token = _call_tags.set({**_call_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _call_tags.reset(token)
+
+def _call_site() -> str:
+    """
+    module.function of the first caller outside the wrappers
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get('__name__') in WRAPPER_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    module = frame.f_globals.get('__name__', 'unknown')
+    if module.startswith(f"{ROOT_PACKAGE}."):
+        module = module[len(ROOT_PACKAGE) + 1:]
+    # the qualified name tells the class of a method apart on python 3.11+
+    return f"{module}.{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}"
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+class EEMetrics:
+    """
+    Counters of the ee calls by call site, tags and cache outcome, and latency histograms
+    by call site and satellite, written as a Prometheus text file every flush_interval seconds
+    """
+    call_labels = ('call_site',) + TAG_NAMES + ('cache',)
+    histogram_labels = ('call_site', 'satellite')
+
+    def __init__(self, metrics_file_path: str, flush_interval: float = 30):
+        self.metrics_file_path = metrics_file_path
+        self.flush_interval = flush_interval
+        self._calls = {}
+        self._histograms = {}
+        self._written_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, call_site: str, seconds: float, cache: str = 'none'):
+        """
+        Record one call, cache hits are counted but do not enter the latency histograms
+        """
+        tags = _call_tags.get()
+        key = (call_site,) + tuple(str(tags.get(name, '')) for name in TAG_NAMES) + (cache,)
+        with self._lock:
+            calls = self._calls.setdefault(key, [0, 0.0])
+            calls[0] += 1
+            calls[1] += seconds
+            if cache != 'hit':
+                histogram = self._histograms.setdefault((call_site, str(tags.get('satellite', ''))), [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+                for index, bound in enumerate(LATENCY_BUCKETS):
+                    if seconds <= bound:
+                        histogram[index] += 1
+                        break
+                else:
+                    histogram[len(LATENCY_BUCKETS)] += 1
+                histogram[-1] += seconds
+            flush = time.monotonic() - self._written_at >= self.flush_interval
+        if flush:
+            self.write()
+
+    def summary(self) -> dict:
+        """
+        Calls and seconds by call site
+        """
+        summary = {}
+        with self._lock:
+            for key, (count, seconds) in self._calls.items():
+                entry = summary.setdefault(key[0], {'calls': 0, 'round_trips': 0, 'seconds': 0.0})
+                entry['calls'] += count
+                entry['round_trips'] += count if key[-1] != 'hit' else 0
+                entry['seconds'] += seconds
+        return summary
+
+    def render(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format
+        """
+        lines = [
+            "# HELP gee_ee_calls_total Blocking Earth Engine calls by call site, satellite, year, month and cache outcome",
+            "# TYPE gee_ee_calls_total counter",
+        ]
+        with self._lock:
+            calls = sorted(self._calls.items())
+            histograms = sorted(self._histograms.items())
+        for key, (count, _) in calls:
+            lines.append(f"gee_ee_calls_total{_labels(self.call_labels, key)} {count}")
+        lines += [
+            "# HELP gee_ee_call_seconds_total Seconds spent in Earth Engine calls by call site, satellite, year, month and cache outcome",
+            "# TYPE gee_ee_call_seconds_total counter",
+        ]
+        for key, (_, seconds) in calls:
+            lines.append(f"gee_ee_call_seconds_total{_labels(self.call_labels, key)} {seconds:.6f}")
+        lines += [
+            "# HELP gee_ee_call_duration_seconds Latency of the Earth Engine round trips by call site and satellite",
+            "# TYPE gee_ee_call_duration_seconds histogram",
+        ]
+        for key, histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram):
+                cumulative += count
+                bucket_label = f'le="{bound}"'
+                lines.append(f"gee_ee_call_duration_seconds_bucket{_labels(self.histogram_labels, key, bucket_label)} {cumulative}")
+            lines.append(f"gee_ee_call_duration_seconds_sum{_labels(self.histogram_labels, key)} {histogram[-1]:.6f}")
+            lines.append(f"gee_ee_call_duration_seconds_count{_labels(self.histogram_labels, key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """
+        Replace the metrics file, a reader never sees a partial file
+        """
+        content = self.render()
+        temp_file_path = f"{self.metrics_file_path}.tmp"
+        try:
+            with open(temp_file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_file_path, self.metrics_file_path)
+        except OSError as e:
+            logger.warning("Failed to write ee metrics to %s: %s", self.metrics_file_path, e)
+        with self._lock:
+            self._written_at = time.monotonic()
+
+_ee_metrics = None
+
+def init_metrics(metrics_file_path: str, flush_interval: float = 30) -> EEMetrics:
+    """
+    Open the process wide metrics used by measure_ee_call
+    """
+    global _ee_metrics
+    _ee_metrics = EEMetrics(metrics_file_path, flush_interval)
+    logger.info("ee metrics written to %s", metrics_file_path)
+    return _ee_metrics
+
+def get_metrics() -> EEMetrics:
+    """
+    Get the process wide metrics, None if they are not initialized
+    """
+    return _ee_metrics
+
+def record_cache_hit():
+    """
+    Count a getInfo answered by the cache
+    """
+    if _ee_metrics is not None:
+        _ee_metrics.record(_call_site(), 0.0, 'hit')
+
+@contextlib.contextmanager
+def measure_ee_call(cache: str = 'none'):
+    """
+    Time the blocking ee call made in the block and record it under its call site and tags
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _ee_metrics is not None:
+            _ee_metrics.record(_call_site(), time.perf_counter() - started_at, cache)
+
+def timed_get_info(ee_object):
+    """
+    getInfo recorded in the metrics, for results that must not be cached
+    """
+    with measure_ee_call():
+        return ee_object.getInfo()
@@ -6,6 +6,8 @@ import os
 import csv
 from .drive_manager import DriveManager
 from .ee_manager import EEManager
+from .ee_cache import init_cache
+from .ee_metrics import init_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +15,7 @@ class ProjectManager:
     """
     Total project manager
     """
-    def __init__(self, project_name: str, credentials_file_path: str, collection_path: str, drive_folder_id: str, cloud_folder_name: str, quality_file_path: str, tracker_folder_path: str):
+    def __init__(self, project_name: str, credentials_file_path: str, collection_path: str, drive_folder_id: str, cloud_folder_name: str, quality_file_path: str, tracker_folder_path: str, download_workers: int = 2, download_bandwidth_limit: float = None, export_window: tuple = (None, None), pinned_months: tuple = (), metrics_file_path: str = None):
         self.project_name = project_name
         self.credentials_file_path = credentials_file_path
         self.collection_path = collection_path
@@ -24,18 +26,26 @@ class ProjectManager:
         self.initialized = False
         self.quality_file_path = quality_file_path
         self.tracker_folder_path = tracker_folder_path
+        self.download_workers = download_workers
+        self.download_bandwidth_limit = download_bandwidth_limit
+        self.export_window = export_window
+        self.pinned_months = set(pinned_months)
+        self.metrics_file_path = metrics_file_path or os.path.join(tracker_folder_path, 'ee_metrics.prom')
 
-    def initialize(self) -> bool:
+    def initialize(self, read_only: bool = False) -> bool:
         """
-        Initialize the project
+        Initialize the project, read only (e.g. for planning) reads the ee cache of the earlier runs
+        but writes no local files: no cache entries, metrics or quality file
         """
         if not self._init_cloud():
             logger.error("Failed to initialize cloud")
             return False
-        if not self._init_local():
+        if read_only:
+            init_cache(os.path.join(self.tracker_folder_path, 'ee_cache.sqlite'), read_only=True)
+        elif not self._init_local():
             logger.error("Failed to initialize local")
             return False
-        self.initialized = True
+        self.initialized = not read_only
         return True
 
     def _init_cloud(self) -> bool:
@@ -53,6 +63,8 @@ class ProjectManager:
         Initialize the local connection parameters
         """
         os.makedirs(self.tracker_folder_path, exist_ok=True)
+        init_cache(os.path.join(self.tracker_folder_path, 'ee_cache.sqlite'))
+        init_metrics(self.metrics_file_path)
         os.makedirs(os.path.dirname(self.quality_file_path), exist_ok=True)
         header = ['city', 'year', 'month', 'toa_image_porpotion', 'sr_image_porpotion', 'toa_cloud_ratio', 'sr_cloud_ratio', 'day']
         if not os.path.exists(self.quality_file_path):
@@ -61,8 +73,25 @@ class ProjectManager:
                 writer.writerow(header)
         return True
 
+    def get_city_names(self) -> list:
+        """
+        Get the names of all the cities in the boundary collection
+        """
+        return self.ee_manager.get_city_names()
+
     def get_city_asset(self, city_name: str):
         """
         Get the city asset
         """
         return self.ee_manager.get_city_asset(city_name)
+
+    def monitor_options(self) -> dict:
+        """
+        Get the download and export window options passed to the monitors of the project
+        """
+        return {
+            'download_workers': self.download_workers,
+            'download_bandwidth_limit': self.download_bandwidth_limit,
+            'export_window_floor': self.export_window[0],
+            'export_window_ceiling': self.export_window[1]
+        }
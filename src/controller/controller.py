@@ -1,42 +1,39 @@
 import os
+import csv
 import logging
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from ..monitor import Monitor
+from .export import city_image_prefix
 
 logger = logging.getLogger(__name__)
 
 class Controller(ABC):
-    def __init__(self, project_manager):
+    def __init__(self, project_manager, monitor: Monitor = None, collection_path: str = None):
+        """
+        A shared monitor is started and stopped by its owner (e.g. a multi-city batch),
+        collection_path defaults to the project collection path
+        """
         self.project_manager = project_manager
-        self.monitor = Monitor(project_manager.tracker_folder_path, project_manager.drive_manager, project_manager.collection_path)
-        self.missing_file_path = os.path.join(project_manager.collection_path, "missing.txt")
-        self.exclude_list = self._create_exclude_list(project_manager.collection_path)
-
-    def _create_exclude_list(self, collection_path: str):
-        """
-        Create the exclude list
-        """
-        # find all the files in the collection_path, record year-month pair
-        exclude_list = []
-        os.makedirs(collection_path, exist_ok=True)
-        if os.path.exists(self.missing_file_path):
-            with open(self.missing_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                for line in lines:
-                    year, month = line.strip().split('-')
-                    exclude_list.append(f"{int(year)}-{int(month):02}")
-        else:
+        self.check_days_file_path = None
+        self._check_days_months = None
+        self.collection_path = collection_path or project_manager.collection_path
+        self.owns_monitor = monitor is None
+        if monitor is None:
+            monitor = Monitor(project_manager.tracker_folder_path, project_manager.drive_manager, self.collection_path, **project_manager.monitor_options())
+        self.monitor = monitor
+        self.missing_file_path = os.path.join(self.collection_path, "missing.txt")
+
+    def _create_missing_file(self):
+        """
+        Create the collection folder and its missing month record
+        """
+        os.makedirs(self.collection_path, exist_ok=True)
+        if not os.path.exists(self.missing_file_path):
             with open(self.missing_file_path, 'w', encoding='utf-8') as f:
                 pass
 
-        for file in os.listdir(collection_path):
-            if file.endswith('.tif'):
-                elements = file.split('.')[0].split('-')
-                year = int(elements[1])
-                month = int(elements[2])
-                exclude_list.append(f"{year}-{month:02}")
-        return exclude_list
-
     @abstractmethod
     def create_image_series(self, calculator):
         """
@@ -46,6 +43,103 @@ class Controller(ABC):
             if not self.project_manager.initialize():
                 logger.error("Failed to initialize project manager")
                 return
+        self._create_missing_file()
+
+    def _create_new_session(self, year: int, month: int, calculator) -> bool:
+        """
+        Check if the session of the calculator's city needs to be created
+        """
+        return self.monitor.create_new_session(
+            year = year,
+            month = month,
+            image_prefix = city_image_prefix(calculator.city_asset.name),
+            collection_path = self.collection_path
+        )
+
+    def _month_list(self) -> list:
+        """
+        The (year, month) pairs of the run, read from the check days file
+        """
+        with open(self.check_days_file_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            # Skip the header row
+            next(reader)
+            return [(int(row[0]), int(row[1])) for row in reader]
+
+    def _in_check_days(self, year: int, month: int) -> bool:
+        """
+        Check if the month is listed in the check days file, False without one
+        """
+        if self.check_days_file_path is None:
+            return False
+        if self._check_days_months is None:
+            self._check_days_months = set(Controller._month_list(self))
+        return (year, month) in self._check_days_months
+
+    def _iter_sessions(self, calculator):
+        """
+        Yield the (year, month) pairs that need a new session
+        """
+        for year, month in self._month_list():
+            if self._create_new_session(year, month, calculator):
+                logger.info("Creating new session for %s-%s", year, month)
+                yield year, month
+            else:
+                logger.info("Skipping %s-%s", year, month)
+
+    def plan(self, calculator) -> dict:
+        """
+        Count the sessions of the run by status without exporting anything,
+        the pending ones are those a run would create
+        """
+        image_prefix = city_image_prefix(calculator.city_asset.name)
+        plan = {'total': 0, 'completed': 0, 'tracked': 0, 'missing': 0, 'pending': []}
+        for year, month in self._month_list():
+            status = self.monitor.session_status(year, month, image_prefix, self.collection_path)
+            plan['total'] += 1
+            if status is None:
+                plan['pending'].append((year, month))
+            else:
+                plan[status] += 1
+        return plan
+
+    def _session_priority(self, year: int, month: int) -> tuple:
+        """
+        Export priority of the session, lower first: pinned months, then the months listed in the check days
+        file, then the others, recent years first within each group. A run driven by a check days file only
+        creates listed months, the group ranks them above the months of the year range runs sharing the trackers.
+        """
+        if f"{year}-{month:02}" in self.project_manager.pinned_months:
+            group = 0
+        elif self._in_check_days(year, month):
+            group = 1
+        else:
+            group = 2
+        return (group, -year, month)
+
+    def _stop_monitor(self):
+        """
+        Stop the monitor unless it is shared with other controllers
+        """
+        if self.owns_monitor:
+            self.monitor.stop()
+
+    def _export_sessions(self, sessions, calculator, export_func, max_workers: int = 1):
+        """
+        Calculate the (year, month) sessions on a bounded thread pool and export them in session order
+        """
+        max_workers = max(1, max_workers)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='calculator') as executor:
+            for year, month in sessions:
+                pending.append((year, month, executor.submit(calculator.calculate, year, month)))
+                # keep the look-ahead bounded so calculated months do not pile up before export
+                if len(pending) >= 2 * max_workers:
+                    year, month, future = pending.popleft()
+                    export_func(year = year, month = month, bands = future.result(), priority = self._session_priority(year, month))
+            while pending:
+                year, month, future = pending.popleft()
+                export_func(year = year, month = month, bands = future.result(), priority = self._session_priority(year, month))
 
     def post_process(self):
         """
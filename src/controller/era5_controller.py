@@ -16,8 +16,8 @@ osr.UseExceptions()
 logger = logging.getLogger(__name__)
 
 class Era5Controller(Controller):
-    def __init__(self, project_manager, check_days_file_path):
-        super().__init__(project_manager)
+    def __init__(self, project_manager, check_days_file_path, monitor = None, collection_path = None):
+        super().__init__(project_manager, monitor, collection_path)
         self.check_days_file_path = check_days_file_path
 
     def create_image_series(self, calculator):
@@ -29,24 +29,14 @@ class Era5Controller(Controller):
             cloud_path=self.project_manager.cloud_folder_name,
             monitor=self.monitor,
             missing_file_path=self.missing_file_path,
-            calculator=calculator
+            calculator=calculator,
+            collection_path=self.collection_path
         )
-        with open(self.check_days_file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            # Skip the header row
-            next(reader)
-            for row in reader:
-                year, month, _ = row
-                year_int = int(year)
-                month_int = int(month)
-                if self.monitor.create_new_session(year = year_int, month = month_int, exclude_list = self.exclude_list):
-                    logger.info("Creating new session for %s-%s", year_int, month_int)
-                    export_func(year = year_int, month = month_int)
-                else:
-                    logger.info("Skipping %s-%s", year_int, month_int)
+        for year, month in self._iter_sessions(calculator):
+            export_func(year = year, month = month, priority = self._session_priority(year, month))
 
         logger.info("All done. >_<")
-        self.monitor.stop()
+        self._stop_monitor()
 
     def post_process(self):
         """
@@ -54,7 +44,7 @@ class Era5Controller(Controller):
         generate point features for wind visualization
         """
         logger.info("Starting ERA5 data post-processing...")
-        output_dir = self.project_manager.collection_path
+        output_dir = self.collection_path
         if not os.path.exists(output_dir):
             logger.error("Output directory does not exist: %s", output_dir)
             return
@@ -2,33 +2,52 @@
 Export image
 """
 import logging
+import threading
 from pypinyin import lazy_pinyin as pinyin
 from .image import Image
 from ..communicator.drive_manager import DriveManager
 from ..communicator.ee_manager import CityAsset
 from ..monitor import Monitor
+from ..monitor.monitor import LOWEST_PRIORITY
 
 logger = logging.getLogger(__name__)
+missing_file_lock = threading.Lock()
+
+def city_image_prefix(city_name: str) -> str:
+    """
+    the pinyin city name used as the prefix of image names and city folders
+    """
+    return ''.join(pinyin(city_name))
 
 def export_image(
     drive_manager: DriveManager, city_asset: CityAsset, cloud_path: str,
     monitor: Monitor, year: int, month: int, missing_file_path: str,
-    calculator):
+    calculator, collection_path: str = None, priority: tuple = LOWEST_PRIORITY):
     """
     export the lst image to the drive
     """
-    e_city_name = ''.join(pinyin(city_asset.name))
-    image_name = f"{e_city_name}-{year}-{month:02}"
     bands = calculator.calculate(year, month)
+    return export_bands(drive_manager, city_asset, cloud_path, monitor, year, month, missing_file_path, calculator, bands, collection_path, priority)
+
+def export_bands(
+    drive_manager: DriveManager, city_asset: CityAsset, cloud_path: str,
+    monitor: Monitor, year: int, month: int, missing_file_path: str,
+    calculator, bands, collection_path: str = None, priority: tuple = LOWEST_PRIORITY):
+    """
+    export the already calculated bands to the drive, or record the month as missing
+    """
+    image_name = f"{city_image_prefix(city_asset.name)}-{year}-{month:02}"
     if bands is None:
         logger.info("no bands for %s", image_name)
-        with open(missing_file_path, 'a', encoding='utf-8') as f:
-            f.write(f"{year}-{month:02}\n")
+        with missing_file_lock:
+            with open(missing_file_path, 'a', encoding='utf-8') as f:
+                f.write(f"{year}-{month:02}\n")
+        monitor.add_missing_session(year, month, collection_path)
         return False
-    image = Image(drive_manager, cloud_path, image_name, city_asset.city_geometry, calculator.pixel_resolution)
+    image = Image(drive_manager, cloud_path, image_name, city_asset.city_geometry, calculator.pixel_resolution, calculator.format_options)
     image.add_band(bands)
     try:
-        monitor.export(image)
+        monitor.export(image, collection_path, priority)
     except Exception as e:
         logger.error("error to create export task: %s", e)
         return False
@@ -1,7 +1,9 @@
+import json
 import logging
 import traceback
 import ee
 from ..communicator.drive_manager import DriveManager
+from ..communicator.ee_metrics import measure_ee_call
 
 logger = logging.getLogger(__name__)
 
@@ -9,18 +11,54 @@ class Image:
     """
     The ee image class for exporting image to the drive
     """
-    def __init__(self, drive_manager: DriveManager, cloud_path: str, image_name: str, geometry: ee.Geometry, pixel_resolution: int):
+    def __init__(self, drive_manager: DriveManager, cloud_path: str, image_name: str, geometry: ee.Geometry, pixel_resolution: int, format_options: dict = None):
         self.drive_manager = drive_manager
         self.cloud_path = cloud_path
         self.image_name = image_name
         self.geometry = geometry
         self.pixel_resolution = pixel_resolution
+        self.format_options = format_options
         self.bands = None
+        self._record = None
+
+    def to_record(self) -> str:
+        """
+        JSON of the image and its export parameters, to rebuild it after a restart
+        """
+        if self._record is None:
+            self._record = json.dumps({
+                'cloud_path': self.cloud_path,
+                'image_name': self.image_name,
+                'pixel_resolution': self.pixel_resolution,
+                'format_options': self.format_options,
+                'geometry': self.geometry.serialize(for_cloud_api=False),
+                'bands': self.bands.serialize(for_cloud_api=False),
+            }, ensure_ascii=False)
+        return self._record
+
+    @classmethod
+    def from_record(cls, record: str, drive_manager: DriveManager = None) -> 'Image':
+        """
+        Rebuild the image written by to_record
+        """
+        data = json.loads(record)
+        image = cls(
+            drive_manager,
+            data['cloud_path'],
+            data['image_name'],
+            ee.Geometry(ee.deserializer.fromJSON(data['geometry'])),
+            data['pixel_resolution'],
+            data['format_options'],
+        )
+        image.bands = ee.Image(ee.deserializer.fromJSON(data['bands']))
+        image._record = record
+        return image
 
     def add_band(self, sub_image: ee.Image):
         """
         Add a band to the image
         """
+        self._record = None
         if self.bands is None:
             self.bands = sub_image
             logger.info("create image with band: %s", self.image_name)
@@ -34,6 +72,7 @@ class Image:
         """
         # Define parameters
         try:
+            options = {'formatOptions': self.format_options} if self.format_options else {}
             task = ee.batch.Export.image.toDrive(image=self.bands,
                                     description=self.image_name,
                                     folder=f'{self.cloud_path}',
@@ -41,8 +80,10 @@ class Image:
                                     crs='EPSG:4326',
                                     region=self.geometry,
                                     fileFormat='GeoTIFF',
-                                    maxPixels=1e13)
-            task.start()
+                                    maxPixels=1e13,
+                                    **options)
+            with measure_ee_call():
+                task.start()
             return task
         except Exception as e:
             logger.error("error to export: %s\n traceback: %s", e, traceback.format_exc())
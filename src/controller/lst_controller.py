@@ -1,18 +1,18 @@
 import logging
-import csv
 from typing import Optional
 from functools import partial
-from .export import export_image
+from .export import export_bands
 from .controller import Controller
 
 logger = logging.getLogger(__name__)
 
 class LstController(Controller):
-    def __init__(self, project_manager, year_range: tuple, parser, check_days_file_path: Optional[str] = None):
-        super().__init__(project_manager)
+    def __init__(self, project_manager, year_range: tuple, parser, check_days_file_path: Optional[str] = None, max_workers: int = 1, monitor = None, collection_path: Optional[str] = None):
+        super().__init__(project_manager, monitor, collection_path)
         self.year_range = year_range
         self.parser = parser
         self.check_days_file_path = check_days_file_path
+        self.max_workers = max_workers
 
     def create_image_series(self, calculator):
         """
@@ -20,38 +20,26 @@ class LstController(Controller):
         """
         super().create_image_series(calculator)
         self.monitor.start()
-        export_func = partial(export_image,
+        export_func = partial(export_bands,
             drive_manager=self.project_manager.drive_manager,
             city_asset=calculator.city_asset,
             cloud_path=self.project_manager.cloud_folder_name,
             monitor=self.monitor,
             missing_file_path=self.missing_file_path,
-            calculator=calculator
+            calculator=calculator,
+            collection_path=self.collection_path
         )
-        if self.check_days_file_path is not None:
-            with open(self.check_days_file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                # Skip the header row
-                next(reader)
-                for row in reader:
-                    year, month, _ = row
-                    year_int = int(year)
-                    month_int = int(month)
-                    if self.monitor.create_new_session(year = year_int, month = month_int, exclude_list = self.exclude_list):
-                        logger.info("Creating new session for %s-%s", year_int, month_int)
-                        export_func(year = year_int, month = month_int)
-                    else:
-                        logger.info("Skipping %s-%s", year_int, month_int)
-        else:
-            for year in range(self.year_range[0], self.year_range[1]+1):
-                for month in range(1,13):
-                    if self.monitor.create_new_session(year = year, month = month, exclude_list = self.exclude_list):
-                        logger.info("Creating new session for %s-%s", year, month)
-                        export_func(year = year, month = month)
-                    else:
-                        logger.info("Skipping %s-%s", year, month)
+        self._export_sessions(self._iter_sessions(calculator), calculator, export_func, self.max_workers)
         logger.info("All done. >_<")
-        self.monitor.stop()
+        self._stop_monitor()
+
+    def _month_list(self) -> list:
+        """
+        The (year, month) pairs of the check days file, or every month of the year range
+        """
+        if self.check_days_file_path is not None:
+            return super()._month_list()
+        return [(year, month) for year in range(self.year_range[0], self.year_range[1]+1) for month in range(1,13)]
 
     def post_process(self):
         """
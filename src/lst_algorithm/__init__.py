@@ -1,3 +1,8 @@
-from .landsat_lst import fetch_best_landsat_image
+from .landsat_lst import fetch_best_landsat_image, probe_landsat_availability, expected_landsat
+from .spectral_indices import SPECTRAL_INDICES, DEFAULT_INDICES, check_indices
+from .output_profiles import OUTPUT_PROFILES, DATA_TYPES, get_profile, profile_bands, profile_band_count
 
-__all__ = ['fetch_best_landsat_image']
\ No newline at end of file
+__all__ = [
+    'fetch_best_landsat_image', 'probe_landsat_availability', 'expected_landsat', 'SPECTRAL_INDICES', 'DEFAULT_INDICES', 'check_indices',
+    'OUTPUT_PROFILES', 'DATA_TYPES', 'get_profile', 'profile_bands', 'profile_band_count',
+]
@@ -1,13 +1,19 @@
 import ee
+from functools import lru_cache
+
+# The ASTER products do not depend on the Landsat image, they are built once per process
+# and clipped to each image, so every graph shares the same nodes
 
 
 # Load ASTER emissivity
 # aster = ee.Image("NASA/ASTER_GED/AG100_003")
+@lru_cache(maxsize=None)
 def get_aster_image():
     return ee.Image("NASA/ASTER_GED/AG100_003")
 
 
 # Calculate ASTER FVC from NDVI
+@lru_cache(maxsize=None)
 def get_aster_fvc():
     aster = get_aster_image()
     aster_ndvi = aster.select("ndvi").multiply(0.01)
@@ -20,6 +26,53 @@ def get_aster_fvc():
     return aster_fvc
 
 
+@lru_cache(maxsize=None)
+def get_aster_emiss(band):
+    """
+    ASTER emissivity of a band (e.g., 'emissivity_band10'), unscaled
+    """
+    return get_aster_image().select(band).multiply(0.001)
+
+
+@lru_cache(maxsize=None)
+def get_emiss_bare(band):
+    """
+    Bare ground emissivity of an ASTER band over the whole globe
+    """
+    aster_fvc = get_aster_fvc()
+    return aster_fvc.expression(
+        "(EM - 0.99 * fvc) / (1.0 - fvc)",
+        {"EM": get_aster_emiss(band), "fvc": aster_fvc},
+    )
+
+
+@lru_cache(maxsize=None)
+def get_landsat_emiss(coefficients, bare):
+    """
+    ASTER band 13 and 14 emissivity convolved to a Landsat thermal band.
+
+    Parameters:
+    - coefficients (tuple): (c13, c14, c) of the Landsat constellation
+    - bare (bool): If True, convolve the bare ground emissivity,
+                   if False, the ASTER emissivity as is
+
+    Returns:
+    - ee.Image: Emissivity of the Landsat thermal band over the whole globe
+    """
+    emiss = get_emiss_bare if bare else get_aster_emiss
+    c13, c14, c = coefficients
+    return get_aster_image().expression(
+        "c13 * EM13 + c14 * EM14 + c",
+        {
+            "EM13": emiss("emissivity_band13"),
+            "EM14": emiss("emissivity_band14"),
+            "c13": c13,
+            "c14": c14,
+            "c": c,
+        },
+    )
+
+
 def emiss_bare_band(band, image):
     """
     Calculate bare ground emissivity for a specific ASTER band.
@@ -31,12 +84,7 @@ def emiss_bare_band(band, image):
     Returns:
     - ee.Image: Bare ground emissivity of the specified band
     """
-    aster = get_aster_image()
-    aster_fvc = get_aster_fvc()
-    return image.expression(
-        "(EM - 0.99 * fvc) / (1.0 - fvc)",
-        {"EM": aster.select(band).multiply(0.001), "fvc": aster_fvc},
-    ).clip(image.geometry())
+    return get_emiss_bare(band).clip(image.geometry())
 
 
 # Define functions for each band
@@ -1,5 +1,5 @@
-import ee
 from .aster_bare_emiss import (
+    get_aster_emiss,
     emiss_bare_band10,
     emiss_bare_band11,
     emiss_bare_band12,
@@ -22,16 +22,14 @@ def add_band(dynamic, image):
                 for broad-band emissivity.
     """
 
-    # Get ASTER emissivity
-    aster = ee.Image("NASA/ASTER_GED/AG100_003").clip(image.geometry())
-
     def compute_emissivity(orig_band, emiss_bare_func):
-        orig = aster.select(orig_band).multiply(0.001)
-        dynam = image.expression(
+        # only build the branch selected by dynamic
+        if not dynamic:
+            return get_aster_emiss(orig_band).clip(image.geometry())
+        return image.expression(
             "fvc * 0.99 + (1 - fvc) * em_bare",
             {"fvc": image.select("FVC"), "em_bare": emiss_bare_func(image)},
         )
-        return ee.Image(ee.Algorithms.If(dynamic, dynam, orig))
 
     em10 = compute_emissivity("emissivity_band10", emiss_bare_band10)
     em11 = compute_emissivity("emissivity_band11", emiss_bare_band11)
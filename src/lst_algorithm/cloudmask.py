@@ -1,30 +1,59 @@
 import ee
 import logging
+from ..communicator.ee_cache import cached_get_info
 
 logger = logging.getLogger(__name__)
 
-def calc_cloud_cover(image, whole_geometry, mask_method):
-    counting_image = image.clip(whole_geometry)
-    first_band_name = counting_image.bandNames().get(0)
-    total_counting_pixel = counting_image.reduceRegion(
+# coarse screening: the ratio at COARSE_SCALE meters is assumed within COARSE_TOLERANCE
+# percentage points of the 30 m ratio
+COARSE_SCALE = 300
+COARSE_TOLERANCE = 5
+COARSE_MAX_PIXELS = 1e8
+
+def cloud_pixel_counts(image, whole_geometry, mask_method, scale = 30, best_effort = False):
+    """
+    Count the pixels of the image's first band in the geometry before and after the cloud mask
+    with a single reduction over a two band image.
+
+    Returns:
+    - ee.Dictionary: 'total_pixel' and 'cloud_cover_pixel' (the unmasked pixels) counts
+    """
+    first_band_name = image.bandNames().get(0)
+    counting_image = ee.Image.cat([
+        image.select([first_band_name], ['total_pixel']),
+        mask_method(image).select([first_band_name], ['cloud_cover_pixel']),
+    ])
+    return counting_image.reduceRegion(
         reducer = ee.Reducer.count(),
         geometry = whole_geometry,
-        scale = 30,
-        maxPixels = 1e13
-    ).get(first_band_name).getInfo()
+        scale = scale,
+        maxPixels = COARSE_MAX_PIXELS if best_effort else 1e13,
+        bestEffort = best_effort
+    )
+
+def cloud_cover_ratio(pixel_counts: dict) -> float:
+    """
+    Cloud cover percentage from the fetched pixel counts
+    """
+    total_counting_pixel = pixel_counts['total_pixel']
     if (total_counting_pixel == 0):
         raise ValueError("the image is not cover the urban area")
     # the invalid value pixels are cloud coverd pixels
-    cloud_cover_pixel = mask_method(counting_image).reduceRegion(
-        reducer = ee.Reducer.count(),
-        geometry = whole_geometry,
-        scale = 30,
-        maxPixels = 1e13
-    ).get(first_band_name).getInfo()
+    cloud_cover_pixel = pixel_counts['cloud_cover_pixel']
     result = (1 - float(cloud_cover_pixel / total_counting_pixel)) * 100
     logger.debug("cloud cover ratio is 1 - %s/%s = %s%%", cloud_cover_pixel, total_counting_pixel, result)
     return result
 
+def calc_cloud_cover(image, whole_geometry, mask_method, scale = 30, best_effort = False, data_end = None):
+    """
+    Cloud cover percentage of the image in whole_geometry, both pixel counts come from one getInfo call.
+    A coarser scale with best_effort gives a quick estimate for screening.
+    data_end is the last acquisition day of the image, recent images are not cached.
+    """
+    counting_image = image.clip(whole_geometry)
+    pixel_counts = cached_get_info(cloud_pixel_counts(counting_image, whole_geometry, mask_method, scale, best_effort), data_end)
+    return cloud_cover_ratio(pixel_counts)
+
 def mask_sr(image):
     """
     Apply cloud mask to surface reflectance Landsat image.
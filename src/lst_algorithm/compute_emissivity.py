@@ -1,5 +1,4 @@
-import ee
-from .aster_bare_emiss import emiss_bare_band13, emiss_bare_band14
+from .aster_bare_emiss import get_landsat_emiss
 
 
 def add_emissivity_band(landsat, use_ndvi, image):
@@ -29,39 +28,17 @@ def add_emissivity_band(landsat, use_ndvi, image):
         landsat, 0.0584
     )  # Default to L8 if not found
 
-    # Get ASTER emissivity and convolve to Landsat band
-    emiss_bare = image.expression(
-        "c13 * EM13 + c14 * EM14 + c",
-        {
-            "EM13": emiss_bare_band13(image),
-            "EM14": emiss_bare_band14(image),
-            "c13": ee.Image(c13),
-            "c14": ee.Image(c14),
-            "c": ee.Image(c),
-        },
-    )
-
-    # Compute the dynamic emissivity for Landsat
-    EMd = image.expression(
-        "fvc * 0.99 + (1 - fvc) * em_bare",
-        {"fvc": image.select("FVC"), "em_bare": emiss_bare},
-    )
-
-    # Compute emissivity directly from ASTER without vegetation correction
-    aster = ee.Image("NASA/ASTER_GED/AG100_003").clip(image.geometry())
-    EM0 = image.expression(
-        "c13 * EM13 + c14 * EM14 + c",
-        {
-            "EM13": aster.select("emissivity_band13").multiply(0.001),
-            "EM14": aster.select("emissivity_band14").multiply(0.001),
-            "c13": ee.Image(c13),
-            "c14": ee.Image(c14),
-            "c": ee.Image(c),
-        },
-    )
-
-    # Select which emissivity to output based on user selection
-    EM = EMd if use_ndvi else EM0
+    # Only the emissivity selected by the user enters the graph
+    if use_ndvi:
+        # Compute the dynamic emissivity for Landsat from the ASTER bare ground emissivity
+        emiss_bare = get_landsat_emiss((c13, c14, c), True).clip(image.geometry())
+        EM = image.expression(
+            "fvc * 0.99 + (1 - fvc) * em_bare",
+            {"fvc": image.select("FVC"), "em_bare": emiss_bare},
+        )
+    else:
+        # Compute emissivity directly from ASTER without vegetation correction
+        EM = get_landsat_emiss((c13, c14, c), False).clip(image.geometry())
 
     # Prescribe emissivity of water and snow/ice bodies
     qa = image.select("QA_PIXEL")
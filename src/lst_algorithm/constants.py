@@ -32,6 +32,28 @@ LANDSAT_BANDS = {
     },
 }
 
+# First and last (year, month) of the Landsat archives, None while a satellite is still imaging
+LANDSAT_PERIODS = {
+    "L4": ((1982, 8), (1993, 12)),
+    "L5": ((1984, 3), (2011, 11)),
+    "L7": ((1999, 5), None),
+    "L8": ((2013, 3), None),
+    "L9": ((2021, 10), None),
+}
+
+# Surface reflectance bands of the Landsat satellites by spectral role
+SR_BAND_ROLES = {
+    "L4": {"blue": "SR_B1", "green": "SR_B2", "red": "SR_B3", "nir": "SR_B4", "swir1": "SR_B5"},
+    "L5": {"blue": "SR_B1", "green": "SR_B2", "red": "SR_B3", "nir": "SR_B4", "swir1": "SR_B5"},
+    "L7": {"blue": "SR_B1", "green": "SR_B2", "red": "SR_B3", "nir": "SR_B4", "swir1": "SR_B5"},
+    "L8": {"blue": "SR_B2", "green": "SR_B3", "red": "SR_B4", "nir": "SR_B5", "swir1": "SR_B6"},
+    "L9": {"blue": "SR_B2", "green": "SR_B3", "red": "SR_B4", "nir": "SR_B5", "swir1": "SR_B6"},
+}
+
+# Scale and offset of the Collection 2 surface reflectance bands
+SR_SCALE = 0.0000275
+SR_OFFSET = -0.2
+
 # Coefficients for the Statistical Mono-Window Algorithm
 SMW_COEFFICIENTS = {
     "L4": [
@@ -1,19 +1,20 @@
 import ee
 import os
 import logging
+import calendar
+import datetime
 from .ncep_tpw import add_tpw_band
-from .cloudmask import mask_sr, mask_toa, calc_cloud_cover
+from .cloudmask import mask_sr, mask_toa, calc_cloud_cover, cloud_pixel_counts, cloud_cover_ratio, COARSE_SCALE, COARSE_TOLERANCE
 from .compute_metadata import add_index_func
-from .compute_ndvi import add_ndvi_band
-from .compute_fvc import add_fvc_band
+from .spectral_indices import add_spectral_indices, check_indices, DEFAULT_INDICES
+from .output_profiles import apply_output_profile, get_profile
 from .compute_emissivity import add_emissivity_band
 from .compute_elevation import add_elevation_band
 from .smw_algorithm import add_lst_band
 from .scen_algorithm import add_airt_band
-from .compute_ndbi import add_ndbi_band
-from .compute_evi import add_evi_band
-from .compute_green import add_green_band
-from .constants import LANDSAT_BANDS
+from .constants import LANDSAT_BANDS, LANDSAT_PERIODS
+from ..communicator.ee_cache import cached_get_info
+from ..communicator.ee_metrics import timed_get_info
 
 logger = logging.getLogger(__name__)
 logging.getLogger('ee').setLevel(logging.WARNING)
@@ -21,20 +22,135 @@ logging.getLogger('ee').setLevel(logging.WARNING)
 # Set the path to the service account key file
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "../.gee-sa-priv-key.json"
 
-def minimum_cloud_cover(image_collection, geometry, cloud_cover_geometry, mask_method, date_start):
+COVER_THRESHOLD = 0.8
+
+def _score_candidates(image_collection, geometry, cloud_cover_geometry, mask_method, total_area,
+                      index_list = None, scale = 30, best_effort = False):
     """
-    Returns the mosaiced image with the minimum cloud cover in the cloud_cover_geometry
+    Build one feature per acquisition day (INDEX) with the image number, the covered area
+    and the pixel counts of the cloud cover geometry at the given scale, computed in a
+    single server-side graph. index_list restricts the days scored.
     """
-    total_area = geometry.area().getInfo()
-    add_index = add_index_func(date_start)
-    image_collection = image_collection.map(add_index)
-    index_list = list(set(image_collection.aggregate_array('INDEX').getInfo()))
-    best_image = None
+    def score(index):
+        image_condidate_list = image_collection.filter(ee.Filter.eq('INDEX', index))
+        geometries_feature = ee.FeatureCollection(image_condidate_list.map(
+            lambda image: ee.Feature(image.geometry())
+        ))
+        raw_geometry = geometries_feature.union().geometry()
+        image_area = raw_geometry.intersection(geometry).area()
+        counting_image = image_condidate_list.mosaic().clip(geometry).clip(cloud_cover_geometry)
+        pixel_counts = cloud_pixel_counts(counting_image, cloud_cover_geometry, mask_method, scale, best_effort)
+        # only reduce the days that cover enough of the geometry
+        enough_cover = image_area.divide(total_area).gte(COVER_THRESHOLD)
+        return ee.Feature(None, {
+            'INDEX': index,
+            'image_num': image_condidate_list.size(),
+            'image_area': image_area,
+        }).set(ee.Dictionary(ee.Algorithms.If(enough_cover, pixel_counts, ee.Dictionary({}))))
+
+    if index_list is None:
+        index_list = image_collection.aggregate_array('INDEX').distinct()
+    return ee.FeatureCollection(ee.List(index_list).map(score))
+
+def _fetch_candidates(image_collection, geometry, cloud_cover_geometry, mask_method,
+                      index_list = None, scale = 30, best_effort = False, data_end = None, keep_unmeasured = False):
+    """
+    Fetch the candidate scores with a single getInfo call, cached unless data_end is recent.
+    A day without pixels in the cloud_cover_geometry is dropped, or kept with a None cloud
+    cover if keep_unmeasured, e.g. a coarse reduction can miss a small geometry.
+
+    Returns:
+    - list: dicts of the days covering enough of the geometry, with their index,
+      coverage proportion and cloud cover ratio in the cloud_cover_geometry
+    """
+    total_area = geometry.area()
+    scores = cached_get_info(ee.Dictionary({
+        'total_area': total_area,
+        'candidates': _score_candidates(image_collection, geometry, cloud_cover_geometry, mask_method, total_area,
+                                        index_list, scale, best_effort),
+    }), data_end)
+    total_area = scores['total_area']
+    candidates = []
+    for feature in scores['candidates']['features']:
+        properties = feature['properties']
+        index = properties['INDEX']
+        image_num = properties['image_num']
+        if image_num == 0:
+            continue
+        image_area = properties['image_area']
+        porpotion = image_area / total_area
+        logger.debug('index %s has %s images, the proportion is %s / %s = %s', index, image_num, image_area, total_area, porpotion)
+        if (porpotion < COVER_THRESHOLD):
+            continue
+        try:
+            couning_area_cloud_cover = cloud_cover_ratio(properties)
+        except ValueError as e:
+            if not keep_unmeasured:
+                logger.warning("%s", e)
+                continue
+            logger.debug("index %s is not measured at %s m: %s", index, scale, e)
+            couning_area_cloud_cover = None
+        candidates.append({
+            'index': index,
+            'porpotion': porpotion,
+            'cloud_cover': couning_area_cloud_cover,
+        })
+    return candidates
+
+def _pick_best(candidates):
+    """
+    The candidate with the minimum cloud cover, the earliest day on ties,
+    as the day by day search keeps the first strict minimum
+    """
+    candidates = [candidate for candidate in candidates if candidate['cloud_cover'] < 100]
+    if not candidates:
+        return None, 0, 100
+    best = min(candidates, key=lambda candidate: (candidate['cloud_cover'], candidate['index']))
+    return best['index'], best['porpotion'], best['cloud_cover']
+
+def _minimum_cloud_cover_batched(image_collection, geometry, cloud_cover_geometry, mask_method, data_end = None):
+    """
+    Pick the best day from the 30 m scores of every candidate day fetched with a single getInfo call
+    """
+    return _pick_best(_fetch_candidates(image_collection, geometry, cloud_cover_geometry, mask_method, data_end = data_end))
+
+def _minimum_cloud_cover_screened(image_collection, geometry, cloud_cover_geometry, mask_method, data_end = None):
+    """
+    Pick the best day in two getInfo calls: rank every candidate day with a coarse
+    COARSE_SCALE reduction, then run the exact 30 m reduction on the days it cannot rule out.
+
+    A day whose coarse ratio minus COARSE_TOLERANCE is above the smallest coarse ratio plus
+    COARSE_TOLERANCE cannot be the best one and is pruned, every other day is reduced at 30 m,
+    so the pick is the same as the exact search as long as the coarse error stays within the tolerance.
+    A day the coarse reduction has no pixels for cannot be ruled out and is reduced at 30 m too.
+    """
+    coarse_candidates = _fetch_candidates(image_collection, geometry, cloud_cover_geometry, mask_method,
+                                          scale = COARSE_SCALE, best_effort = True, data_end = data_end,
+                                          keep_unmeasured = True)
+    if not coarse_candidates:
+        return None, 0, 100
+    measured = [candidate['cloud_cover'] for candidate in coarse_candidates if candidate['cloud_cover'] is not None]
+    best_upper_bound = min(measured, default = 100) + COARSE_TOLERANCE
+    index_list = sorted(
+        candidate['index'] for candidate in coarse_candidates
+        if candidate['cloud_cover'] is None or candidate['cloud_cover'] - COARSE_TOLERANCE <= best_upper_bound
+    )
+    logger.debug("screened days %s out of %s", index_list, sorted(candidate['index'] for candidate in coarse_candidates))
+    return _pick_best(_fetch_candidates(image_collection, geometry, cloud_cover_geometry, mask_method, index_list,
+                                        data_end = data_end))
+
+def _minimum_cloud_cover_serial(image_collection, geometry, cloud_cover_geometry, mask_method, data_end = None):
+    """
+    Pick the best day by scoring every candidate day with its own getInfo calls
+    """
+    total_area = cached_get_info(geometry.area())
+    index_list = sorted(set(timed_get_info(image_collection.aggregate_array('INDEX'))))
+    best_index = None
     best_cloud_cover = 100
-    porpotion = 0
+    best_porpotion = 0
     for index in index_list:
         image_condidate_list = image_collection.filter(ee.Filter.eq('INDEX',index))
-        image_num = image_condidate_list.size().getInfo()
+        image_num = timed_get_info(image_condidate_list.size())
         if image_num == 0:
             continue
         geometries_feature = image_condidate_list.map(
@@ -43,31 +159,114 @@ def minimum_cloud_cover(image_collection, geometry, cloud_cover_geometry, mask_m
         geometries_feature = ee.FeatureCollection(geometries_feature)
         raw_geometry = geometries_feature.union().geometry()
         intersect = raw_geometry.intersection(geometry)
-        image_area = intersect.area().getInfo()
+        image_area = cached_get_info(intersect.area(), data_end)
         porpotion = image_area / total_area
         logger.debug('index %s has %s images, the proportion is %s / %s = %s', index, image_num, image_area, total_area, porpotion)
-        if (porpotion < 0.8):
+        if (porpotion < COVER_THRESHOLD):
             continue
         mosaiced_image = image_condidate_list.mosaic().clip(geometry)
         try:
-            couning_area_cloud_cover = calc_cloud_cover(mosaiced_image, cloud_cover_geometry, mask_method)
+            couning_area_cloud_cover = calc_cloud_cover(mosaiced_image, cloud_cover_geometry, mask_method, data_end = data_end)
         except ValueError as e:
             logger.warning("%s", e)
             continue
         if couning_area_cloud_cover < best_cloud_cover:
             best_cloud_cover = couning_area_cloud_cover
-            construct_date = ee.Date(date_start).advance(index, 'day').millis()
-            best_image = mask_method(mosaiced_image).set('system:time_start', construct_date)
+            best_porpotion = porpotion
+            best_index = index
+    return best_index, best_porpotion, best_cloud_cover
 
-    if best_image is None:
+def minimum_cloud_cover(image_collection, geometry, cloud_cover_geometry, mask_method, date_start, batched = True, screened = False, data_end = None):
+    """
+    Returns the mosaiced image with the minimum cloud cover in the cloud_cover_geometry,
+    its coverage proportion, its cloud cover ratio and its day of month.
+
+    With batched set, all candidate days are scored in one server-side FeatureCollection
+    and fetched with a single getInfo call instead of several calls per day.
+    With screened set too, the days are ranked at a coarse scale first and only the ones
+    within COARSE_TOLERANCE of the best are reduced at 30 m. It is opt-in until the tolerance
+    is checked against the exact picks on real scenes.
+    The scores are cached unless data_end, the last day of the date range, is recent.
+    """
+    add_index = add_index_func(date_start)
+    image_collection = image_collection.map(add_index)
+    if batched and screened:
+        best_index, porpotion, best_cloud_cover = _minimum_cloud_cover_screened(image_collection, geometry, cloud_cover_geometry, mask_method, data_end)
+    elif batched:
+        best_index, porpotion, best_cloud_cover = _minimum_cloud_cover_batched(image_collection, geometry, cloud_cover_geometry, mask_method, data_end)
+    else:
+        best_index, porpotion, best_cloud_cover = _minimum_cloud_cover_serial(image_collection, geometry, cloud_cover_geometry, mask_method, data_end)
+
+    if best_index is None:
         raise ValueError("No image found for the specified date range.")
-    return best_image, porpotion, best_cloud_cover, index + 1
+    mosaiced_image = image_collection.filter(ee.Filter.eq('INDEX', best_index)).mosaic().clip(geometry)
+    construct_date = ee.Date(date_start).advance(best_index, 'day').millis()
+    best_image = mask_method(mosaiced_image).set('system:time_start', construct_date)
+    return best_image, porpotion, best_cloud_cover, best_index + 1
+
+def load_landsat_collections(landsat, date_start, date_end, geometry, cloud_theshold):
+    """
+    Load the TOA and SR collections of a Landsat constellation filtered by date, bounds and scene cloud cover
+    """
+    collection_dict = LANDSAT_BANDS[landsat]
+    # Load TOA Radiance/Reflectance
+    landsat_toa = (
+        ee.ImageCollection(collection_dict["TOA"])
+        .filterDate(date_start, date_end)
+        .filterBounds(geometry)
+        .filter(ee.Filter.lessThan('CLOUD_COVER', cloud_theshold))
+    )
+    landsat_sr = (
+        ee.ImageCollection(collection_dict["SR"])
+        .filterDate(date_start, date_end)
+        .filterBounds(geometry)
+        .filter(ee.Filter.lessThan('CLOUD_COVER', cloud_theshold))
+    )
+    return landsat_toa, landsat_sr
+
+def expected_landsat(landsat_list, year, month):
+    """
+    First constellation of the list whose archive covers the month, the one its image is
+    most likely fetched from. None if no archive covers it.
+    """
+    for landsat in landsat_list:
+        first_month, last_month = LANDSAT_PERIODS[landsat]
+        if first_month <= (year, month) and (last_month is None or (year, month) <= last_month):
+            return landsat
+    return None
+
+def probe_landsat_availability(landsat_list, date_start, date_end, geometry, cloud_theshold):
+    """
+    Check which Landsat constellations have both TOA and SR scenes in the date range.
+
+    Only the scene metadata is queried, and all constellations are probed together on the
+    server with a single getInfo call.
+
+    Returns:
+    - dict: constellation ID -> True if fetch_best_landsat_image has candidate scenes to work with
+    """
+    scene_counts = {}
+    for landsat in landsat_list:
+        landsat_toa, landsat_sr = load_landsat_collections(landsat, date_start, date_end, geometry, cloud_theshold)
+        scene_counts[landsat] = ee.List([landsat_toa.size(), landsat_sr.size()])
+    scene_counts = timed_get_info(ee.Dictionary(scene_counts))
+    availability = {}
+    for landsat in landsat_list:
+        toa_num, sr_num = scene_counts[landsat]
+        logger.debug("%s has %s toa and %s sr scenes", landsat, toa_num, sr_num)
+        availability[landsat] = toa_num > 0 and sr_num > 0
+    return availability
 
 def fetch_best_landsat_image(
     landsat,date_start,date_end,geometry,cloud_theshold,cloud_cover_geometry,
     use_ndvi = True,
     month = None,
     latitude = None,
+    batched = True,
+    screened = False,
+    year = None,
+    spectral_indices = None,
+    output_profile = None,
 ):
     """
     Fetches the best Landsat image(mimum cloud cover in cloud_cover_geometry)
@@ -80,6 +279,11 @@ def fetch_best_landsat_image(
     - cloud_theshold: Cloud cover threshold
     - cloud_cover_geometry: Area of interest for cloud cover
     - use_ndvi: Boolean indicating whether to use NDVI
+    - batched: Boolean indicating whether to score the candidate days in a single getInfo call
+    - screened: Boolean indicating whether to screen the candidate days at a coarse scale before the 30 m reduction
+    - year: Year of the date range, with month it gives the acquisition day of the TPW window client side
+    - spectral_indices: Names of the spectral indices to output (default: DEFAULT_INDICES)
+    - output_profile: Name of the OUTPUT_PROFILES selecting the exported bands and their data type (default: 'full')
 
     Returns:
     - landsatLST: Processed Landsat collection with LST
@@ -91,29 +295,25 @@ def fetch_best_landsat_image(
             Valid options are: {list(LANDSAT_BANDS.keys())}"
         )
 
-    collection_dict = LANDSAT_BANDS[landsat]
+    profile = get_profile(output_profile)
+    spectral_indices = check_indices(DEFAULT_INDICES if spectral_indices is None else spectral_indices)
+    if not profile["indices"]:
+        spectral_indices = ()
 
-    # Load TOA Radiance/Reflectance
-    landsat_toa = (
-        ee.ImageCollection(collection_dict["TOA"])
-        .filterDate(date_start, date_end)
-        .filterBounds(geometry)
-        .filter(ee.Filter.lessThan('CLOUD_COVER', cloud_theshold))
-    )
+    # the scenes of a month that ended recently may still be ingested, its scores are not cached
+    data_end = None
+    if year is not None and month is not None:
+        data_end = datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+    collection_dict = LANDSAT_BANDS[landsat]
+    landsat_toa, landsat_sr = load_landsat_collections(landsat, date_start, date_end, geometry, cloud_theshold)
     if landsat_toa is None:
         raise ValueError("No toa images found for the specified date range.")
-
-    landsat_sr = (
-        ee.ImageCollection(collection_dict["SR"])
-        .filterDate(date_start, date_end)
-        .filterBounds(geometry)
-        .filter(ee.Filter.lessThan('CLOUD_COVER', cloud_theshold))
-    )
     if landsat_sr is None:
         raise ValueError("No sr images found for the specified date range.")
 
     try:
-        best_landsat_toa, toa_porpotion, toa_cloud_cover, toa_date = minimum_cloud_cover(landsat_toa, geometry, cloud_cover_geometry, mask_toa, date_start)
+        best_landsat_toa, toa_porpotion, toa_cloud_cover, toa_date = minimum_cloud_cover(landsat_toa, geometry, cloud_cover_geometry, mask_toa, date_start, batched, screened, data_end)
     except ValueError as ve:
         raise ValueError(f"TOA: {ve}") from ve
     except Exception as e:
@@ -122,7 +322,7 @@ def fetch_best_landsat_image(
 
     # Load Surface Reflectance collection for NDVI  and apply transformations
     try:
-        best_landsat_sr, sr_porpotion, sr_cloud_cover, sr_date = minimum_cloud_cover(landsat_sr, geometry, cloud_cover_geometry, mask_sr, date_start)
+        best_landsat_sr, sr_porpotion, sr_cloud_cover, sr_date = minimum_cloud_cover(landsat_sr, geometry, cloud_cover_geometry, mask_sr, date_start, batched, screened, data_end)
     except ValueError as ve:
         raise ValueError(f"SR: {ve}") from ve
     except Exception as e:
@@ -132,33 +332,17 @@ def fetch_best_landsat_image(
     if toa_date != sr_date:
         logger.warning("TOA and SR timestamps do not match. TOA: %s, SR: %s", toa_date, sr_date)
 
+    # the emissivity needs the FVC even when it is not exported
+    computed_indices = spectral_indices + (("FVC",) if use_ndvi and "FVC" not in spectral_indices else ())
     try:
-        best_landsat_sr = add_ndvi_band(landsat, best_landsat_sr)
-        best_landsat_sr = add_fvc_band(landsat, best_landsat_sr)
-    except Exception as e:  
-        logger.error("Error adding NDVI, FVC bands: %s", e)
-        raise e
-
-    try:
-        best_landsat_sr = add_ndbi_band(landsat, best_landsat_sr)
-    except Exception as e:
-        logger.error("Error adding NDBI band: %s", e)
-        raise e
-
-    try:
-        best_landsat_sr = add_evi_band(landsat, best_landsat_sr)
-    except Exception as e:
-        logger.error("Error adding EVI band: %s", e)
-        raise e
-
-    try:
-        best_landsat_sr = add_green_band(landsat, best_landsat_sr)
+        best_landsat_sr = add_spectral_indices(landsat, best_landsat_sr, computed_indices)
     except Exception as e:
-        logger.error("Error adding Green band: %s", e)
+        logger.error("Error adding spectral index bands: %s", e)
         raise e
 
     try:
-        best_landsat_sr = add_tpw_band(best_landsat_sr)
+        sr_day = f"{year}-{month:02}-{sr_date:02}" if year is not None and month is not None else None
+        best_landsat_sr = add_tpw_band(best_landsat_sr, sr_day)
     except Exception as e:
         logger.error("Error adding TPW band: %s", e)
         raise e
@@ -177,7 +361,7 @@ def fetch_best_landsat_image(
 
     # Combine collections
     tir = collection_dict["TIR"]
-    visw = collection_dict["VISW"] + ["NDVI", "FVC", "NDBI", "EVI", "Green", "EM", "TPW", "TPWpos", "ELEVATION"]
+    visw = collection_dict["VISW"] + list(spectral_indices) + ["EM", "TPW", "TPWpos", "ELEVATION"]
     try:
         best_landsat = best_landsat_sr.select(visw).addBands(best_landsat_toa.select(tir))
     except Exception as e:
@@ -188,7 +372,7 @@ def fetch_best_landsat_image(
     #landsat_lst = landsat_all.map(lambda image: add_lst_band(landsat, image))
     try:
         best_landsat_lst = add_lst_band(landsat, best_landsat)
-        best_landsat_lst = add_airt_band(landsat, best_landsat, month, latitude)
+        best_landsat_lst = add_airt_band(landsat, best_landsat_lst, month, latitude)
     except Exception as e:
         logger.error("Error adding LST band: %s", e)
         raise e
@@ -197,6 +381,5 @@ def fetch_best_landsat_image(
         logger.error("No processed LST images found for the specified date range.")
         raise ValueError("No processed LST images found for the specified date range.")
 
-    # align all bands to the same value type
-    best_landsat_lst = best_landsat_lst.select(best_landsat_lst.bandNames()).toFloat()
+    best_landsat_lst = apply_output_profile(best_landsat_lst, profile, spectral_indices)
     return best_landsat_lst, toa_porpotion, sr_porpotion, toa_cloud_cover, sr_cloud_cover, toa_date
@@ -1,61 +1,97 @@
 import ee
 
+# NCEP reanalysis gives the TPW every 6 hours
+NCEP_STEP_HOURS = 6
 
-def add_tpw_band(image):
+
+def get_tpw_collection(date):
     """
-    Add total precipitable water values and index for
-    the LUT of SMW algorithm coefficients to the image.
+    NCEP TPW images around a day, with the 6 hour steps before and after it,
+    so the two closest images of any time of the day enclose it.
 
     Parameters:
-    - image (ee.Image): Image for which to interpolate the TPW data.
-      Needs the 'system:time_start' image property.
+    - date (ee.Date): Start of the day
 
     Returns:
-    - ee.Image: Image with added 'TPW' and 'TPWpos' bands.
+    - ee.ImageCollection: 'pr_wtr' images of the day
     """
-    date = image.date()
-    date1 = date
-    date2 = date1.advance(3, 'day')
+    return (
+        ee.ImageCollection("NCEP_RE/surface_wv")
+        .filterDate(
+            date.advance(-NCEP_STEP_HOURS, "hour"),
+            date.advance(1, "day").advance(NCEP_STEP_HOURS, "hour"),
+        )
+        .select("pr_wtr")
+    )
+
 
+def closest_tpw(date, tpw_collection):
+    """
+    The two NCEP TPW images closest to a date and their linear interpolation weights,
+    which add up to one. A single image gets the whole weight, and without any image
+    the TPW is -999.
+
+    Parameters:
+    - date (ee.Date): Acquisition time
+    - tpw_collection (ee.ImageCollection): 'pr_wtr' images around the date
+
+    Returns:
+    - tuple: (tpw1, tpw2, weight1, weight2), the closest image first
+    """
     def datedist(img):
         return img.set(
             "DateDist",
-            ee.Number(img.date().millis()).subtract(date.millis()).abs(),
+            ee.Number(img.get("system:time_start")).subtract(date.millis()).abs(),
         )
 
-    tpw_collection = (
-        ee.ImageCollection("NCEP_RE/surface_wv")
-        .filterDate(date1, date2)
-        .map(datedist)
-    )
-
-    closest = tpw_collection.sort("DateDist").toList(2)
+    closest = tpw_collection.map(datedist).sort("DateDist").toList(2)
+    closest_num = closest.size()
 
-    tpw1 = (
-        ee.Image(closest.get(0)).select("pr_wtr")
-        if closest.size()
-        else ee.Image.constant(-999.0)
-    )
-    tpw2 = (
-    ee.Image(closest.get(1)).select("pr_wtr")
-        if ee.Number(closest.size()).gt(1)
-        else tpw1
+    # the conditions are server side, they must go through ee.Algorithms.If
+    tpw1 = ee.Image(
+        ee.Algorithms.If(
+            closest_num.eq(0),
+            ee.Image.constant(-999.0),
+            ee.Image(closest.get(0)),
+        )
     )
+    tpw2 = ee.Image(ee.Algorithms.If(closest_num.lt(2), tpw1, ee.Image(closest.get(1))))
 
-    time1 = (
-        ee.Number(tpw1.get("DateDist")).divide(21600000)
-        if ee.Number(closest.size()).gt(0)
-        else ee.Number(1.0)
+    # each image is weighted by the distance of the other one
+    dist1 = ee.Number(tpw1.get("DateDist"))
+    dist2 = ee.Number(tpw2.get("DateDist"))
+    weight1 = ee.Number(
+        ee.Algorithms.If(closest_num.lt(2), 1.0, dist2.divide(dist1.add(dist2)))
     )
-    time2 = (
-        ee.Number(tpw2.get("DateDist")).divide(21600000)
-            if ee.Number(closest.size()).gt(1)
-            else ee.Number(0.0)
+    weight2 = ee.Number(1.0).subtract(weight1)
+    return tpw1, tpw2, weight1, weight2
+
+
+def add_tpw_band(image, day = None):
+    """
+    Add total precipitable water values and index for
+    the LUT of SMW algorithm coefficients to the image.
+
+    Parameters:
+    - image (ee.Image): Image for which to interpolate the TPW data.
+      Needs the 'system:time_start' image property.
+    - day (str): Acquisition day of the image as 'YYYY-MM-DD', when known client side
+
+    Returns:
+    - ee.Image: Image with added 'TPW' and 'TPWpos' bands.
+    """
+    date = image.date()
+    if day is not None:
+        tpw_collection = get_tpw_collection(ee.Date(day))
+    else:
+        tpw_collection = get_tpw_collection(
+            ee.Date.fromYMD(date.get("year"), date.get("month"), date.get("day"))
         )
 
+    tpw1, tpw2, weight1, weight2 = closest_tpw(date, tpw_collection)
     tpw = tpw1.expression(
-        "tpw1*time2+tpw2*time1",
-        {"tpw1": tpw1, "time1": time1, "tpw2": tpw2, "time2": time2},
+        "tpw1*weight1+tpw2*weight2",
+        {"tpw1": tpw1, "weight1": weight1, "tpw2": tpw2, "weight2": weight2},
     ).clip(image.geometry())
 
     pos = tpw.expression(
@@ -0,0 +1,143 @@
+import ee
+from .spectral_indices import SPECTRAL_INDICES
+from .constants import LANDSAT_BANDS
+
+# Bands and data type of the exported LST images, by profile name.
+# - bands: bands exported in this order, None for every band
+# - indices: whether the selected spectral indices are exported too
+# - data_type: pixel type of the exported file, a GeoTIFF has a single one
+# - packing: (scale, offset) of the packed bands, value = stored * scale + offset,
+#   the spectral indices use index_packing
+# - no_data: stored value of the masked pixels, outside of the packed range
+OUTPUT_PROFILES = {
+    # every band as float, the original output
+    "full": {
+        "bands": None,
+        "indices": True,
+        "data_type": "float",
+        "packing": {},
+        "no_data": None,
+    },
+    # LST in centi-Kelvin and the Landsat QA bits
+    "lst-min": {
+        "bands": ("LST", "QA_PIXEL"),
+        "indices": False,
+        "data_type": "uint16",
+        "packing": {"LST": (0.01, 0.0)},
+        "no_data": 0,
+    },
+    # LST in centi-Kelvin above 0 °C and the spectral indices in 1e-4
+    "indices": {
+        "bands": ("LST",),
+        "indices": True,
+        "data_type": "int16",
+        "packing": {"LST": (0.01, 273.15)},
+        "index_packing": (0.0001, 0.0),
+        "no_data": -32768,
+    },
+}
+
+DEFAULT_PROFILE = "full"
+
+# bands of a full image next to the reflectance, spectral index and thermal bands
+AUXILIARY_BANDS = ("EM", "TPW", "TPWpos", "ELEVATION", "LST")
+# air temperature bands, only computed for Landsat 8
+AIRT_BANDS = ("AIRT", "AIR_UPSTREAM", "AIR_DOWNSTREAM", "TAU_SW")
+
+# range of the stored values and bytes per pixel of the data types,
+# the lowest value is left to no_data
+DATA_TYPES = {
+    "float": {"range": None, "bytes": 4, "cast": "toFloat"},
+    "uint16": {"range": (1, 65535), "bytes": 2, "cast": "toUint16"},
+    "int16": {"range": (-32767, 32767), "bytes": 2, "cast": "toInt16"},
+}
+
+
+def get_profile(name):
+    """
+    Get an output profile by name.
+
+    Parameters:
+    - name (str): Name of the profile, DEFAULT_PROFILE if None
+
+    Returns:
+    - dict: The profile
+    """
+    name = DEFAULT_PROFILE if name is None else name
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(
+            f"Invalid output profile: {name}. \
+            Valid options are: {list(OUTPUT_PROFILES.keys())}"
+        )
+    return OUTPUT_PROFILES[name]
+
+
+def profile_bands(profile, spectral_indices):
+    """
+    Bands exported by a profile, None for every band
+    """
+    if profile["bands"] is None:
+        return None
+    bands = list(profile["bands"])
+    if profile["indices"]:
+        bands += [name for name in spectral_indices if name not in bands]
+    return bands
+
+
+def profile_band_count(profile, landsat, spectral_indices):
+    """
+    Number of bands exported by a profile from the images of a Landsat constellation
+    """
+    bands = profile_bands(profile, spectral_indices)
+    if bands is not None:
+        return len(bands)
+    landsat_bands = LANDSAT_BANDS[landsat]
+    band_count = len(landsat_bands["VISW"]) + len(spectral_indices) + len(landsat_bands["TIR"]) + len(AUXILIARY_BANDS)
+    if landsat == "L8":
+        band_count += len(AIRT_BANDS)
+    return band_count
+
+
+def profile_packing(profile, band):
+    """
+    (scale, offset) of a band in a profile, None if it is stored as is
+    """
+    if band in profile["packing"]:
+        return profile["packing"][band]
+    if band in SPECTRAL_INDICES and "index_packing" in profile:
+        return profile["index_packing"]
+    return None
+
+
+def apply_output_profile(image, profile, spectral_indices):
+    """
+    Select the bands of a profile and pack them to its data type.
+
+    Parameters:
+    - image (ee.Image): Image with the LST and every computed band
+    - profile (dict): One of OUTPUT_PROFILES
+    - spectral_indices (tuple): Names of the selected spectral indices
+
+    Returns:
+    - ee.Image: Image ready to export
+    """
+    bands = profile_bands(profile, spectral_indices)
+    if bands is None:
+        # align all bands to the same value type
+        return image.select(image.bandNames()).toFloat()
+
+    data_type = DATA_TYPES[profile["data_type"]]
+    packed = []
+    for band in bands:
+        band_image = image.select(band)
+        packing = profile_packing(profile, band)
+        if packing is not None:
+            scale, offset = packing
+            band_image = band_image.subtract(offset).divide(scale).round()
+        if data_type["range"] is not None:
+            band_image = band_image.clamp(*data_type["range"])
+        packed.append(band_image)
+    packed = ee.Image.cat(packed)
+    if profile["no_data"] is not None:
+        packed = packed.unmask(profile["no_data"])
+    return getattr(packed, data_type["cast"])()
@@ -56,10 +56,12 @@ def compute_air_temperature(radiances: ee.Image) -> ee.Image:
 
 def add_airt_band(landsat, image, month, latitude):
     """
-    Apply the SCEN algorithm to compute the LST.
+    Apply the SCEN algorithm to compute the air temperature and radiances,
+    the image is returned as is for other satellites than L8.
     """
+    # the coefficients are only fitted for the Landsat 8 band 10
     if landsat != "L8":
-        return 
+        return image
     tpw = image.select("TPW")
     elv = image.select("ELEVATION")
     afs = compute_AFs(tpw, month, latitude)
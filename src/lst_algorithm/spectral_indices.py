@@ -0,0 +1,98 @@
+import re
+import ee
+from .constants import SR_BAND_ROLES, SR_OFFSET, SR_SCALE
+
+# Spectral indices computed from the scaled surface reflectance, by output band name.
+# Each index is an expression over the spectral roles of SR_BAND_ROLES, with optional
+# constants and a valid range its values are clamped to. A new index only needs an entry here.
+SPECTRAL_INDICES = {
+    "NDVI": {
+        "expression": "(nir - red) / (nir + red)",
+    },
+    # Fraction of Vegetation Cover from the NDVI
+    "FVC": {
+        "expression": "(((nir - red) / (nir + red) - ndvi_bg) / (ndvi_vg - ndvi_bg)) ** 2",
+        "constants": {"ndvi_bg": 0.2, "ndvi_vg": 0.86},
+        "range": (0.0, 1.0),
+    },
+    "NDBI": {
+        "expression": "(swir1 - nir) / (swir1 + nir)",
+    },
+    "EVI": {
+        "expression": "gain * (nir - red) / (nir + c1 * red - c2 * blue + L)",
+        "constants": {"gain": 2.5, "c1": 6, "c2": 7.5, "L": 1},
+    },
+    "Green": {
+        "expression": "(2 * green - red - blue) / (2 * green + red + blue)",
+    },
+}
+
+DEFAULT_INDICES = ("NDVI", "FVC", "NDBI", "EVI", "Green")
+
+
+def check_indices(indices):
+    """
+    Validate a selection of spectral indices.
+
+    Parameters:
+    - indices (iterable): Names of SPECTRAL_INDICES
+
+    Returns:
+    - tuple: The names without duplicates, in their given order
+    """
+    indices = tuple(dict.fromkeys(indices))
+    unknown = [name for name in indices if name not in SPECTRAL_INDICES]
+    if unknown:
+        raise ValueError(
+            f"Invalid spectral indices: {unknown}. \
+            Valid options are: {list(SPECTRAL_INDICES.keys())}"
+        )
+    return indices
+
+
+def index_roles(name):
+    """
+    Spectral roles used by the expression of an index
+    """
+    names = set(re.findall(r"[A-Za-z_]\w*", SPECTRAL_INDICES[name]["expression"]))
+    return [role for role in SR_BAND_ROLES["L8"] if role in names]
+
+
+def add_spectral_indices(landsat, image, indices = DEFAULT_INDICES):
+    """
+    Compute the selected spectral indices for a given Landsat image in one stage:
+    the reflectance bands they need are scaled once as a stack, and every index is
+    an expression over that stack.
+
+    Parameters:
+    - landsat (str): ID of the Landsat satellite (e.g., 'L8')
+    - image (ee.Image): Input Landsat surface reflectance image
+    - indices (iterable): Names of the SPECTRAL_INDICES to compute
+
+    Returns:
+    - ee.Image: Image with an added band per index
+    """
+    indices = check_indices(indices)
+    if not indices:
+        return image
+
+    # Scale the reflectance bands used by the selected indices once
+    band_roles = SR_BAND_ROLES.get(landsat, SR_BAND_ROLES["L8"])
+    roles = [role for role in band_roles if any(role in index_roles(name) for name in indices)]
+    reflectance = (
+        image.select([band_roles[role] for role in roles], roles)
+        .multiply(SR_SCALE)
+        .add(SR_OFFSET)
+    )
+
+    bands = []
+    for name in indices:
+        spec = SPECTRAL_INDICES[name]
+        variables = {role: reflectance.select(role) for role in index_roles(name)}
+        variables.update(spec.get("constants", {}))
+        band = reflectance.expression(spec["expression"], variables)
+        if "range" in spec:
+            band = band.clamp(*spec["range"])
+        bands.append(band.rename(name))
+
+    return image.addBands(ee.Image.cat(bands))
@@ -1,4 +1,5 @@
 from .monitor import Monitor
-from .tracker import recover_task_tracker, TaskTracker
+from .tracker import recover_task_tracker, restore_task_tracker, TaskTracker
+from .tracker_store import TrackerStore
 
-__all__ = ['Monitor', 'recover_task_tracker', 'TaskTracker']
+__all__ = ['Monitor', 'recover_task_tracker', 'restore_task_tracker', 'TaskTracker', 'TrackerStore']
@@ -0,0 +1,72 @@
+"""
+Download pool for the exported images, decoupled from the task state polling
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+from ..communicator.drive_manager import download_file
+
+logger = logging.getLogger(__name__)
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by the download workers, refilled at rate bytes per second
+    """
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        """
+        Block until nbytes can be transferred under the bandwidth cap
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # go into debt for chunks larger than the bucket, the next callers wait it out
+            self._tokens -= nbytes
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class DownloadPool:
+    """
+    Thread pool running the drive downloads, at most max_workers files in parallel
+    """
+    def __init__(self, max_workers: int = 2, bandwidth_limit: Optional[float] = None, on_done=None):
+        self.max_workers = max_workers
+        self.on_done = on_done
+        self.limiter = BandwidthLimiter(bandwidth_limit) if bandwidth_limit else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+
+    def submit(self, file_obj, local_file_path: str, progress_callback=None, delay: float = 0) -> Future:
+        """
+        Queue the download of file_obj, the returned future resolves to the downloaded size
+        """
+        throttle = self.limiter.consume if self.limiter is not None else None
+        future = self._executor.submit(self._download, file_obj, local_file_path, progress_callback, throttle, delay)
+        if self.on_done is not None:
+            future.add_done_callback(lambda _: self.on_done())
+        return future
+
+    @staticmethod
+    def _download(file_obj, local_file_path, progress_callback, throttle, delay):
+        """
+        Wait out the retry backoff, then download the file
+        """
+        if delay > 0:
+            time.sleep(delay)
+        logger.info("downloading to %s", local_file_path)
+        return download_file(file_obj, local_file_path, progress_callback=progress_callback, throttle=throttle)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the workers after the queued downloads
+        """
+        self._executor.shutdown(wait=wait)
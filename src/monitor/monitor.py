@@ -1,24 +1,51 @@
+import heapq
+import itertools
 import logging
 import os
 import threading
 import time
-from .tracker import TaskTracker, recover_task_tracker
+import ee
+from .tracker import TaskTracker, recover_task_tracker, restore_task_tracker, ExportState, HoldState
+from .tracker_store import TrackerStore
+from .session_index import SessionIndex
+from .downloader import DownloadPool
+from .scheduler import ExportScheduler
 from ..communicator.drive_manager import DriveManager
+from ..communicator.ee_metrics import measure_ee_call
 
 logger = logging.getLogger(__name__)
 
+LOWEST_PRIORITY = (3,)
+
 class Monitor:
     """
     Monitor for the system, to trace export task and network status
     """
-    def __init__(self, tracker_folder_path: str, drive_manager: DriveManager, collection_path, refresh_interval: int = 15):
+    def __init__(self, tracker_folder_path: str, drive_manager: DriveManager, collection_path, refresh_interval: int = 15, download_workers: int = 2, download_bandwidth_limit: float = None, export_window_floor: int = None, export_window_ceiling: int = None, read_only: bool = False):
+        """
+        A read only monitor, for planning, only indexes the stored trackers: it creates no folder and writes no store
+        """
         self.collection_path = collection_path
         self.trackers = []
+        self.pending = []
+        self._pending_order = itertools.count()
+        self._lock = threading.RLock()
         self.drive_manager = drive_manager
         self.refresh_interval = refresh_interval
         self.tracker_folder_path = tracker_folder_path
-        self._create_tracker_folder()
+        self.download_pool = DownloadPool(download_workers, download_bandwidth_limit, on_done=self.wake)
+        self.scheduler = ExportScheduler()
+        self.scheduler.configure(floor=export_window_floor, ceiling=export_window_ceiling)
+        if not read_only:
+            self._create_tracker_folder()
+        self.store = TrackerStore(os.path.join(tracker_folder_path, 'trackers.sqlite'), read_only=read_only)
+        self.sessions = SessionIndex()
         self._finished = False
+        self._started = False
+        self._timers = []
+        self._next_due = {}
+        self._wakeup = threading.Event()
+        self._thread = None
 
     def _create_tracker_folder(self):
         """
@@ -26,121 +53,248 @@ class Monitor:
         """
         os.makedirs(self.tracker_folder_path, exist_ok=True)
 
-    def export(self, image):
+    def export(self, image, collection_path: str = None, priority: tuple = LOWEST_PRIORITY):
         """
-        Export the image to the drive
+        Queue the image to export to the drive, downloading it to collection_path (default to the monitor's one).
+        Pending exports take the free slots in ascending priority order.
         """
         tracker = TaskTracker(
             image=image,
             get_fileobj=self.drive_manager.get_fileobj,
-            tracker_folder_path=self.tracker_folder_path,
-            collection_path=self.collection_path
+            store=self.store,
+            collection_path=collection_path or self.collection_path,
+            download_pool=self.download_pool,
+            priority=priority
         )
         tracker.start()
-        logger.info("start tracker: %s", tracker.tracker_file_path)
-        self.trackers.append(tracker)
+        self.sessions.add_active(tracker.collection_path, tracker.image_name)
+        logger.info("queue tracker: %s with priority %s", tracker.image_name, priority)
+        self._push_pending(tracker)
+        self._dispatch()
+
+    def _push_pending(self, tracker):
+        """
+        Add a tracker in HoldState to the pending queue
+        """
+        with self._lock:
+            heapq.heappush(self.pending, (tracker.priority, next(self._pending_order), tracker))
+            self.scheduler.set_queue_depth(len(self.pending))
+
+    def _dispatch(self):
+        """
+        Start the pending trackers with the highest priority while the scheduler has free slots
+        """
+        with self._lock:
+            while self.pending:
+                tracker = self.pending[0][2]
+                tracker.ckeck_status()
+                if isinstance(tracker.state, HoldState):
+                    break
+                heapq.heappop(self.pending)
+                if tracker.state is None:
+                    tracker.delete()
+                    self.sessions.remove_active(tracker.collection_path, tracker.image_name, completed=False)
+                else:
+                    logger.info("start tracker: %s", tracker.image_name)
+                    self.trackers.append(tracker)
+            self.scheduler.set_queue_depth(len(self.pending))
 
     def stop(self):
         """
-        Stop the monitor
+        Stop the monitor, the loop exits once the remaining trackers are finished
         """
         self._finished = True
+        self.wake()
+
+    def wake(self):
+        """
+        Check the trackers at once instead of at the next tick, e.g. when a download is done
+        """
+        self._wakeup.set()
+
+    def join(self, timeout: float = None):
+        """
+        Wait for the monitor loop to exit, it shuts down the download pool after its last downloads
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
 
     def is_finished(self) -> bool:
         """
         Check if the monitor is finished
         """
-        return self._finished and len(self.trackers) == 0
+        return self._finished and len(self.trackers) == 0 and len(self.pending) == 0
 
     def start(self):
         """
-        Start the monitor
+        Start the monitor, a monitor shared by several controllers is only started once
         """
+        if self._started:
+            return
+        self._started = True
         try:
             self._load_trackers()
         except Exception as e:
             logger.error("error to load trackers: %s", e)
             raise e
 
-        try:
-            self._check_trackers()
-        except Exception as e:
-            logger.error("error to check trackers: %s", e)
+        self._schedule('trackers', 0)
+        self._schedule('token', 0)
+        self._thread = threading.Thread(target=self._run, name='monitor')
+        self._thread.start()
 
-        try:
-            self._check_and_refresh_token()
-        except Exception as e:
-            logger.error("error to check and refresh token: %s", e)
+    def _schedule(self, job: str, delay: float):
+        """
+        Set the next run of the job, the earlier entry of a rescheduled job is skipped when it is due
+        """
+        due = time.monotonic() + delay
+        self._next_due[job] = due
+        heapq.heappush(self._timers, (due, job))
+
+    def _run(self):
+        """
+        The monitor loop: run the due jobs of the timer heap, sleeping until the next one or a wakeup
+        """
+        jobs = {
+            'trackers': (self._check_trackers, self.refresh_interval),
+            'token': (self._check_and_refresh_token, self.refresh_interval * 5),
+        }
+        while not self.is_finished():
+            due, job = self._timers[0]
+            if due != self._next_due[job]:
+                heapq.heappop(self._timers)
+                continue
+            now = time.monotonic()
+            if due > now:
+                if self._wakeup.wait(due - now):
+                    self._wakeup.clear()
+                    self._schedule('trackers', 0)
+                continue
+            heapq.heappop(self._timers)
+            func, interval = jobs[job]
+            try:
+                func()
+            except Exception as e:
+                logger.error("error to run monitor job %s: %s", job, e)
+            self._schedule(job, interval)
+        # the loop only exits once every tracker is done, wait for the last download threads too
+        self.download_pool.shutdown(wait=True)
+        logger.info("monitor stopped")
 
-    def create_new_session(self, year: int, month: int, exclude_list: list) -> bool:
+    def session_status(self, year: int, month: int, image_prefix: str = "wuhanshi", collection_path: str = None):
         """
-        Check if the year-month pair is not recorded in the tracker folder or already completed(for lst)
+        Get 'completed', 'tracked' or 'missing' for a known year-month session, None for a new one
         """
         session_key = f"{year}-{month:02}"
-        if session_key in exclude_list:
-            return False
+        return self.sessions.status(collection_path or self.collection_path, f"{image_prefix}-{session_key}", session_key)
 
-        # Check if the image file already exists (completed task)
-        image_filename = f"wuhanshi-{session_key}.tif"
-        image_path = os.path.join(self.collection_path, image_filename)
-        if os.path.exists(image_path):
-            logger.info("Image already exists, skipping %s", session_key)
+    def create_new_session(self, year: int, month: int, image_prefix: str = "wuhanshi", collection_path: str = None) -> bool:
+        """
+        Check if the year-month image is not downloaded, recorded as missing or tracked yet
+        """
+        status = self.session_status(year, month, image_prefix, collection_path)
+        if status is not None:
+            logger.info("Session %s-%02d of %s is %s, skipping", year, month, image_prefix, status)
             return False
+        return True
 
-        # Check existing tracker files
-        if not os.path.exists(self.tracker_folder_path):
-            return True
+    def index_trackers(self):
+        """
+        Mark the sessions of the stored trackers as tracked without starting the monitor, for planning
+        """
+        for record in self.store.records():
+            self.sessions.add_active(record['collection_path'], record['image_name'])
 
-        for filename in os.listdir(self.tracker_folder_path):
-            if filename.endswith('.pkl') and session_key in filename:
-                return False
-        return True
+    def add_missing_session(self, year: int, month: int, collection_path: str = None):
+        """
+        Record a month without data so it is not planned again
+        """
+        self.sessions.add_missing(collection_path or self.collection_path, year, month)
 
     def _load_trackers(self):
         """
-        Load tracker files from the tracker folder
+        Load the trackers from the store, after migrating the legacy tracker files.
+        Trackers still on hold go back to the pending queue with their priority.
         """
-        if not os.path.exists(self.tracker_folder_path):
-            logger.info("Tracker folder does not exist, starting with empty trackers list")
-            self.trackers = []
-            return
+        self._migrate_tracker_files()
+        self.trackers = []
+        for record in self.store.records():
+            tracker = restore_task_tracker(record, self.drive_manager.get_fileobj, self.store, self.download_pool, self.drive_manager)
+            if tracker is None:
+                self.store.delete(record['collection_path'], record['image_name'])
+                continue
+            self.sessions.add_active(tracker.collection_path, tracker.image_name)
+            if isinstance(tracker.state, HoldState):
+                self._push_pending(tracker)
+                continue
+            if isinstance(tracker.state, ExportState):
+                self.scheduler.restore()
+            self.trackers.append(tracker)
+        logger.info("Loaded %d valid trackers and %d pending trackers from tracker store", len(self.trackers), len(self.pending))
 
-        try:
-            # Scan the tracker folder for .pkl files
-            self.trackers = []
-            for filename in os.listdir(self.tracker_folder_path):
-                if filename.endswith('.pkl'):
-                    file_path = os.path.join(self.tracker_folder_path, filename)
-                    tracker = recover_task_tracker(file_path)
-                    if tracker is not None:
-                        self.trackers.append(tracker)
-                    else:
-                        # Remove invalid tracker file
-                        try:
-                            os.remove(file_path)
-                            logger.info("Removed invalid tracker file: %s", file_path)
-                        except OSError as e:
-                            logger.error("Failed to remove invalid tracker file %s: %s", file_path, e)
-
-            logger.info("Loaded %d valid trackers from tracker folder", len(self.trackers))
-        except (IOError, OSError) as e:
-            logger.error("Error loading tracker files: %s", e)
-            self.trackers = []
+    def _migrate_tracker_files(self):
+        """
+        Move the trackers of the legacy .pkl files into the store
+        """
+        for filename in os.listdir(self.tracker_folder_path):
+            if not filename.endswith('.pkl'):
+                continue
+            file_path = os.path.join(self.tracker_folder_path, filename)
+            tracker = recover_task_tracker(file_path, self.drive_manager.get_fileobj, self.store, self.download_pool)
+            if tracker is not None:
+                tracker.dump()
+                logger.info("Migrated tracker file: %s", file_path)
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logger.error("Failed to remove tracker file %s: %s", file_path, e)
 
     def _check_trackers(self):
         """
-        Check the trackers
+        Check the trackers, then fill the slots freed by this round at once
         """
-        try:
+        self._poll_task_status()
+        finished = []
+        with self._lock:
+            active = []
             for tracker in self.trackers:
-                if not tracker.ckeck_status(): # failed or finished
-                    tracker.delete()
-                    self.trackers.remove(tracker)
+                try:
+                    running = tracker.ckeck_status()
+                except Exception as e:
+                    logger.error("error to check tracker %s: %s", tracker.image_name, e)
+                    running = True
+                if running:
+                    active.append(tracker)
+                else: # failed or finished
+                    finished.append(tracker)
+            self.trackers = active
+        for tracker in finished:
+            tracker.delete()
+            self.sessions.remove_active(tracker.collection_path, tracker.image_name, completed=tracker.downloaded)
+            self.drive_manager.forget_fileobj(tracker.image_name)
+        self._dispatch()
+
+    def _poll_task_status(self):
+        """
+        Fetch the status of all the exporting tasks with one ee.data.getTaskStatus call and hand them
+        to the trackers, trackers without a polled status fall back to their own task.status() call.
+        The client serves the call with one operation request per id, so a tick costs one request per
+        exporting task, at most the scheduler's ceiling, whatever the size of the task history.
+        """
+        exporting = [tracker for tracker in self.trackers if isinstance(tracker.state, ExportState) and tracker.task is not None]
+        if not exporting:
+            return
+        try:
+            with measure_ee_call():
+                task_list = ee.data.getTaskStatus([tracker.task.id for tracker in exporting])
         except Exception as e:
-            logger.error("error to check trackers: %s", e)
-        finally:
-            if not self.is_finished():
-                threading.Timer(self.refresh_interval, self._check_trackers).start()
+            logger.warning("error to poll the task status: %s", e)
+            return
+        status_map = {status['id']: status for status in task_list if 'id' in status and status.get('state') != 'UNKNOWN'}
+        for tracker in exporting:
+            tracker.polled_status = status_map.get(tracker.task.id)
+        logger.debug("polled %d tasks for %d exporting trackers", len(status_map), len(exporting))
+        logger.info("export scheduler: %s", self.scheduler.stats())
 
     def _check_and_refresh_token(self):
         """
@@ -171,6 +325,3 @@ class Monitor:
 
         except Exception as e:
             logger.error("Error in token refresh process: %s", e)
-        finally:
-            if not self.is_finished():
-                threading.Timer(self.refresh_interval * 5, self._check_and_refresh_token).start()
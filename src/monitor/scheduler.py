@@ -0,0 +1,143 @@
+"""
+Adaptive concurrency window of the earth engine exports
+"""
+import logging
+import threading
+import time
+from .counter import singleton, Counter
+
+logger = logging.getLogger(__name__)
+
+@singleton
+class ExportScheduler:
+    """
+    AIMD window of in-flight exports: the window grows by one export per window of fast completions,
+    and halves when tasks wait too long in READY or complete much slower than the best observed latency
+    """
+    def __init__(self, floor: int = 2, ceiling: int = 20, initial: int = 5):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = float(min(max(initial, floor), ceiling))
+        self.target_queue_wait = 300
+        self.latency_tolerance = 2.0
+        self.decrease_cooldown = 120
+        self.smoothing = 0.3
+        self.queue_wait = None
+        self.latency = None
+        self.best_latency = None
+        self._queue_depth = 0
+        self._decreased_at = 0
+        self._lock = threading.Lock()
+
+    def configure(self, floor: int = None, ceiling: int = None, initial: int = None):
+        """
+        Set the bounds of the window, the window is clamped into them
+        """
+        with self._lock:
+            if floor is not None:
+                self.floor = floor
+            if ceiling is not None:
+                self.ceiling = max(ceiling, self.floor)
+            if initial is not None:
+                self.window = float(initial)
+            self.window = float(min(max(self.window, self.floor), self.ceiling))
+        logger.info("export window %d in [%d, %d]", int(self.window), self.floor, self.ceiling)
+
+    def try_acquire(self) -> bool:
+        """
+        Take an export slot if the window is not full
+        """
+        with self._lock:
+            if Counter().get_count() >= int(self.window):
+                return False
+            Counter().increment()
+            return True
+
+    def restore(self):
+        """
+        Take a slot for an export recovered from a previous run, regardless of the window
+        """
+        with self._lock:
+            Counter().increment()
+
+    def release(self):
+        """
+        Give back the slot of a finished export
+        """
+        with self._lock:
+            if Counter().get_count() > 0:
+                Counter().decrement()
+
+    def record_running(self, queue_wait: float):
+        """
+        Record the time an export waited in READY before it started running
+        """
+        with self._lock:
+            self.queue_wait = self._smooth(self.queue_wait, queue_wait)
+            if queue_wait > self.target_queue_wait:
+                self._decrease(f"queue wait {queue_wait:.0f}s")
+
+    def record_completed(self, latency: float):
+        """
+        Record the time from the export start to its completion
+        """
+        with self._lock:
+            self.latency = self._smooth(self.latency, latency)
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+            if latency > self.best_latency * self.latency_tolerance:
+                self._decrease(f"completion latency {latency:.0f}s")
+            else:
+                self.window = min(self.ceiling, self.window + 1 / self.window)
+
+    def _smooth(self, average, value):
+        """
+        Exponential moving average of the observations
+        """
+        if average is None:
+            return value
+        return average + self.smoothing * (value - average)
+
+    def _decrease(self, reason: str):
+        """
+        Halve the window, at most once per cooldown so one congested batch only counts once
+        """
+        now = time.time()
+        if now - self._decreased_at < self.decrease_cooldown:
+            return
+        self._decreased_at = now
+        self.window = max(self.floor, self.window / 2)
+        logger.info("export window decreased to %d for %s", int(self.window), reason)
+
+    def in_flight(self) -> int:
+        """
+        Get the number of exports holding a slot
+        """
+        return Counter().get_count()
+
+    def set_queue_depth(self, depth: int):
+        """
+        Record the number of exports waiting for a slot in the monitor's pending queue
+        """
+        self._queue_depth = depth
+
+    def queue_depth(self) -> int:
+        """
+        Get the number of exports waiting for a slot
+        """
+        return self._queue_depth
+
+    def stats(self) -> dict:
+        """
+        Get the window, the in-flight and queued exports and the observed latencies
+        """
+        with self._lock:
+            return {
+                'window': int(self.window),
+                'floor': self.floor,
+                'ceiling': self.ceiling,
+                'in_flight': Counter().get_count(),
+                'queue_depth': self._queue_depth,
+                'queue_wait': self.queue_wait,
+                'latency': self.latency,
+            }
@@ -0,0 +1,87 @@
+"""
+Index of the sessions that are already downloaded, missing or being tracked
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SessionIndex:
+    """
+    Sets of (collection_path, image_name) for downloaded and tracked images and of
+    (collection_path, year-month) for missing months. A collection folder is scanned
+    once on its first lookup, later changes are recorded by the monitor and the exporter.
+    """
+    def __init__(self):
+        self._completed = set()
+        self._missing = set()
+        self._active = set()
+        self._scanned = set()
+        self._lock = threading.Lock()
+
+    def _scan(self, collection_path: str):
+        """
+        Read the downloaded images and the missing months of the collection folder
+        """
+        if not os.path.isdir(collection_path):
+            return
+        with os.scandir(collection_path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.tif'):
+                    self._completed.add((collection_path, entry.name[:-len('.tif')]))
+        missing_file_path = os.path.join(collection_path, "missing.txt")
+        if os.path.exists(missing_file_path):
+            with open(missing_file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        year, month = line.strip().split('-')
+                        self._missing.add((collection_path, f"{int(year)}-{int(month):02}"))
+        logger.info("Indexed collection %s", collection_path)
+
+    def _ensure_scanned(self, collection_path: str):
+        """
+        Scan the collection folder on its first lookup
+        """
+        if collection_path not in self._scanned:
+            self._scanned.add(collection_path)
+            self._scan(collection_path)
+
+    def status(self, collection_path: str, image_name: str, session_key: str):
+        """
+        Get 'completed', 'tracked' or 'missing' for a known session, None for a new one
+        """
+        collection_path = os.path.normpath(collection_path)
+        with self._lock:
+            self._ensure_scanned(collection_path)
+            if (collection_path, image_name) in self._completed:
+                return 'completed'
+            if (collection_path, image_name) in self._active:
+                return 'tracked'
+            if (collection_path, session_key) in self._missing:
+                return 'missing'
+        return None
+
+    def add_active(self, collection_path: str, image_name: str):
+        """
+        Record a tracked image
+        """
+        with self._lock:
+            self._active.add((os.path.normpath(collection_path), image_name))
+
+    def remove_active(self, collection_path: str, image_name: str, completed: bool):
+        """
+        Record a finished tracker, the image is downloaded if completed
+        """
+        key = (os.path.normpath(collection_path), image_name)
+        with self._lock:
+            self._active.discard(key)
+            if completed:
+                self._completed.add(key)
+
+    def add_missing(self, collection_path: str, year: int, month: int):
+        """
+        Record a month without data
+        """
+        with self._lock:
+            self._missing.add((os.path.normpath(collection_path), f"{year}-{month:02}"))
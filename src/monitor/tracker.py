@@ -3,7 +3,9 @@ import logging
 import time
 from abc import ABC, abstractmethod
 import pickle
-from .counter import Counter
+import ee
+from .scheduler import ExportScheduler
+from ..communicator.ee_metrics import measure_ee_call
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +29,18 @@ class TaskState(ABC):
 
 class HoldState(TaskState):
     """
-    State when the task is hold to wait network or parallel limit
+    State when the task is hold to wait network or the export window of the scheduler
     """
-    max_task_num = 5
     def handle(self, tracker):
-        if self.max_task_num <= Counter().get_count():
+        scheduler = ExportScheduler()
+        if not scheduler.try_acquire():
             return HoldState()
         tracker.task = tracker.image.create_export_task()
+        if tracker.task is None:
+            scheduler.release()
+            return CompeletedState()
+        tracker.export_started_at = time.time()
         logger.info("ready to export : %s", tracker.task)
-        Counter().increment()
         return ExportState()
 
 class ExportState(TaskState):
@@ -43,56 +48,100 @@ class ExportState(TaskState):
     State when the task is exporting
     """
     def handle(self, tracker):
-        status = tracker.task.status()
+        status = tracker.polled_status
+        tracker.polled_status = None
+        if status is None:
+            with measure_ee_call():
+                status = tracker.task.status()
         state = status['state']
         if state != 'READY':
+            scheduler = ExportScheduler()
+            now = time.time()
+            if tracker.running_at is None and tracker.export_started_at is not None:
+                tracker.running_at = now
+                scheduler.record_running(now - tracker.export_started_at)
             if state == 'COMPLETED':
-                logger.info("Success to export %s", tracker.image.image_name)
+                logger.info("Success to export %s", tracker.image_name)
+                scheduler.release()
+                if tracker.export_started_at is not None:
+                    scheduler.record_completed(now - tracker.export_started_at)
                 return DownloadState()
             if state in ['FAILED', 'CANCELLED']:
-                logger.info("Failed to export %s", tracker.image.image_name)
+                logger.info("Failed to export %s", tracker.image_name)
+                scheduler.release()
                 return CompeletedState()
-            logger.info("exporting %s", tracker.image.image_name)
+            logger.info("exporting %s", tracker.image_name)
         return ExportState()
 
 class DownloadState(TaskState):
     """
-    State when the task is downloading
+    State when the task is downloading, the download itself runs in the tracker's download pool
     """
+    max_retries = 3
+    attempt = 0
+    retry_at = None
+    def __init__(self, attempt: int = 0, retry_at: float = None):
+        self.attempt = attempt
+        self.retry_at = retry_at
+
     def handle(self, tracker):
-        cloud_file_name = tracker.image.image_name
-        file_obj = tracker.get_fileobj(cloud_file_name)
-        logger.info("get fileobj: %s", file_obj)
-        local_file_name = os.path.join(tracker.collection_path, cloud_file_name)
-        local_file_name = f"{local_file_name}.tif"
-        logger.info("downloading to %s", local_file_name)
-
-        # Add retry mechanism for SSL/network errors
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                file_obj.GetContentFile(local_file_name)
-                logger.info("download completed: %s", cloud_file_name)
-                return CompeletedState()
-            except (OSError, IOError, ConnectionError, Exception) as e:
-                error_msg = str(e)
-                # Handle various network and download errors
-                if any(keyword in error_msg for keyword in ["SSL", "EOF", "Connection", "IncompleteRead", "Broken pipe"]):
-                    logger.warning("Network error during download (attempt %d/%d): %s", attempt + 1, max_retries, error_msg)
-                    if attempt == max_retries - 1:
-                        logger.error("Failed to download %s after %d attempts", cloud_file_name, max_retries)
-                        return CompeletedState()  # Still return CompletedState to avoid infinite retry
-                    time.sleep(3 ** attempt)  # Exponential backoff
-                else:
-                    logger.error("Unexpected error during download: %s", error_msg)
+        cloud_file_name = tracker.image_name
+        if tracker.download_future is None:
+            if self.retry_at is not None and time.time() < self.retry_at:
+                return self
+            last_attempt = self.attempt >= self.max_retries - 1
+            # the last lookup lists the whole folder, the incremental listing can miss the file
+            file_obj = tracker.get_fileobj(cloud_file_name, full_listing=True) if last_attempt else tracker.get_fileobj(cloud_file_name)
+            logger.info("get fileobj: %s", file_obj)
+            if file_obj is None:
+                logger.warning("%s is not listed in the drive folder (attempt %d/%d)", cloud_file_name, self.attempt + 1, self.max_retries)
+                if last_attempt:
+                    # the month is not downloaded, so the next run plans it again
+                    logger.error("%s is not listed after %d attempts, give up the download", cloud_file_name, self.max_retries)
+                    tracker.unlisted = True
                     return CompeletedState()
+                return DownloadState(self.attempt + 1, time.time() + 3 ** (self.attempt + 1))
+            local_file_name = os.path.join(tracker.collection_path, f"{cloud_file_name}.tif")
+
+            def record_progress(downloaded_bytes, total_bytes):
+                tracker.downloaded_bytes = downloaded_bytes
+                logger.debug("downloaded %d/%d bytes of %s", downloaded_bytes, total_bytes, cloud_file_name)
+
+            # each retry resumes the partial file after an exponential backoff,
+            # a retry after a listing miss has already waited for it
+            delay = 3 ** self.attempt if self.attempt > 0 and self.retry_at is None else 0
+            tracker.download_future = tracker.download_pool.submit(file_obj, local_file_name, record_progress, delay)
+            return self
+
+        if not tracker.download_future.done():
+            return self
+
+        future, tracker.download_future = tracker.download_future, None
+        try:
+            future.result()
+            tracker.downloaded = True
+            logger.info("download completed: %s", cloud_file_name)
+            return CompeletedState()
+        except (OSError, IOError, ConnectionError, Exception) as e:
+            error_msg = str(e)
+            # Handle various network and download errors
+            if any(keyword in error_msg for keyword in ["SSL", "EOF", "Connection", "IncompleteRead", "Broken pipe", "HTTP", "checksum"]):
+                logger.warning("Network error during download (attempt %d/%d): %s", self.attempt + 1, self.max_retries, error_msg)
+                if self.attempt == self.max_retries - 1:
+                    logger.error("Failed to download %s after %d attempts", cloud_file_name, self.max_retries)
+                    return CompeletedState()  # Still return CompletedState to avoid infinite retry
+                return DownloadState(self.attempt + 1)
+            logger.error("Unexpected error during download: %s", error_msg)
+            return CompeletedState()
 
 class CompeletedState(TaskState):
     """
     State when the task is finished
     """
     def handle(self, tracker):
-        cloud_file_name = tracker.image.image_name
+        cloud_file_name = tracker.image_name
+        if tracker.unlisted:
+            return None
         file_obj = tracker.get_fileobj(cloud_file_name)
         for i in range(3):
             if file_obj is not None:
@@ -105,27 +154,38 @@ class CompeletedState(TaskState):
         else:
             file_obj.Delete()
             logger.info("Delete cloud file: %s", cloud_file_name)
-        Counter().decrement()
         return None
 
+STATES = {state.__name__: state for state in (HoldState, ExportState, DownloadState, CompeletedState)}
+
 class TaskTracker:
     """
     Track the status of a task
     """
-    def __init__(self, image, get_fileobj, tracker_folder_path, collection_path):
+    def __init__(self, image, get_fileobj, store, collection_path, download_pool=None, priority=(3,), image_name=None):
         self.image = image
+        self.image_name = image_name or image.image_name
         self.get_fileobj = get_fileobj
-        self.tracker_file_path = os.path.join(tracker_folder_path, f"{self.image.image_name}.pkl")
+        self.store = store
         self.task = None
         self.state = None
         self.collection_path = collection_path
+        self.downloaded_bytes = 0
+        self.downloaded = False
+        self.unlisted = False
+        self.download_pool = download_pool
+        self.priority = tuple(priority)
+        self.download_future = None
+        self.polled_status = None
+        self.export_started_at = None
+        self.running_at = None
 
     def start(self):
         """
-        Start the tracker
+        Start the tracker in HoldState, it is recorded in the store until the monitor dispatches it
         """
         self.state = HoldState()
-        self.state = self.state.handle(self)
+        self.dump()
 
     def ckeck_status(self) -> bool:
         """
@@ -135,45 +195,82 @@ class TaskTracker:
         self.dump()
         return self.state is not None
 
+    def record(self) -> dict:
+        """
+        The fields of the tracker kept in the store
+        """
+        return {
+            'task_id': self.task.id if self.task is not None else None,
+            'state': type(self.state).__name__,
+            'attempt': getattr(self.state, 'attempt', 0),
+            'downloaded_bytes': self.downloaded_bytes,
+            'priority': self.priority,
+            'export_started_at': self.export_started_at,
+            'running_at': self.running_at,
+            # a tracker on hold has no export task yet, its image is kept to export it after a restart
+            'image': self.image.to_record() if isinstance(self.state, HoldState) and self.image is not None else None
+        }
+
     def dump(self):
         """
-        Dump the tracker to file
+        Write the tracker record to the store, unchanged records are skipped by the store
         """
         if self.state is None:
             return
-        # Create a copy for serialization
-        tracker_data = {
-            'image': self.image,
-            'get_fileobj': self.get_fileobj,
-            'tracker_file_path': self.tracker_file_path,
-            'task': self.task,
-            'state': self.state,
-            'collection_path': self.collection_path
-        }
-
-        with open(self.tracker_file_path, 'wb') as f:
-            pickle.dump(tracker_data, f)
-        logger.debug("Dump tracker to %s", self.tracker_file_path)
+        self.store.save(self)
 
     def delete(self):
         """
-        Delete the tracker file when the tracker is completed
+        Delete the tracker record when the tracker is completed
         """
         if self.state is None:
-            try:
-                if os.path.exists(self.tracker_file_path):
-                    os.remove(self.tracker_file_path)
-                    logger.info("Successfully deleted tracker file: %s", self.tracker_file_path)
-                else:
-                    logger.warning("Tracker file does not exist: %s", self.tracker_file_path)
-            except OSError as e:
-                logger.error("Failed to delete tracker file %s: %s", self.tracker_file_path, e)
+            self.store.delete(self.collection_path, self.image_name)
+            logger.info("Successfully deleted tracker: %s", self.image_name)
         else:
-            logger.warning("Delete tracker file when the tracker is not completed")
+            logger.warning("Delete tracker when the tracker is not completed")
+
+def restore_task_tracker(record: dict, get_fileobj, store, download_pool=None, drive_manager=None) -> TaskTracker:
+    """
+    Rebuild the task tracker from its store record. A tracker still on hold is rebuilt with
+    its serialized image, None is returned for records that cannot be resumed.
+    """
+    state = STATES.get(record['state'])
+    if state is None:
+        return None
+    if record['task_id'] is None and state is ExportState:
+        logger.warning("Exporting tracker %s has no task id", record['image_name'])
+        return None
+    image = None
+    if state is HoldState:
+        if not record.get('image'):
+            logger.warning("Tracker on hold %s has no image", record['image_name'])
+            return None
+        from ..controller.image import Image
+        try:
+            image = Image.from_record(record['image'], drive_manager)
+        except Exception as e:
+            logger.error("Failed to rebuild the image of %s: %s", record['image_name'], e)
+            return None
+    tracker = TaskTracker(
+        image=image,
+        get_fileobj=get_fileobj,
+        store=store,
+        collection_path=record['collection_path'],
+        download_pool=download_pool,
+        priority=record['priority'] or (3,),
+        image_name=record['image_name']
+    )
+    if record['task_id'] is not None:
+        tracker.task = ee.batch.Task(record['task_id'], 'EXPORT_IMAGE', 'UNKNOWN')
+    tracker.state = DownloadState(record['attempt']) if state is DownloadState else state()
+    tracker.downloaded_bytes = record['downloaded_bytes']
+    tracker.export_started_at = record['export_started_at']
+    tracker.running_at = record['running_at']
+    return tracker
 
-def recover_task_tracker(file_path) -> TaskTracker:
+def recover_task_tracker(file_path, get_fileobj, store, download_pool=None) -> TaskTracker:
     """
-    Recover the task tracker from the file
+    Recover the task tracker from a legacy pickle file, to migrate it into the store
     """
     if not os.path.exists(file_path):
         logger.warning("Tracker file does not exist: %s", file_path)
@@ -185,17 +282,23 @@ def recover_task_tracker(file_path) -> TaskTracker:
             tracker_data = pickle.load(f)
         tracker = TaskTracker(
             image=tracker_data['image'],
-            get_fileobj=tracker_data['get_fileobj'],
-            tracker_folder_path=os.path.dirname(tracker_data['tracker_file_path']),
-            collection_path=tracker_data['collection_path']
+            get_fileobj=get_fileobj,
+            store=store,
+            collection_path=tracker_data['collection_path'],
+            download_pool=download_pool,
+            priority=tracker_data.get('priority', (3,))
         )
 
         tracker.task = tracker_data['task']
         tracker.state = tracker_data['state']
+        tracker.downloaded_bytes = tracker_data.get('downloaded_bytes', 0)
+        tracker.export_started_at = tracker_data.get('export_started_at')
+        tracker.running_at = tracker_data.get('running_at')
 
         if type(tracker.state) == HoldState:
-            logger.info("Hold state %s, skip", file_path)
-            return None
+            # images pickled before the output profiles have no format options
+            vars(tracker.image).setdefault('format_options', None)
+            vars(tracker.image).setdefault('_record', None)
 
         return tracker
     except (IOError, OSError, pickle.PickleError) as e:
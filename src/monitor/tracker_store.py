@@ -0,0 +1,119 @@
+"""
+SQLite store of the tracker records
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = ('task_id', 'state', 'attempt', 'downloaded_bytes', 'priority', 'export_started_at', 'running_at', 'image')
+
+class TrackerStore:
+    """
+    One row per active tracker keyed by (collection_path, image_name), holding only what is needed
+    to resume it: the task id, the state name and the progress, and the serialized image of a tracker
+    on hold. A row is only written when it changes.
+    A read only store, e.g. for planning, only reads an existing file and never writes or compacts it.
+    """
+    def __init__(self, store_file_path: str, compact_interval: int = 100, read_only: bool = False):
+        self.store_file_path = store_file_path
+        self.compact_interval = compact_interval
+        self.read_only = read_only
+        self._written = {}
+        self._deleted = 0
+        self._lock = threading.Lock()
+        if read_only:
+            self._connection = None
+            if os.path.exists(store_file_path):
+                # without a write ahead log no run holds the store, reading it as immutable creates no -wal and -shm files
+                mode = "mode=ro" if os.path.exists(store_file_path + "-wal") else "immutable=1"
+                self._connection = sqlite3.connect(f"file:{store_file_path}?{mode}", uri=True, check_same_thread=False)
+            return
+        self._connection = sqlite3.connect(store_file_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS trackers ("
+                "collection_path TEXT NOT NULL, image_name TEXT NOT NULL, task_id TEXT, state TEXT NOT NULL, "
+                "attempt INTEGER NOT NULL DEFAULT 0, downloaded_bytes INTEGER NOT NULL DEFAULT 0, priority TEXT, "
+                "export_started_at REAL, running_at REAL, updated_at REAL NOT NULL, image TEXT, "
+                "PRIMARY KEY (collection_path, image_name))"
+            )
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(trackers)")]
+            if 'image' not in columns:
+                # stores written before the trackers on hold were kept
+                self._connection.execute("ALTER TABLE trackers ADD COLUMN image TEXT")
+        self.compact()
+
+    def save(self, tracker):
+        """
+        Write the tracker record if it changed since the last write
+        """
+        key = (tracker.collection_path, tracker.image_name)
+        record = tracker.record()
+        with self._lock:
+            if self._written.get(key) == record:
+                return
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO trackers (collection_path, image_name, "
+                    + ", ".join(RECORD_FIELDS) + ", updated_at) VALUES (" + ", ".join("?" * (len(RECORD_FIELDS) + 3)) + ")",
+                    (*key, *(json.dumps(record[field]) if field == 'priority' else record[field] for field in RECORD_FIELDS), time.time())
+                )
+            self._written[key] = record
+        logger.debug("Saved tracker %s: %s", tracker.image_name, record['state'])
+
+    def delete(self, collection_path: str, image_name: str):
+        """
+        Delete the record of a finished tracker
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "DELETE FROM trackers WHERE collection_path = ? AND image_name = ?", (collection_path, image_name)
+                )
+            self._written.pop((collection_path, image_name), None)
+            self._deleted += 1
+            compact = self._deleted >= self.compact_interval
+        if compact:
+            self.compact()
+
+    def records(self) -> list:
+        """
+        Get all the tracker records as dicts, a field missing from an older read only store is None
+        """
+        if self._connection is None:
+            return []
+        with self._lock:
+            cursor = self._connection.execute("SELECT * FROM trackers")
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        records = []
+        for row in rows:
+            record = dict.fromkeys(RECORD_FIELDS)
+            record.update(zip(columns, row))
+            record.pop('updated_at', None)
+            record['priority'] = tuple(json.loads(record['priority'])) if record['priority'] else None
+            records.append(record)
+        return records
+
+    def compact(self):
+        """
+        Reclaim the space of the deleted rows
+        """
+        with self._lock:
+            self._connection.execute("VACUUM")
+            self._deleted = 0
+        logger.debug("Compacted tracker store %s (%d bytes)", self.store_file_path, os.path.getsize(self.store_file_path))
+
+    def close(self):
+        """
+        Close the store database
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
@@ -1,45 +1,45 @@
 import logging
+import os
 from typing import Optional
 from .controller import LstController, LstParser, Era5Controller, ModisController
+from .controller.export import city_image_prefix
 from .calculator import LstCalculator, Era5Calculator, MoodisCalculator
+from .monitor import Monitor
 
 logger = logging.getLogger(__name__)
 
-def process_lst(project_manager, city_asset, year_range, check_days_file_path: Optional[str] = None):
+def build_lst(project_manager, city_asset, year_range, check_days_file_path: Optional[str] = None, max_workers: int = 1, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None, spectral_indices: Optional[tuple] = None, output_profile: Optional[str] = None):
     """
-    Process the LST image series
+    Create the controller and calculator of the LST image series
     """
     controller = LstController(
         project_manager=project_manager,
         year_range=year_range,
         parser=LstParser(project_manager.quality_file_path),
-        check_days_file_path=check_days_file_path
+        check_days_file_path=check_days_file_path,
+        max_workers=max_workers,
+        monitor=monitor,
+        collection_path=collection_path
     )
     calculator = LstCalculator(
         city_asset=city_asset,
         quality_file_path=project_manager.quality_file_path,
         missing_file_path=controller.missing_file_path,
-        check_days_file_path=check_days_file_path
+        check_days_file_path=check_days_file_path,
+        spectral_indices=spectral_indices,
+        output_profile=output_profile
     )
-    try:
-        controller.create_image_series(calculator)
-    except Exception as e:
-        logger.error("Failed to create image series: %s", e)
-        return
+    return controller, calculator
 
-    try:
-        controller.post_process()
-    except Exception as e:
-        logger.error("Failed to post process: %s", e)
-        return
-
-def process_era5(project_manager, city_asset, check_days_file_path):
+def build_era5(project_manager, city_asset, check_days_file_path, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None):
     """
-    Process the ERA5 image series
+    Create the controller and calculator of the ERA5 image series
     """
     controller = Era5Controller(
         project_manager=project_manager,
-        check_days_file_path=check_days_file_path
+        check_days_file_path=check_days_file_path,
+        monitor=monitor,
+        collection_path=collection_path
     )
     calculator = Era5Calculator(
         city_asset=city_asset,
@@ -47,25 +47,17 @@ def process_era5(project_manager, city_asset, check_days_file_path):
         missing_file_path=controller.missing_file_path,
         check_days_file_path=check_days_file_path
     )
-    try:
-        controller.create_image_series(calculator)
-    except Exception as e:
-        logger.error("Failed to create image series: %s", e)
-        return
-
-    try:
-        controller.post_process()
-    except Exception as e:
-        logger.error("Failed to post process: %s", e)
-        return
+    return controller, calculator
 
-def process_thermal(project_manager, city_asset, check_days_file_path):
+def build_thermal(project_manager, city_asset, check_days_file_path, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None):
     """
-    Process the thermal image series
+    Create the controller and calculator of the thermal image series
     """
     controller = ModisController(
         project_manager=project_manager,
-        check_days_file_path=check_days_file_path
+        check_days_file_path=check_days_file_path,
+        monitor=monitor,
+        collection_path=collection_path
     )
     calculator = MoodisCalculator(
         city_asset=city_asset,
@@ -73,6 +65,12 @@ def process_thermal(project_manager, city_asset, check_days_file_path):
         missing_file_path=controller.missing_file_path,
         check_days_file_path=check_days_file_path
     )
+    return controller, calculator
+
+def run_process(controller, calculator):
+    """
+    Create the image series, then post process it
+    """
     try:
         controller.create_image_series(calculator)
     except Exception as e:
@@ -84,3 +82,76 @@ def process_thermal(project_manager, city_asset, check_days_file_path):
     except Exception as e:
         logger.error("Failed to post process: %s", e)
         return
+
+def process_lst(project_manager, city_asset, year_range, check_days_file_path: Optional[str] = None, max_workers: int = 1, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None, spectral_indices: Optional[tuple] = None, output_profile: Optional[str] = None):
+    """
+    Process the LST image series
+    """
+    run_process(*build_lst(project_manager, city_asset, year_range, check_days_file_path, max_workers, monitor, collection_path, spectral_indices, output_profile))
+
+def process_era5(project_manager, city_asset, check_days_file_path, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None):
+    """
+    Process the ERA5 image series
+    """
+    run_process(*build_era5(project_manager, city_asset, check_days_file_path, monitor, collection_path))
+
+def process_thermal(project_manager, city_asset, check_days_file_path, monitor: Optional[Monitor] = None, collection_path: Optional[str] = None):
+    """
+    Process the thermal image series
+    """
+    run_process(*build_thermal(project_manager, city_asset, check_days_file_path, monitor, collection_path))
+
+def process_cities(process_func, project_manager, city_names: list, *args, **kwargs):
+    """
+    Run a process for every city with one shared monitor, so the drive session and the
+    export slots are shared. Each city is downloaded to its own collection subfolder.
+    """
+    monitor = Monitor(project_manager.tracker_folder_path, project_manager.drive_manager, project_manager.collection_path, **project_manager.monitor_options())
+    monitor.start()
+    for city_name in city_names:
+        try:
+            city_asset = project_manager.get_city_asset(city_name)
+        except Exception as e:
+            logger.error("Failed to get city asset of %s: %s", city_name, e)
+            continue
+        logger.info("Processing city %s", city_name)
+        collection_path = os.path.join(project_manager.collection_path, city_image_prefix(city_asset.name))
+        process_func(project_manager, city_asset, *args, monitor=monitor, collection_path=collection_path, **kwargs)
+    monitor.stop()
+
+def plan_cities(build_func, project_manager, city_names: list, per_city_folder: bool, *args, **kwargs) -> list:
+    """
+    Plan a run without exporting: count the sessions of every city by status and estimate
+    the pixels, download size and getInfo calls of the pending ones. Nothing is written locally.
+    """
+    monitor = Monitor(project_manager.tracker_folder_path, project_manager.drive_manager, project_manager.collection_path, read_only=True, **project_manager.monitor_options())
+    monitor.index_trackers()
+    rows = []
+    for city_name in city_names:
+        try:
+            city_asset = project_manager.get_city_asset(city_name)
+        except Exception as e:
+            logger.error("Failed to get city asset of %s: %s", city_name, e)
+            continue
+        collection_path = None
+        if per_city_folder:
+            collection_path = os.path.join(project_manager.collection_path, city_image_prefix(city_asset.name))
+        controller, calculator = build_func(project_manager, city_asset, *args, monitor=monitor, collection_path=collection_path, **kwargs)
+        plan = controller.plan(calculator)
+        pixel_count = city_asset.estimate_pixel_count(calculator.pixel_resolution)
+        pending_num = len(plan['pending'])
+        rows.append({
+            'city': city_asset.name,
+            'total': plan['total'],
+            'completed': plan['completed'],
+            'tracked': plan['tracked'],
+            'missing': plan['missing'],
+            'pending': pending_num,
+            'pixels_per_image': pixel_count,
+            'download_gb': sum(calculator.session_band_count(year, month) for year, month in plan['pending']) * pixel_count * calculator.bytes_per_pixel / 1024 ** 3,
+            # the calculation calls plus the export task of every pending month
+            'ee_calls': pending_num * (calculator.ee_calls_per_session + 1),
+            'pending_months': [f"{year}-{month:02}" for year, month in plan['pending']],
+        })
+        logger.info("Plan of %s: %s", city_asset.name, rows[-1])
+    return rows
@@ -0,0 +1,24 @@
+"""
+The tests run the pipeline offline on the fake backend of src.backend, which is installed
+as the ee and pydrive modules before any test module imports them
+"""
+import pytest
+from src.backend.fake_backend import FakeBackend
+
+BACKEND = FakeBackend(get_info_latency=0, request_latency=0, export_queue_time=0, export_run_time=0)
+BACKEND.install()
+
+@pytest.fixture(scope='session')
+def backend():
+    """
+    The installed fake backend, its counters run over the whole session
+    """
+    return BACKEND
+
+@pytest.fixture(scope='session')
+def city_asset():
+    """
+    The asset of a city of the fake boundaries
+    """
+    from src.communicator.ee_manager import EEManager
+    return EEManager('fake-project').get_city_asset("武汉市")
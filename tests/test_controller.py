@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+import pytest
+
+# the controllers package imports the ERA5 post processing, which needs GDAL
+pytest.importorskip('osgeo')
+from src.controller.lst_controller import LstController
+
+def test_only_the_listed_months_get_the_check_days_priority(tmp_path):
+    check_days_file = tmp_path / 'check_days.csv'
+    check_days_file.write_text("year,month,day\n2019,7,15\n2020,1,3\n", encoding='utf-8')
+    project_manager = SimpleNamespace(collection_path=str(tmp_path / 'collection'), pinned_months={'2018-05'})
+    controller = LstController(project_manager, (2018, 2020), None, str(check_days_file), monitor=object())
+    assert controller._session_priority(2018, 5) == (0, -2018, 5)
+    assert controller._session_priority(2019, 7) == (1, -2019, 7)
+    assert controller._session_priority(2019, 8) == (2, -2019, 8)
+    year_range = LstController(project_manager, (2018, 2020), None, monitor=object())
+    assert year_range._session_priority(2019, 7) == (2, -2019, 7)
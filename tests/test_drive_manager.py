@@ -0,0 +1,21 @@
+import pytest
+from src.backend.fake_drive import Response
+from src.communicator.drive_manager import download_file
+
+class EmptyBodyHttp:
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        return Response(206), b''
+
+class Auth:
+    def Get_Http_Object(self):
+        return EmptyBodyHttp()
+
+class DriveFile(dict):
+    auth = Auth()
+
+def test_empty_range_body_fails_the_download(tmp_path):
+    file_obj = DriveFile(title='city-2019-07.tif', downloadUrl='https://drive/file', fileSize='10')
+    local_file_path = tmp_path / 'city-2019-07.tif'
+    with pytest.raises(IOError, match='HTTP 206 with an empty body at 0/10'):
+        download_file(file_obj, str(local_file_path))
+    assert not local_file_path.exists()
@@ -0,0 +1,48 @@
+import datetime
+import ee
+import pytest
+from src.communicator import ee_cache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ee_cache.EECache(str(tmp_path / 'ee_cache.sqlite'))
+    monkeypatch.setattr(ee_cache, '_ee_cache', cache)
+    yield cache
+    cache.close()
+
+def test_results_over_old_data_are_cached(backend, cache):
+    calls = backend.counters['get_info']
+    for _ in range(2):
+        assert ee_cache.cached_get_info(ee.Number(1).add(1), datetime.date(2019, 7, 31)) == 2
+    assert backend.counters['get_info'] - calls == 1
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+def test_results_over_recent_data_are_not_cached(backend, cache):
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    calls = backend.counters['get_info']
+    for _ in range(2):
+        assert ee_cache.cached_get_info(ee.Number(2).add(1), today) == 3
+    assert backend.counters['get_info'] - calls == 2
+    assert cache.stats() == {'hits': 0, 'misses': 0}
+
+def test_read_only_cache_serves_stored_results_without_writing(backend, cache, tmp_path, monkeypatch):
+    ee_cache.cached_get_info(ee.Number(4).add(1), datetime.date(2019, 7, 31))
+    cache.close()
+    cache_file = tmp_path / 'ee_cache.sqlite'
+    stored = cache_file.read_bytes()
+    read_only = ee_cache.EECache(str(cache_file), read_only=True)
+    monkeypatch.setattr(ee_cache, '_ee_cache', read_only)
+    calls = backend.counters['get_info']
+    assert ee_cache.cached_get_info(ee.Number(4).add(1), datetime.date(2019, 7, 31)) == 5
+    assert ee_cache.cached_get_info(ee.Number(6).add(1), datetime.date(2019, 7, 31)) == 7
+    assert backend.counters['get_info'] - calls == 1
+    assert read_only.stats() == {'hits': 1, 'misses': 1}
+    read_only.close()
+    assert cache_file.read_bytes() == stored
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['ee_cache.sqlite']
+
+def test_read_only_cache_without_a_file_creates_none(backend, tmp_path):
+    read_only = ee_cache.EECache(str(tmp_path / 'ee_cache.sqlite'), read_only=True)
+    assert read_only.get_info(ee.Number(8).add(1)) == 9
+    read_only.close()
+    assert list(tmp_path.iterdir()) == []
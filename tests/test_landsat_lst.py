@@ -0,0 +1,108 @@
+import ee
+import pytest
+from src.backend import fake_ee
+from src.lst_algorithm import landsat_lst
+from src.lst_algorithm.cloudmask import mask_sr, mask_toa, COARSE_TOLERANCE
+from src.lst_algorithm.landsat_lst import load_landsat_collections, minimum_cloud_cover
+
+MONTHS = [(2019, month) for month in range(1, 13)] + [(2011, 7), (2011, 8)]
+
+def best_day(city_asset, landsat, year, month, product, cloud_cover_geometry=None, **options):
+    """
+    (proportion, cloud cover, day) of the best day of the month, None without a candidate day
+    """
+    date_start = ee.Date.fromYMD(year, month, 1)
+    date_end = date_start.advance(1, 'month')
+    landsat_toa, landsat_sr = load_landsat_collections(landsat, date_start, date_end, city_asset.city_geometry, 25)
+    collection, mask_method = (landsat_toa, mask_toa) if product == 'TOA' else (landsat_sr, mask_sr)
+    cloud_cover_geometry = city_asset.urban_geometry if cloud_cover_geometry is None else cloud_cover_geometry
+    try:
+        _, porpotion, cloud_cover, day = minimum_cloud_cover(
+            collection, city_asset.city_geometry, cloud_cover_geometry, mask_method, date_start, **options)
+    except ValueError:
+        return None
+    return porpotion, cloud_cover, day
+
+@pytest.mark.parametrize('product', ['TOA', 'SR'])
+@pytest.mark.parametrize('year, month', MONTHS)
+def test_screened_pick_matches_batched(city_asset, year, month, product):
+    landsat = 'L8' if year >= 2013 else 'L5'
+    batched = best_day(city_asset, landsat, year, month, product, batched=True, screened=False)
+    screened = best_day(city_asset, landsat, year, month, product, batched=True, screened=True)
+    assert screened == batched
+
+@pytest.mark.parametrize('product', ['TOA', 'SR'])
+@pytest.mark.parametrize('year, month', MONTHS)
+def test_batched_pick_matches_serial(backend, city_asset, year, month, product):
+    landsat = 'L8' if year >= 2013 else 'L5'
+    calls = backend.counters['get_info']
+    serial = best_day(city_asset, landsat, year, month, product, batched=False)
+    serial_calls = backend.counters['get_info'] - calls
+    calls = backend.counters['get_info']
+    batched = best_day(city_asset, landsat, year, month, product, batched=True)
+    batched_calls = backend.counters['get_info'] - calls
+    assert batched == pytest.approx(serial)
+    assert batched_calls == 1
+    assert batched_calls < serial_calls
+
+@pytest.fixture
+def candidate_passes(monkeypatch):
+    """
+    The (index_list, candidates) of every _fetch_candidates call, by scale
+    """
+    passes = {}
+    fetch_candidates = landsat_lst._fetch_candidates
+
+    def spy(*args, **kwargs):
+        candidates = fetch_candidates(*args, **kwargs)
+        index_list = args[4] if len(args) > 4 else kwargs.get('index_list')
+        passes.setdefault(kwargs.get('scale', 30), []).append((index_list, candidates))
+        return candidates
+
+    monkeypatch.setattr(landsat_lst, '_fetch_candidates', spy)
+    return passes
+
+def test_screened_search_prunes_by_the_coarse_bound(monkeypatch, city_asset, candidate_passes):
+    # a coarse error well above the tolerance, the pruned days include some of the best ones
+    monkeypatch.setattr(fake_ee, 'COARSE_ERROR', 0.3)
+    pruned = differing = 0
+    for year, month in MONTHS + [(2009, month) for month in range(1, 13)]:
+        landsat = 'L8' if year >= 2013 else 'L5'
+        for product in ('TOA', 'SR'):
+            candidate_passes.clear()
+            screened = best_day(city_asset, landsat, year, month, product, batched=True, screened=True)
+            batched = best_day(city_asset, landsat, year, month, product, batched=True, screened=False)
+            (_, coarse), = candidate_passes[landsat_lst.COARSE_SCALE]
+            if not coarse:
+                assert screened is None and batched is None
+                continue
+            (index_list, exact), (_, every_day) = candidate_passes[30]
+            bound = min(candidate['cloud_cover'] for candidate in coarse) + COARSE_TOLERANCE
+            assert index_list == sorted(
+                candidate['index'] for candidate in coarse if candidate['cloud_cover'] - COARSE_TOLERANCE <= bound)
+            # the pick is the best of the days reduced at 30 m, not of every day
+            survivors = [candidate for candidate in every_day if candidate['index'] in index_list]
+            assert [candidate['index'] for candidate in exact] == [candidate['index'] for candidate in survivors]
+            _, porpotion, cloud_cover = landsat_lst._pick_best(survivors)
+            assert screened[:2] == (porpotion, cloud_cover)
+            pruned += len(coarse) - len(index_list)
+            differing += screened != batched
+    assert pruned > 0
+    assert differing > 0
+
+def test_screened_search_keeps_the_days_without_coarse_pixels(city_asset, candidate_passes):
+    # about 200 m wide: no pixel at the coarse scale, about 50 at 30 m
+    corners = city_asset.urban_geometry.bounds().getInfo()['coordinates'][0]
+    (west, south), (east, north) = corners[0], corners[2]
+    longitude, latitude = (west + east) / 2, (south + north) / 2
+    small_geometry = ee.Geometry({'type': 'Polygon', 'coordinates': [[
+        [longitude, latitude], [longitude + 0.002, latitude], [longitude + 0.002, latitude + 0.002],
+        [longitude, latitude + 0.002], [longitude, latitude]]]})
+    for year, month in MONTHS:
+        landsat = 'L8' if year >= 2013 else 'L5'
+        candidate_passes.clear()
+        screened = best_day(city_asset, landsat, year, month, 'SR', small_geometry, batched=True, screened=True)
+        batched = best_day(city_asset, landsat, year, month, 'SR', small_geometry, batched=True, screened=False)
+        assert screened == batched
+        (_, coarse), = candidate_passes[landsat_lst.COARSE_SCALE]
+        assert all(candidate['cloud_cover'] is None for candidate in coarse)
@@ -0,0 +1,57 @@
+import time
+import ee
+from src.monitor import Monitor
+from src.monitor.tracker import CompeletedState, DownloadState, ExportState, TaskTracker
+
+def task_record(description, running):
+    return {
+        'description': description,
+        'started_at': time.time() - (0 if running else 100),
+        'queue_time': 0,
+        'run_time': 50,
+        'fails': False,
+        'cancelled': False,
+        'size': 1,
+        'written': True,
+    }
+
+def test_poll_looks_up_the_exporting_tasks_of_a_long_history(backend, tmp_path, monkeypatch):
+    tasks = {f"OLD{index:08}": task_record(f"old-{index}", running=False) for index in range(1200)}
+    tasks.update({f"NEW{index:08}": task_record(f"new-{index}", running=True) for index in range(2)})
+    monkeypatch.setattr(backend, 'tasks', tasks)
+    monitor = Monitor(str(tmp_path / 'trackers'), None, str(tmp_path / 'collection'))
+    for index in range(2):
+        tracker = TaskTracker(None, None, monitor.store, str(tmp_path / 'collection'), image_name=f"new-{index}")
+        tracker.task = ee.batch.Task(f"NEW{index:08}")
+        tracker.state = ExportState()
+        monitor.trackers.append(tracker)
+
+    def poll():
+        counters = dict(backend.counters)
+        monitor._poll_task_status()
+        assert [tracker.polled_status['state'] for tracker in monitor.trackers] == ['RUNNING', 'RUNNING']
+        return {kind: backend.counters[kind] - counters.get(kind, 0) for kind in ('task_list', 'task_status')}
+
+    # every poll looks the 2 tasks up by id, the history is never listed
+    assert poll() == {'task_list': 0, 'task_status': 2}
+    assert poll() == {'task_list': 0, 'task_status': 2}
+
+def test_unlisted_download_is_given_up_after_a_full_listing(tmp_path):
+    lookups = []
+
+    def get_fileobj(cloud_file_name, full_listing=False):
+        lookups.append(full_listing)
+        return None
+
+    monitor = Monitor(str(tmp_path / 'trackers'), None, str(tmp_path / 'collection'))
+    tracker = TaskTracker(None, get_fileobj, monitor.store, str(tmp_path / 'collection'), image_name="city-2019-07")
+    state = DownloadState()
+    for _ in range(DownloadState.max_retries):
+        state = state.handle(tracker)
+        state.retry_at = None
+    assert lookups == [False, False, True]
+    assert isinstance(state, CompeletedState) and tracker.unlisted
+    # the month is not recorded as missing, the next run plans it again
+    assert state.handle(tracker) is None
+    assert lookups == [False, False, True]
+    assert not (tmp_path / 'collection' / 'missing.txt').exists()
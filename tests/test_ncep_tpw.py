@@ -0,0 +1,40 @@
+import ee
+import pytest
+from src.lst_algorithm.ncep_tpw import NCEP_STEP_HOURS, closest_tpw, get_tpw_collection
+
+HOUR_MILLIS = 3600000
+# 2019-07-02 02:30 UTC
+ACQUISITION_MILLIS = 1562034600000
+
+def tpw_images(*hours):
+    """
+    NCEP-like images the given hours away from the acquisition time
+    """
+    return ee.ImageCollection([
+        ee.Image.constant(10.0).rename('pr_wtr').set('system:time_start', ACQUISITION_MILLIS + hour * HOUR_MILLIS)
+        for hour in hours
+    ])
+
+def weights(tpw_collection):
+    _, _, weight1, weight2 = closest_tpw(ee.Date(ACQUISITION_MILLIS), tpw_collection)
+    return ee.List([weight1, weight2]).getInfo()
+
+@pytest.mark.parametrize('hours, expected', [
+    ((), [1.0, 0.0]),
+    ((4,), [1.0, 0.0]),
+    ((-2, 4), [4 / 6, 2 / 6]),
+    ((4, -2, 10, -8), [4 / 6, 2 / 6]),
+])
+def test_weights_add_up_to_one(hours, expected):
+    assert weights(tpw_images(*hours)) == pytest.approx(expected)
+
+def test_no_image_gives_the_fill_value():
+    tpw1, tpw2, _, _ = closest_tpw(ee.Date(ACQUISITION_MILLIS), tpw_images())
+    assert ee.List([tpw1.bandNames(), tpw2.bandNames()]).getInfo() == [['constant'], ['constant']]
+
+def test_day_window_encloses_the_acquisition():
+    day = ee.Date.fromYMD(2019, 7, 2)
+    tpw_collection = get_tpw_collection(day)
+    # the 6 hourly images of the day and one step on each side
+    assert tpw_collection.size().getInfo() == 24 // NCEP_STEP_HOURS + 2
+    assert weights(tpw_collection) == pytest.approx([3.5 / 6, 2.5 / 6])
@@ -0,0 +1,19 @@
+import ee
+import pytest
+from src.lst_algorithm import OUTPUT_PROFILES, DEFAULT_INDICES, fetch_best_landsat_image, expected_landsat, profile_band_count
+
+SATELLITE_LIST = ('L8', 'L5', 'L7', 'L4')
+
+@pytest.mark.parametrize('year, month, landsat', [(2019, 1, 'L8'), (2012, 2, 'L7'), (2009, 1, 'L5'), (1983, 1, 'L4'), (1980, 1, None)])
+def test_expected_landsat_of_a_month(year, month, landsat):
+    assert expected_landsat(SATELLITE_LIST, year, month) == landsat
+
+@pytest.mark.parametrize('profile', sorted(OUTPUT_PROFILES))
+@pytest.mark.parametrize('year, month, landsat', [(2019, 1, 'L8'), (2012, 2, 'L7'), (2009, 1, 'L5'), (1989, 1, 'L4')])
+def test_band_count_matches_the_exported_image(city_asset, profile, year, month, landsat):
+    date_start = ee.Date.fromYMD(year, month, 1)
+    image = fetch_best_landsat_image(
+        landsat=landsat, date_start=date_start, date_end=date_start.advance(1, 'month'),
+        geometry=city_asset.city_geometry, cloud_theshold=25, cloud_cover_geometry=city_asset.urban_geometry,
+        use_ndvi=True, month=month, latitude=city_asset.latitude, year=year, output_profile=profile)[0]
+    assert len(image.bandNames().getInfo()) == profile_band_count(OUTPUT_PROFILES[profile], landsat, DEFAULT_INDICES)